@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from smolagents import CodeAgent, Tool
 from ..infrastructure.settings import settings
 from ..infrastructure.models.grok_model import GrokModel
@@ -6,12 +6,11 @@ from .tools.nppes_tool import NppesTool
 from .tools.web_search_tool import WebSearchTool
 
 
-def build_agent() -> CodeAgent:
+def build_agent(model: Optional[GrokModel] = None) -> CodeAgent:
     tools: List[Tool] = [NppesTool(), WebSearchTool()]
     
-    # Initialize Grok model if API key is available
-    model = None
-    if settings.grok_api_key:
+    # Initialize Grok model if API key is available and none was shared
+    if model is None and settings.grok_api_key:
         try:
             model = GrokModel(api_key=settings.grok_api_key, model_name="grok-beta", temperature=0.7)
         except Exception as e:
@@ -0,0 +1,28 @@
+"""Blocking agent calls on a dedicated, bounded thread pool.
+
+``CodeAgent.run`` is synchronous and cannot be interrupted, so a timeout only
+abandons the coroutine awaiting it. Calls made inside ``AgentPool.checkout``
+are recorded on the checkout, which keeps the agent and its slots until every
+thread it started has returned.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+from ..infrastructure.settings import settings
+
+
+_executor = ThreadPoolExecutor(max_workers=settings.agent_max_active_runs, thread_name_prefix="agent-run")
+
+# Threads started under the current checkout; None outside the pool
+run_threads: contextvars.ContextVar[Optional[List[Future]]] = contextvars.ContextVar("agent_run_threads", default=None)
+
+
+async def run_in_thread(func: Callable[..., Any], *args: Any) -> Any:
+    """``func(*args)`` on an agent-run thread, awaited without blocking the loop."""
+    # Carry the context over, as asyncio.to_thread does, so log bindings follow the call
+    future = _executor.submit(contextvars.copy_context().run, func, *args)
+    threads = run_threads.get()
+    if threads is not None:
+        threads.append(future)
+    return await asyncio.wrap_future(future)
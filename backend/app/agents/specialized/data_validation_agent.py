@@ -1,9 +1,15 @@
 """Data Validation Agent for provider contact validation."""
-from typing import List, Dict, Any
+import asyncio
+from typing import List, Dict, Any, Optional
 from smolagents import CodeAgent, Tool
+from smolagents.models import ChatMessage
 from ...domain.enriched_entities import EnrichedProvider, DataElementConfidence, DataSource, ValidationStatus
 from ...infrastructure.models.grok_model import GrokModel
 from ...infrastructure.services.confidence_scoring import ConfidenceScoringService
+from ...infrastructure.services import evidence
+from ...infrastructure.nppes import client as nppes_client
+from ...infrastructure.settings import settings
+from ..runner import run_in_thread
 from ..tools.nppes_tool import NppesTool
 from ..tools.web_scraping_tool import WebScrapingTool
 from ..tools.web_search_tool import WebSearchTool
@@ -18,18 +24,25 @@ class DataValidationAgent:
     """Agent for validating provider contact information."""
     
     def __init__(self, model: GrokModel):
+        self.nppes_tool = NppesTool()
+        self.web_scraping_tool = WebScrapingTool()
+        self.web_search_tool = WebSearchTool()
+        self.google_maps_tool = GoogleMapsTool()
         tools: List[Tool] = [
-            NppesTool(),
-            WebScrapingTool(),
-            WebSearchTool(),
-            GoogleMapsTool(),
+            self.nppes_tool,
+            self.web_scraping_tool,
+            self.web_search_tool,
+            self.google_maps_tool,
         ]
+        self.model = model
         self.agent = CodeAgent(tools=tools, model=model, name="data_validation_agent")
         self.confidence_scoring = ConfidenceScoringService()
     
     async def validate_provider_contact(self, provider: EnrichedProvider) -> EnrichedProvider:
         """Validate provider contact information."""
         logger.info("validating_provider_contact", npi=provider.npi)
+        if settings.contact_validation_mode == "structured":
+            return await self.validate_provider_contact_structured(provider)
         
         # Build validation prompt
         prompt = f"""Validate the contact information for provider {provider.first_name} {provider.last_name} (NPI: {provider.npi}).
@@ -52,7 +65,7 @@ Return a summary with validated information and confidence scores.
 """
         
         try:
-            result = await self.agent.run(prompt)
+            result = await run_in_thread(self.agent.run, prompt)
             
             # Process results and update provider
             provider = self._process_validation_results(provider, result)
@@ -64,6 +77,111 @@ Return a summary with validated information and confidence scores.
             provider.validation_notes.append(f"Validation failed: {str(e)}")
             return provider
     
+    async def _gather_evidence(self, provider: EnrichedProvider) -> Dict[DataSource, Dict[str, Optional[str]]]:
+        """Call the four tools concurrently; a failing or slow tool just contributes nothing."""
+        name = provider.organization_name or " ".join(filter(None, [provider.first_name, provider.last_name]))
+        calls = {
+            DataSource.NPPES: nppes_client.lookup(provider.npi),
+            DataSource.GOOGLE_MAPS: self.google_maps_tool(
+                provider_name=name, address=provider.address_line1, city=provider.city, state=provider.state,
+            ),
+            DataSource.WEB_SEARCH: self.web_search_tool(
+                f"{name} {provider.city or ''} {provider.state or ''} phone", num_results=5,
+            ),
+        }
+        if provider.website:
+            calls[DataSource.PROVIDER_WEBSITE] = self.web_scraping_tool(provider.website)
+        # Each call has its own timeout, so one slow source cannot void the others
+        timeout = settings.structured_validation_timeout_seconds or None
+        outputs = await asyncio.gather(
+            *(asyncio.wait_for(call, timeout) for call in calls.values()), return_exceptions=True
+        )
+
+        found: Dict[DataSource, Dict[str, Optional[str]]] = {}
+        for source, output in zip(calls, outputs):
+            if isinstance(output, BaseException) or (isinstance(output, dict) and "error" in output):
+                logger.warning(
+                    "validation_tool_failed", npi=provider.npi, source=source.value,
+                    error=str(output) or type(output).__name__,
+                )
+                continue
+            if source == DataSource.NPPES:
+                values = evidence.nppes_values(output) if output else {}
+            elif source == DataSource.GOOGLE_MAPS:
+                values = evidence.maps_values(output, provider)
+            elif source == DataSource.WEB_SEARCH:
+                values = evidence.search_values(output or [], provider)
+            else:
+                values = evidence.scraped_values(output, provider)
+            found[source] = values
+        return found
+    
+    async def validate_provider_contact_structured(self, provider: EnrichedProvider) -> EnrichedProvider:
+        """Validate from the four tools' outputs directly, without an agent loop.
+        
+        The tools run concurrently, so latency is that of the slowest one.
+        Their outputs become per-source ``DataElementConfidence`` entries that
+        are cross-validated; the model is asked at most once, only to
+        summarize conflicts for the reviewer.
+        """
+        try:
+            found = await self._gather_evidence(provider)
+        except Exception as e:
+            logger.error("validation_failed", npi=provider.npi, error=str(e))
+            provider.validation_status = ValidationStatus.REQUIRES_REVIEW
+            provider.validation_notes.append(f"Validation failed: {str(e)}")
+            return provider
+        
+        elements = evidence.build_elements(found)
+        provider = evidence.apply_elements(provider, elements)
+        stored = evidence.stored_values(provider)
+        for element in elements:
+            if stored.get(element.element_name) and element.value != stored[element.element_name]:
+                element.discrepancy_found = True
+                provider.discrepancies.append(
+                    f"{element.element_name}: {element.source.value} reports a different value"
+                )
+        
+        if provider.overall_confidence >= 0.8 and not provider.discrepancies:
+            provider.validation_status = ValidationStatus.VALIDATED
+        elif any(e.discrepancy_found for e in elements):
+            provider.validation_status = ValidationStatus.DISCREPANCY
+            provider.requires_manual_review = True
+            provider.review_priority = 5
+        else:
+            provider.validation_status = ValidationStatus.REQUIRES_REVIEW
+        
+        if provider.validation_status != ValidationStatus.VALIDATED:
+            summary = await self._summarize(provider, elements)
+            if summary:
+                provider.validation_notes.append(summary)
+        return provider
+    
+    async def _summarize(self, provider: EnrichedProvider, elements: List[DataElementConfidence]) -> Optional[str]:
+        """One model call explaining the evidence to a reviewer; None without a model."""
+        if self.model is None or not settings.structured_validation_summarize:
+            return None
+        lines = "\n".join(
+            f"- {e.element_name} from {e.source.value}: {e.value} (confidence {e.confidence_score}"
+            f"{', conflicts' if e.discrepancy_found else ''})"
+            for e in elements
+        )
+        prompt = f"""Provider {provider.first_name} {provider.last_name} (NPI: {provider.npi}) needs review.
+
+Stored: phone {provider.phone or 'n/a'}, email {provider.email or 'n/a'}, address {provider.address_line1}, {provider.city}, {provider.state}
+Evidence:
+{lines or '- none'}
+Discrepancies: {'; '.join(provider.discrepancies) or 'none'}
+
+In two or three sentences, tell the reviewer which values look current and what to verify.
+"""
+        try:
+            message = await self.model.generate([ChatMessage(role="user", content=prompt)])
+            return message.content or None
+        except Exception as e:
+            logger.warning("validation_summary_failed", npi=provider.npi, error=str(e))
+            return None
+    
     def _process_validation_results(self, provider: EnrichedProvider, agent_result: Any) -> EnrichedProvider:
         """Process agent results and update provider with confidence scores."""
         # Extract information from agent result
@@ -3,6 +3,7 @@ from typing import List
 from smolagents import CodeAgent, Tool
 from ...domain.enriched_entities import EnrichedProvider
 from ...infrastructure.models.grok_model import GrokModel
+from ..runner import run_in_thread
 from ..tools.nppes_tool import NppesTool
 from ..tools.web_search_tool import WebSearchTool
 from ..tools.state_licensing_tool import StateLicensingTool
@@ -50,7 +51,7 @@ Return enriched information including:
 """
         
         try:
-            result = await self.agent.run(prompt)
+            result = await run_in_thread(self.agent.run, prompt)
             # Process and update provider with enriched data
             # This would parse the agent result and update provider fields
             logger.info("provider_enriched", npi=provider.npi)
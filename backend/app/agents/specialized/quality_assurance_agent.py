@@ -3,6 +3,7 @@ from typing import List
 from smolagents import CodeAgent, Tool
 from ...domain.enriched_entities import EnrichedProvider, ValidationStatus
 from ...infrastructure.models.grok_model import GrokModel
+from ..runner import run_in_thread
 from ..tools.nppes_tool import NppesTool
 from ...infrastructure.logging import get_logger
 
@@ -46,7 +47,7 @@ Return assessment with:
 """
         
         try:
-            result = await self.agent.run(prompt)
+            result = await run_in_thread(self.agent.run, prompt)
             
             # Process assessment results
             # Check for discrepancies
@@ -29,7 +29,7 @@ class WebScrapingTool(Tool):
                 "url": url,
                 "phone": self._extract_phone(soup, html),
                 "email": self._extract_email(soup, html),
-                "address": self._extract_address(soup, html),
+                "address": self._extract_address(soup),
                 "services": self._extract_services(soup),
             }
             
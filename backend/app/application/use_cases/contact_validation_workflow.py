@@ -2,7 +2,7 @@
 from typing import List
 from ...domain.enriched_entities import EnrichedProvider, ValidationBatch
 from ...infrastructure.services.orchestrator import AgentOrchestrator
-from ...infrastructure.repositories.provider_repository import ProviderRepository
+from ...infrastructure.repositories.provider_repository import ProviderRepository, validation_snapshot
 from ...infrastructure.database import get_db
 from ...infrastructure.services.email_service import EmailService
 from ...infrastructure.services.confidence_scoring import ConfidenceScoringService
@@ -35,13 +35,16 @@ class ContactValidationWorkflow:
         )
         
         # Validate providers
-        validated_providers = await self.orchestrator.batch_validate_providers(providers)
+        before = [validation_snapshot(p) for p in providers]
+        report: dict = {}
+        validated_providers = await self.orchestrator.batch_validate_providers(providers, report=report)
         
         # Update batch stats
         batch.processed_count = len(validated_providers)
         batch.validated_count = sum(1 for p in validated_providers if p.validation_status.value == "validated")
         batch.discrepancy_count = sum(1 for p in validated_providers if p.discrepancies)
         batch.requires_review_count = sum(1 for p in validated_providers if p.requires_manual_review)
+        batch.llm_skipped_count = report.get("llm_skipped", 0)
         batch.providers = validated_providers
         batch.completed_at = datetime.utcnow()
         batch.status = "completed"
@@ -50,14 +53,10 @@ class ContactValidationWorkflow:
         db = get_db()
         async with db.get_session() as session:
             repo = ProviderRepository(session)
-            
-            for provider in validated_providers:
-                # Save or update provider
-                existing = await repo.get_by_npi(provider.npi)
-                if existing:
-                    await repo.update(provider)
-                else:
-                    await repo.create(provider)
+            provider_ids = await repo.upsert_many(validated_providers)
+            await repo.record_validations(
+                provider_ids, before, validated_providers, "contact", "data_validation_agent", batch_id=batch_id,
+            )
         
         logger.info("batch_validation_complete", batch_id=batch_id, validated=batch.validated_count)
         return batch
@@ -2,7 +2,7 @@
 from typing import List
 from ...domain.enriched_entities import EnrichedProvider
 from ...infrastructure.services.orchestrator import AgentOrchestrator
-from ...infrastructure.repositories.provider_repository import ProviderRepository
+from ...infrastructure.repositories.provider_repository import ProviderRepository, validation_snapshot
 from ...infrastructure.database import get_db
 from ...infrastructure.logging import get_logger
 
@@ -20,21 +20,22 @@ class CredentialVerificationWorkflow:
         """Verify provider credentials."""
         logger.info("verifying_credentials", npi=provider.npi)
         
+        before = validation_snapshot(provider)
+        
         # Use information enrichment agent primarily
-        provider = await self.orchestrator.information_enrichment_agent.enrich_provider(provider)
+        provider = await self.orchestrator.enrich(provider)
         
         # Quality assurance
-        provider = await self.orchestrator.quality_assurance_agent.assess_quality(provider)
+        provider = await self.orchestrator.assess_quality(provider)
         
         # Save to database
         db = get_db()
         async with db.get_session() as session:
             repo = ProviderRepository(session)
-            existing = await repo.get_by_npi(provider.npi)
-            if existing:
-                await repo.update(provider)
-            else:
-                await repo.create(provider)
+            provider_ids = await repo.upsert_many([provider])
+            await repo.record_validations(
+                provider_ids, [before], [provider], "credential", "information_enrichment_agent",
+            )
         
         logger.info("credentials_verified", npi=provider.npi)
         return provider
@@ -2,7 +2,7 @@
 from typing import List
 from ...domain.enriched_entities import ValidationReport, EnrichedProvider
 from ...infrastructure.services.orchestrator import AgentOrchestrator
-from ...infrastructure.repositories.provider_repository import ProviderRepository
+from ...infrastructure.repositories.provider_repository import ENRICHED_PROVIDER_FIELDS, ProviderRepository
 from ...infrastructure.database import get_db
 from ...infrastructure.services.confidence_scoring import ConfidenceScoringService
 from ...infrastructure.logging import get_logger
@@ -25,19 +25,19 @@ class QualityAssessmentWorkflow:
         logger.info("quality_assessment_start", provider_count=len(provider_ids))
         
         db = get_db()
-        providers = []
+        loaded = []
         
-        async with db.get_session() as session:
+        # Load everything first so no connection is held across LLM calls
+        async with db.get_read_session() as session:
             repo = ProviderRepository(session)
-            
-            for npi in provider_ids:
-                provider_model = await repo.get_by_npi(npi)
-                if provider_model:
-                    # Convert to EnrichedProvider
-                    provider = self._model_to_enriched(provider_model)
-                    # Re-assess quality
-                    provider = await self.orchestrator.quality_assurance_agent.assess_quality(provider)
-                    providers.append(provider)
+            # One IN (...) query per chunk, projected rows rather than ORM models
+            async for found in repo.iter_many_by_npi(provider_ids, fields=ENRICHED_PROVIDER_FIELDS):
+                loaded.extend(self._model_to_enriched(row) for row in found.values())
+        
+        # Re-assess quality
+        providers = []
+        for provider in loaded:
+            providers.append(await self.orchestrator.assess_quality(provider))
         
         # Generate report
         batch_id = str(uuid.uuid4())
@@ -55,13 +55,13 @@ class QualityAssessmentWorkflow:
             providers=providers,
         )
         
-        report = await self.orchestrator.directory_management_agent.generate_report(batch, providers)
+        report = await self.orchestrator.generate_report(batch, providers)
         
         logger.info("quality_assessment_complete", report_id=report.report_id)
         return report
     
     def _model_to_enriched(self, model) -> EnrichedProvider:
-        """Convert database model to EnrichedProvider."""
+        """Convert a database model or projected row to EnrichedProvider."""
         from ...domain.enriched_entities import (
             EnrichedProvider, ProviderCredential, ProviderLicense, 
             ValidationStatus, DataElementConfidence, DataSource
@@ -1,10 +1,12 @@
+import asyncio
 import hashlib
 import json
-from typing import List
+from typing import List, Optional, Tuple
 from ...domain.entities import SearchQuery, Provider, ProviderSearchResult
 from ...infrastructure.nppes import client as nppes_client
 from ...infrastructure.searxng import client as searxng_client
 from ...infrastructure.cache import cache
+from ...infrastructure.settings import settings
 from ...infrastructure.logging import get_logger
 
 
@@ -18,14 +20,65 @@ def _cache_key(query: SearchQuery) -> str:
     return f"provider_search:{hashlib.md5(query_json.encode()).hexdigest()}"
 
 
+async def _lookup_website(display_name: str, address: dict) -> Optional[str]:
+    """Find a provider's website via SearXNG; enrichment failures yield None."""
+    try:
+        web_results = await searxng_client.search(
+            f"{display_name} {address.get('city','')} {address.get('state','')}",
+            categories="general",
+            num_results=3,
+        )
+        if web_results:
+            return web_results[0].get("url")
+    except Exception as e:
+        # Web enrichment is optional, log but don't fail the request
+        logger.debug("web_enrichment_failed", provider=display_name, error=str(e))
+    return None
+
+
+async def _enrich_websites(entries: List[Tuple[str, dict]]) -> List[Optional[str]]:
+    """Look up websites concurrently, returned in the same order as ``entries``.
+
+    At most ``search_enrichment_concurrency`` lookups run at once. Lookups still
+    running when ``search_enrichment_deadline_seconds`` elapses are cancelled and
+    their providers get ``website=None``.
+    """
+    semaphore = asyncio.Semaphore(max(1, settings.search_enrichment_concurrency))
+
+    async def bounded(display_name: str, address: dict) -> Optional[str]:
+        if not display_name:
+            return None
+        async with semaphore:
+            return await _lookup_website(display_name, address)
+
+    tasks = [asyncio.create_task(bounded(name, address)) for name, address in entries]
+    if not tasks:
+        return []
+
+    done, pending = await asyncio.wait(tasks, timeout=settings.search_enrichment_deadline_seconds)
+    if pending:
+        logger.info("web_enrichment_deadline_exceeded", pending=len(pending), total=len(tasks))
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    return [
+        task.result() if task in done and not task.cancelled() and task.exception() is None else None
+        for task in tasks
+    ]
+
+
 async def execute(query: SearchQuery) -> ProviderSearchResult:
-    # Check cache
-    cache_key = _cache_key(query)
-    cached = cache.get(cache_key)
-    if cached is not None:
-        logger.info("cache_hit", cache_key=cache_key)
-        return cached
-    
+    # Identical concurrent searches share one NPPES + enrichment run. Past the
+    # soft TTL the cached result is served while one background refresh runs.
+    return await cache.get_or_load(
+        _cache_key(query),
+        lambda: _search(query),
+        stale_ttl_seconds=settings.search_cache_stale_ttl_seconds,
+    )
+
+
+async def _search(query: SearchQuery) -> ProviderSearchResult:
     logger.info("search_started", query=query.model_dump())
     nppes_results = await nppes_client.search(
         first_name=query.first_name,
@@ -39,6 +92,7 @@ async def execute(query: SearchQuery) -> ProviderSearchResult:
     )
 
     providers: List[Provider] = []
+    lookups: List[Tuple[str, dict]] = []
     for item in nppes_results:
         basic = item.get("basic", {})
         addresses = item.get("addresses", [])
@@ -48,21 +102,7 @@ async def execute(query: SearchQuery) -> ProviderSearchResult:
         last = basic.get("last_name")
         org = basic.get("organization_name")
         display_name = " ".join([p for p in [first, last] if p]) if (first or last) else (org or "")
-
-        website = None
-        if display_name:
-            try:
-                web_results = await searxng_client.search(
-                    f"{display_name} {address.get('city','')} {address.get('state','')}",
-                    categories="general",
-                    num_results=3,
-                )
-                if web_results:
-                    website = web_results[0].get("url")
-            except Exception as e:
-                # Web enrichment is optional, log but don't fail the request
-                logger.debug("web_enrichment_failed", provider=display_name, error=str(e))
-                website = None
+        lookups.append((display_name, address))
 
         providers.append(
             Provider(
@@ -75,15 +115,17 @@ async def execute(query: SearchQuery) -> ProviderSearchResult:
                 state=address.get("state"),
                 postal_code=address.get("postal_code"),
                 taxonomy=taxonomy.get("desc"),
-                website=website,
+                website=None,
                 confidence=0.0,
             )
         )
 
+    # Web enrichment fans out concurrently; results line up with NPPES order
+    websites = await _enrich_websites(lookups)
+    for provider, website in zip(providers, websites):
+        provider.website = website
+
     result = ProviderSearchResult(query=query, providers=providers)
-    
-    # Cache result
-    cache.set(cache_key, result)
     logger.info("search_completed", providers_count=len(providers))
     
     return result
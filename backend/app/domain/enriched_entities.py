@@ -18,6 +18,7 @@ class DataSource(str, Enum):
     """Data source types."""
     NPPES = "nppes"
     WEB_SCRAPING = "web_scraping"
+    WEB_SEARCH = "web_search"
     STATE_LICENSING = "state_licensing"
     GOOGLE_MAPS = "google_maps"
     PROVIDER_WEBSITE = "provider_website"
@@ -116,6 +117,7 @@ class ValidationBatch(BaseModel):
     validated_count: int = 0
     discrepancy_count: int = 0
     requires_review_count: int = 0
+    llm_skipped_count: int = 0
     started_at: datetime
     completed_at: Optional[datetime] = None
     status: str = "pending"
@@ -1,41 +1,334 @@
+import asyncio
+import pickle
+import sys
 import time
-from typing import Any, Callable, Optional
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional
 from .settings import settings
+from .disk_cache import SQLiteCacheStore
+from .single_flight import SingleFlight
+from .logging import get_logger
+
+
+logger = get_logger(__name__)
+
+
+def _namespace(key: str) -> str:
+    """Keys are ``<namespace>:<digest>``; stats are grouped by the prefix."""
+    return key.split(":", 1)[0] if ":" in key else "default"
+
+
+def _approx_size(value: Any) -> int:
+    """Rough in-memory footprint of a cached value, in bytes."""
+    if hasattr(value, "model_dump_json"):
+        return len(value.model_dump_json())
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
 
 
 class InMemoryTTLCache:
-    def __init__(self, default_ttl_seconds: int | None = None) -> None:
-        self._store: dict[str, tuple[float, Any]] = {}
+    """LRU cache with per-entry TTLs, bounded by entry count and approximate bytes.
+
+    With a ``backing_store`` the cache becomes two-tier: ``aget`` reads through
+    to disk on a memory miss, and ``set`` queues a write-behind that a
+    background task flushes in batches.
+
+    Entries may carry a stale window (``stale_ttl_seconds``): after ``ttl_seconds``
+    the value is stale but still served by ``get_or_load`` while one background
+    task refreshes it; after the stale window it is gone.
+    """
+
+    def __init__(
+        self,
+        default_ttl_seconds: int | None = None,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        backing_store: Optional[SQLiteCacheStore] = None,
+    ) -> None:
+        # key -> (expires_at, value, size, stale_at); ordered least- to most-recently used
+        self._store: "OrderedDict[str, tuple[float, Any, int, float]]" = OrderedDict()
         self._default_ttl = default_ttl_seconds or settings.cache_ttl_seconds
+        self._max_entries = max_entries or settings.cache_max_entries
+        self._max_bytes = max_bytes or settings.cache_max_bytes
+        self._bytes = 0
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {
+                "hits": 0, "misses": 0, "disk_hits": 0, "stale_hits": 0, "revalidations": 0,
+                "evictions": 0, "expirations": 0, "entries": 0, "bytes": 0,
+            }
+        )
+        self._sweeper: Optional[asyncio.Task] = None
+        self._backing_store = backing_store
+        # key -> (expires_at, stale_at, value) awaiting write-behind; expires_at None marks a delete
+        self._pending_writes: "OrderedDict[str, tuple[Optional[float], Optional[float], Any]]" = OrderedDict()
+        self._flusher: Optional[asyncio.Task] = None
+        self._flights = SingleFlight()
+        self._revalidations: Dict[str, asyncio.Task] = {}
 
     def get(self, key: str) -> Any:
+        stats = self._stats[_namespace(key)]
         record = self._store.get(key)
         if not record:
+            stats["misses"] += 1
             return None
-        expires_at, value = record
+        expires_at, value, _, _ = record
         if expires_at < time.time():
-            self._store.pop(key, None)
+            self._remove(key)
+            stats["expirations"] += 1
+            stats["misses"] += 1
             return None
+        self._store.move_to_end(key)
+        stats["hits"] += 1
         return value
 
-    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+    def is_stale(self, key: str) -> bool:
+        record = self._store.get(key)
+        return record is not None and record[3] <= time.time()
+
+    async def aget(self, key: str) -> Any:
+        """Like ``get`` but reads through to the disk tier on a memory miss."""
+        value = self.get(key)
+        if value is not None or self._backing_store is None:
+            return value
+        pending = self._pending_writes.get(key)
+        if pending is not None:
+            expires_at, _, value = pending
+            return value if expires_at is not None and expires_at >= time.time() else None
+        try:
+            record = await asyncio.to_thread(self._backing_store.get, key)
+        except Exception as e:
+            logger.warning("disk_cache_read_failed", key=key, error=str(e))
+            return None
+        if record is None:
+            return None
+        expires_at, stale_at, value = record
+        self._set_local(key, value, expires_at, stale_at)
+        self._stats[_namespace(key)]["disk_hits"] += 1
+        return value
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: Optional[int] = None,
+        stale_ttl_seconds: Optional[int] = None,
+    ) -> None:
         ttl = ttl_seconds or self._default_ttl
-        self._store[key] = (time.time() + ttl, value)
+        stale_at = time.time() + ttl
+        expires_at = stale_at + (stale_ttl_seconds or 0)
+        self._set_local(key, value, expires_at, stale_at)
+        self._queue_write(key, expires_at, stale_at, value)
+
+    def _set_local(self, key: str, value: Any, expires_at: float, stale_at: float) -> None:
+        size = _approx_size(value)
+        self._remove(key)
+        if size > self._max_bytes:
+            logger.warning("cache_value_too_large", key=key, size=size, max_bytes=self._max_bytes)
+            return
+        self._store[key] = (expires_at, value, size, stale_at)
+        self._bytes += size
+        stats = self._stats[_namespace(key)]
+        stats["entries"] += 1
+        stats["bytes"] += size
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        self._remove(key)
+        self._queue_write(key, None, None, None)
+
+    def _queue_write(self, key: str, expires_at: Optional[float], stale_at: Optional[float], value: Any) -> None:
+        if self._backing_store is None:
+            return
+        self._pending_writes.pop(key, None)
+        self._pending_writes[key] = (expires_at, stale_at, value)
+        # Bound the backlog if the disk tier falls behind; oldest writes are dropped
+        while len(self._pending_writes) > self._max_entries:
+            self._pending_writes.popitem(last=False)
+
+    async def flush(self) -> int:
+        """Write queued entries to the disk tier in one batch."""
+        if self._backing_store is None or not self._pending_writes:
+            return 0
+        batch = self._pending_writes
+        self._pending_writes = OrderedDict()
+        entries = [
+            (key, _namespace(key), expires_at, stale_at, value)
+            for key, (expires_at, stale_at, value) in batch.items()
+        ]
+        try:
+            return await asyncio.to_thread(self._backing_store.write_many, entries)
+        except Exception as e:
+            logger.warning("disk_cache_flush_failed", entries=len(entries), error=str(e))
+            # Re-queue unless newer writes for the same keys arrived meanwhile
+            for key, pending in batch.items():
+                self._pending_writes.setdefault(key, pending)
+            return 0
 
-    def cached(self, key_builder: Callable[..., str], ttl_seconds: Optional[int] = None):
+    async def _flush_forever(self, interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await self.flush()
+
+    def _remove(self, key: str) -> bool:
+        record = self._store.pop(key, None)
+        if record is None:
+            return False
+        size = record[2]
+        self._bytes -= size
+        stats = self._stats[_namespace(key)]
+        stats["entries"] -= 1
+        stats["bytes"] -= size
+        return True
+
+    def _evict(self) -> None:
+        """Drop least-recently-used entries until both bounds hold."""
+        while self._store and (len(self._store) > self._max_entries or self._bytes > self._max_bytes):
+            key = next(iter(self._store))
+            self._remove(key)
+            self._stats[_namespace(key)]["evictions"] += 1
+
+    def sweep_expired(self) -> int:
+        """Remove every expired entry; returns how many were dropped."""
+        now = time.time()
+        expired = [key for key, record in self._store.items() if record[0] < now]
+        for key in expired:
+            self._remove(key)
+            self._stats[_namespace(key)]["expirations"] += 1
+        return len(expired)
+
+    async def _sweep_forever(self, interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            removed = self.sweep_expired()
+            if removed:
+                logger.debug("cache_swept", removed=removed, entries=len(self._store))
+            if self._backing_store is not None:
+                try:
+                    await asyncio.to_thread(self._backing_store.purge_expired)
+                except Exception as e:
+                    logger.warning("disk_cache_purge_failed", error=str(e))
+
+    def start(self) -> None:
+        """Start the expiry sweeper and, with a disk tier, the write-behind flusher."""
+        if not self._sweeper or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_forever(settings.cache_sweep_interval_seconds))
+        if self._backing_store is not None and (not self._flusher or self._flusher.done()):
+            self._flusher = asyncio.create_task(self._flush_forever(settings.cache_disk_flush_interval_seconds))
+
+    async def stop(self) -> None:
+        """Cancel background tasks and flush outstanding writes to disk."""
+        for task in (self._sweeper, self._flusher, *self._revalidations.values()):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._sweeper = None
+        self._flusher = None
+        self._revalidations.clear()
+        await self.flush()
+        if self._backing_store is not None:
+            self._backing_store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Overall size plus hit/miss/eviction counters per key namespace."""
+        return {
+            "entries": len(self._store),
+            "bytes": self._bytes,
+            "max_entries": self._max_entries,
+            "max_bytes": self._max_bytes,
+            "pending_disk_writes": len(self._pending_writes),
+            "revalidations_in_flight": len(self._revalidations),
+            "single_flight": self._flights.stats(),
+            "namespaces": {name: dict(counters) for name, counters in self._stats.items()},
+        }
+
+    async def load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl_seconds: Optional[int] = None,
+        stale_ttl_seconds: Optional[int] = None,
+    ) -> Any:
+        """Run ``loader`` once for all concurrent callers of ``key`` and cache its result.
+
+        Failures propagate to every waiting caller and nothing is stored.
+        """
+        async def run() -> Any:
+            # A previous flight may have filled the key while this caller was checking disk
+            value = self.get(key)
+            if value is not None and not self.is_stale(key):
+                return value
+            value = await loader()
+            if value is not None:
+                self.set(key, value, ttl_seconds, stale_ttl_seconds)
+            return value
+
+        return await self._flights.do(key, run)
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl_seconds: Optional[int] = None,
+        stale_ttl_seconds: Optional[int] = None,
+    ) -> Any:
+        """Return the cached value, loading it on a miss.
+
+        A stale value (past ``ttl_seconds`` but inside ``stale_ttl_seconds``) is
+        returned immediately and refreshed by a single background task.
+        """
+        value = await self.aget(key)
+        if value is None:
+            return await self.load(key, loader, ttl_seconds, stale_ttl_seconds)
+        if self.is_stale(key):
+            self._stats[_namespace(key)]["stale_hits"] += 1
+            self._revalidate(key, loader, ttl_seconds, stale_ttl_seconds)
+        return value
+
+    def _revalidate(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl_seconds: Optional[int],
+        stale_ttl_seconds: Optional[int],
+    ) -> None:
+        if key in self._revalidations:
+            return
+        self._stats[_namespace(key)]["revalidations"] += 1
+        task = asyncio.create_task(self.load(key, loader, ttl_seconds, stale_ttl_seconds))
+        self._revalidations[key] = task
+
+        def done(task: asyncio.Task) -> None:
+            self._revalidations.pop(key, None)
+            if not task.cancelled() and task.exception() is not None:
+                # The stale value keeps being served until its hard expiry
+                logger.warning("cache_revalidation_failed", key=key, error=str(task.exception()))
+
+        task.add_done_callback(done)
+
+    def cached(
+        self,
+        key_builder: Callable[..., str],
+        ttl_seconds: Optional[int] = None,
+        stale_ttl_seconds: Optional[int] = None,
+    ):
         def decorator(func: Callable[..., Any]):
             async def wrapper(*args, **kwargs):
                 key = key_builder(*args, **kwargs)
-                cached_value = self.get(key)
-                if cached_value is not None:
-                    return cached_value
-                value = await func(*args, **kwargs)
-                self.set(key, value, ttl_seconds)
-                return value
+                return await self.get_or_load(key, lambda: func(*args, **kwargs), ttl_seconds, stale_ttl_seconds)
             return wrapper
         return decorator
 
 
-cache = InMemoryTTLCache()
+def _default_backing_store() -> Optional[SQLiteCacheStore]:
+    if not settings.cache_disk_enabled:
+        return None
+    return SQLiteCacheStore(settings.cache_disk_path, compress_level=settings.cache_disk_compress_level)
 
 
+cache = InMemoryTTLCache(backing_store=_default_backing_store())
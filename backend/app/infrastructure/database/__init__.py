@@ -1,16 +1,28 @@
 """Database infrastructure."""
-from .database import get_db, init_db, Database
-from .models import Base, ProviderModel, ValidationRecordModel, BatchJobModel, QualityMetricModel, ReviewQueueModel
+from .database import get_db, init_db, close_db, Database
+from .models import (
+    Base,
+    ProviderModel,
+    ValidationRecordModel,
+    BatchJobModel,
+    QualityMetricModel,
+    QualityMetricRollupModel,
+    ProviderAggregateModel,
+    ReviewQueueModel,
+)
 
 __all__ = [
     "get_db",
     "init_db",
+    "close_db",
     "Database",
     "Base",
     "ProviderModel",
     "ValidationRecordModel",
     "BatchJobModel",
     "QualityMetricModel",
+    "QualityMetricRollupModel",
+    "ProviderAggregateModel",
     "ReviewQueueModel",
 ]
 
@@ -1,39 +1,161 @@
 """Database connection and session management."""
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Awaitable, Callable, List, Optional, Tuple
+import asyncio
 import os
+import time
 from ..settings import settings
+from ..logging import get_logger
+
+
+logger = get_logger(__name__)
+
+WriteJob = Callable[[AsyncSession], Awaitable[Any]]
+
+# The ``get_session`` session the current task is inside, if any
+_open_session: ContextVar[Optional[AsyncSession]] = ContextVar("open_session", default=None)
+
+
+def _sqlite_pragmas(read_only: bool) -> List[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size_bytes}",
+        # Negative values are KiB rather than pages
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    else:
+        # journal_mode is persistent in the file; the writer sets it for everyone
+        pragmas += ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"]
+    return pragmas
+
+
+def _configure_sqlite(engine: AsyncEngine, read_only: bool) -> None:
+    pragmas = _sqlite_pragmas(read_only)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself so SAVEPOINTs (group commit) work
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def on_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if not read_only else "BEGIN")
+
+
+def dialect_insert(session: AsyncSession):
+    """The dialect-specific ``insert`` that supports ``on_conflict_do_update``."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert
+    if dialect == "postgresql":
+        return postgresql.insert
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
+
+
+def _add_missing_columns(connection, metadata) -> None:
+    """Add nullable columns introduced after a table was created."""
+    inspector = inspect(connection)
+    for table in metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+            logger.info("db_column_added", table=table.name, column=column.name)
+
+
+def _create_missing_indexes(connection, metadata) -> None:
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with connection.begin_nested():
+                    index.create(connection, checkfirst=True)
+            except Exception as e:
+                # e.g. a unique index over rows written before it existed
+                logger.warning("db_index_create_failed", index=index.name, error=str(e))
 
 
 class Database:
-    """Database connection manager."""
-    
-    def __init__(self):
+    """Database connection manager.
+
+    In the SQLite production profile there is exactly one writer connection.
+    ``write`` batches jobs onto it (group commit) and ``get_session`` checks it
+    out for multi-statement writes, so writers queue for the connection instead
+    of contending for the file lock. ``get_session`` is for writing only; reads
+    go through ``get_read_session``, a pool of read-only connections that start
+    plain (deferred) transactions. With WAL, readers never wait for the writer.
+    ``write`` refuses to run while the calling task has a ``get_session``
+    transaction open, since it would wait for its own connection.
+    """
+
+    def __init__(self, db_url: Optional[str] = None):
         # Use SQLite for simplicity, can be switched to PostgreSQL
-        db_url = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./providersync.db")
+        db_url = db_url or os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./providersync.db")
+        self.read_engine: Optional[AsyncEngine] = None
         if db_url.startswith("sqlite"):
-            # Ensure async SQLite support
-            self.engine = create_async_engine(
-                db_url,
-                echo=False,
-                connect_args={"check_same_thread": False} if "aiosqlite" in db_url else {},
-            )
+            connect_args = {"check_same_thread": False} if "aiosqlite" in db_url else {}
+            if settings.sqlite_production_mode and ":memory:" not in db_url:
+                # aiosqlite defaults to NullPool; a queue pool of one is the single writer
+                self.engine = create_async_engine(
+                    db_url,
+                    echo=False,
+                    connect_args=connect_args,
+                    poolclass=AsyncAdaptedQueuePool,
+                    pool_size=1,
+                    max_overflow=0,
+                )
+                _configure_sqlite(self.engine, read_only=False)
+                self.read_engine = create_async_engine(
+                    db_url,
+                    echo=False,
+                    connect_args=connect_args,
+                    poolclass=AsyncAdaptedQueuePool,
+                    pool_size=settings.sqlite_read_pool_size,
+                    max_overflow=0,
+                )
+                _configure_sqlite(self.read_engine, read_only=True)
+            else:
+                # Ensure async SQLite support
+                self.engine = create_async_engine(db_url, echo=False, connect_args=connect_args)
         else:
             self.engine = create_async_engine(db_url, echo=False)
-        
+
         self.async_session = async_sessionmaker(
             self.engine,
             class_=AsyncSession,
             expire_on_commit=False,
         )
-    
+        self.read_session = async_sessionmaker(
+            self.read_engine or self.engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+        self._write_queue: Optional["asyncio.Queue[Tuple[WriteJob, asyncio.Future]]"] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._write_stats = {"jobs": 0, "commits": 0, "failed_jobs": 0}
+
     @asynccontextmanager
     async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
-        """Get database session."""
+        """Get a session on the writer connection, committed on exit.
+
+        Use it for writes only and keep it short: group commits wait while it
+        is open. Queries belong in ``get_read_session``.
+        """
         async with self.async_session() as session:
+            token = _open_session.set(session)
             try:
                 yield session
                 await session.commit()
@@ -41,13 +163,123 @@ class Database:
                 await session.rollback()
                 raise
             finally:
+                _open_session.reset(token)
+                await session.close()
+
+    @asynccontextmanager
+    async def get_read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """Get a session for queries only; it is never committed."""
+        async with self.read_session() as session:
+            try:
+                yield session
+            finally:
+                # close() ends the transaction without expiring loaded objects
                 await session.close()
-    
+
+    async def write(self, job: WriteJob) -> Any:
+        """Run ``job(session)`` on the writer connection and return its result.
+
+        Jobs queued close together are committed in one transaction. Each job
+        runs in its own SAVEPOINT, so a failing job is rolled back and raises
+        to its caller without affecting the others in the batch.
+
+        Raises ``RuntimeError`` when called inside a ``get_session``
+        transaction: the batch needs the connection that session holds.
+        """
+        session = _open_session.get()
+        if session is not None and session.in_transaction():
+            raise RuntimeError("Database.write() called inside an open get_session() transaction")
+        if self._writer is None or self._writer.done():
+            self._write_queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._write_forever())
+        future = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((job, future))
+        return await future
+
+    async def _write_forever(self) -> None:
+        queue = self._write_queue
+        stopping = False
+        while not stopping:
+            batch = [await queue.get()]
+            deadline = time.monotonic() + settings.db_group_commit_window_ms / 1000
+            while len(batch) < settings.db_group_commit_max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # A None job is the shutdown marker queued by close()
+            stopping = any(job is None for job, _ in batch)
+            batch = [item for item in batch if item[0] is not None]
+            if batch:
+                await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch: List[Tuple[WriteJob, asyncio.Future]]) -> None:
+        results: List[Tuple[asyncio.Future, Any]] = []
+        try:
+            async with self.async_session() as session:
+                async with session.begin():
+                    for job, future in batch:
+                        if future.cancelled():
+                            continue
+                        try:
+                            async with session.begin_nested():
+                                results.append((future, await job(session)))
+                        except Exception as e:
+                            self._write_stats["failed_jobs"] += 1
+                            if not future.done():
+                                future.set_exception(e)
+        except Exception as e:
+            logger.error("group_commit_failed", jobs=len(batch), error=str(e))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self._write_stats["jobs"] += len(batch)
+        self._write_stats["commits"] += 1
+        for future, result in results:
+            if not future.done():
+                future.set_result(result)
+
+    def write_stats(self) -> dict:
+        return {
+            **self._write_stats,
+            "queued": self._write_queue.qsize() if self._write_queue else 0,
+        }
+
     async def init_db(self):
         """Initialize database tables."""
         from .models import Base
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            # create_all skips columns and indexes on tables that already exist
+            await conn.run_sync(_add_missing_columns, Base.metadata)
+            await conn.run_sync(_create_missing_indexes, Base.metadata)
+        await self._backfill_provider_aggregates()
+
+    async def _backfill_provider_aggregates(self) -> None:
+        """Build directory aggregates for providers stored before they existed."""
+        from .models import ProviderAggregateModel, ProviderModel
+        from ..repositories import provider_aggregates
+        async with self.get_session() as session:
+            if await session.scalar(select(ProviderAggregateModel.key).limit(1)) is not None:
+                return
+            if await session.scalar(select(ProviderModel.id).limit(1)) is None:
+                return
+            await provider_aggregates.rebuild(session)
+            logger.info("provider_aggregates_backfilled")
+
+    async def close(self):
+        """Finish queued writes and release all connections."""
+        if self._writer is not None and not self._writer.done():
+            await self._write_queue.put((None, None))
+            await self._writer
+        self._writer = None
+        await self.engine.dispose()
+        if self.read_engine is not None:
+            await self.read_engine.dispose()
 
 
 # Global database instance
@@ -63,3 +295,7 @@ async def init_db():
     """Initialize database."""
     await _db.init_db()
 
+
+async def close_db():
+    """Flush queued writes and close connections."""
+    await _db.close()
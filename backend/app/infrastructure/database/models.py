@@ -1,5 +1,5 @@
 """SQLAlchemy database models."""
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, Text, JSON, ForeignKey, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -56,6 +56,8 @@ class ProviderModel(Base):
     data_element_confidences_json = Column(JSON, default=list)
     last_validated = Column(DateTime)
     validation_notes_json = Column(JSON, default=list)
+    # Latest validation record version; kept here so archiving records never reuses a version
+    validation_version = Column(Integer)
     
     # Flags
     requires_manual_review = Column(Boolean, default=False)
@@ -69,6 +71,18 @@ class ProviderModel(Base):
     # Relationships
     validations = relationship("ValidationRecordModel", back_populates="provider")
 
+    __table_args__ = (
+        # Review queue keyset pagination: partial, so only flagged providers are indexed
+        Index(
+            "ix_providers_review_queue",
+            "requires_manual_review",
+            review_priority.desc(),
+            "id",
+            sqlite_where=requires_manual_review == True,
+            postgresql_where=requires_manual_review == True,
+        ),
+    )
+
 
 class ValidationRecordModel(Base):
     """Validation record tracking."""
@@ -82,18 +96,27 @@ class ValidationRecordModel(Base):
     status = Column(String)
     confidence_score = Column(Float)
     
+    # Legacy rows hold full snapshots; new rows hold a delta (see repositories.validation_history)
     data_before = Column(JSON)
     data_after = Column(JSON)
+    version = Column(Integer)  # per provider, starting at 1
+    delta_json = Column(JSON)
+    delta_blob = Column(LargeBinary)  # zlib-compressed delta when large
     discrepancies = Column(JSON, default=list)
     
     validated_by = Column(String)  # "agent_name" or "human"
-    validated_at = Column(DateTime, default=datetime.utcnow)
+    validated_at = Column(DateTime, default=datetime.utcnow, index=True)  # retention scans by age
     
     notes = Column(Text)
     
     # Relationships
     provider = relationship("ProviderModel", back_populates="validations")
 
+    __table_args__ = (
+        # One record per version; legacy rows (NULL version) are exempt
+        Index("ux_validation_records_provider_version", "provider_id", "version", unique=True),
+    )
+
 
 class BatchJobModel(Base):
     """Batch processing job."""
@@ -131,6 +154,40 @@ class QualityMetricModel(Base):
     metadata_json = Column(JSON)
 
 
+class QualityMetricRollupModel(Base):
+    """Hourly or daily aggregate of quality metric points past raw retention."""
+    __tablename__ = "quality_metric_rollups"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    metric_name = Column(String, nullable=False)
+    granularity = Column(String, nullable=False)  # "hour", "day"
+    bucket_start = Column(DateTime, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Float, nullable=False, default=0.0)
+    value_min = Column(Float)
+    value_max = Column(Float)
+    threshold = Column(Float)
+    
+    __table_args__ = (
+        UniqueConstraint("metric_name", "granularity", "bucket_start", name="uq_quality_metric_rollups_bucket"),
+        Index("ix_quality_metric_rollups_bucket", "granularity", "bucket_start"),
+    )
+
+
+class ProviderAggregateModel(Base):
+    """Running provider count and confidence sum per breakdown, kept by ProviderRepository.
+
+    ``dimension`` is "directory" (key "all"), "state", "taxonomy", "status" or
+    "confidence" (key is the histogram bucket's lower bound, e.g. "0.7").
+    """
+    __tablename__ = "provider_aggregates"
+    
+    dimension = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+
+
 class ReviewQueueModel(Base):
     """Priority queue for manual review."""
     __tablename__ = "review_queue"
@@ -0,0 +1,124 @@
+"""SQLite-backed second cache tier shared by workers on the same host."""
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Iterable, Optional, Tuple
+from .logging import get_logger
+
+
+logger = get_logger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    stale_at REAL,
+    value BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at);
+"""
+
+
+class SQLiteCacheStore:
+    """Persistent key/value store with TTLs and zlib-compressed pickled values.
+
+    Calls are blocking; async callers run them through ``asyncio.to_thread``.
+    WAL mode lets several uvicorn workers read while one of them writes.
+    """
+
+    def __init__(self, path: str, compress_level: int = 6) -> None:
+        self.path = path
+        self.compress_level = compress_level
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cache_entries)")}
+            if "stale_at" not in columns:
+                # Files written before stale-while-revalidate support
+                conn.execute("ALTER TABLE cache_entries ADD COLUMN stale_at REAL")
+            self._conn = conn
+        return self._conn
+
+    def _encode(self, value: Any) -> bytes:
+        return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.compress_level)
+
+    @staticmethod
+    def _decode(blob: bytes) -> Any:
+        return pickle.loads(zlib.decompress(blob))
+
+    def get(self, key: str) -> Optional[Tuple[float, float, Any]]:
+        """Return ``(expires_at, stale_at, value)`` for a live entry, else None."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT expires_at, stale_at, value FROM cache_entries WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        expires_at, stale_at, blob = row
+        try:
+            return expires_at, stale_at if stale_at is not None else expires_at, self._decode(blob)
+        except Exception as e:
+            logger.warning("disk_cache_decode_failed", key=key, error=str(e))
+            return None
+
+    def write_many(self, entries: Iterable[Tuple[str, str, Optional[float], Optional[float], Any]]) -> int:
+        """Upsert ``(key, namespace, expires_at, stale_at, value)`` rows in one transaction.
+
+        An ``expires_at`` of None deletes the key.
+        """
+        upserts = []
+        deletes = []
+        for key, namespace, expires_at, stale_at, value in entries:
+            if expires_at is None:
+                deletes.append((key,))
+                continue
+            try:
+                upserts.append((key, namespace, expires_at, stale_at, self._encode(value)))
+            except Exception as e:
+                logger.debug("disk_cache_encode_failed", key=key, error=str(e))
+        if not upserts and not deletes:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if deletes:
+                    conn.executemany("DELETE FROM cache_entries WHERE key = ?", deletes)
+                if upserts:
+                    conn.executemany(
+                        "INSERT INTO cache_entries (key, namespace, expires_at, stale_at, value) "
+                        "VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET namespace = excluded.namespace, "
+                        "expires_at = excluded.expires_at, stale_at = excluded.stale_at, "
+                        "value = excluded.value",
+                        upserts,
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(upserts) + len(deletes)
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._connection().execute(
+                "DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),)
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
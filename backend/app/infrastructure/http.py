@@ -1,13 +1,121 @@
+import json
+from collections import defaultdict
+from typing import Any, Dict
+from urllib.parse import urlsplit
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_not_exception_type
 from .settings import settings
+from .logging import get_logger
+from .single_flight import SingleFlight
 
 
+logger = get_logger(__name__)
+
 _timeout = httpx.Timeout(settings.request_timeout_seconds)
 
+# Requests to hosts that are not a configured upstream (e.g. scraped provider
+# websites) share a single pool instead of getting a client each.
+_SHARED_POOL = "shared"
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_request_counts: Dict[str, int] = defaultdict(int)
+_error_counts: Dict[str, int] = defaultdict(int)
+_get_flights = SingleFlight()
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(str(url))
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _upstream_origins() -> set[str]:
+    return {_origin(settings.nppes_base_url), _origin(settings.searxng_url)}
+
+
+def _http2_available() -> bool:
+    if not settings.http2_enabled:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("http2_unavailable", message="h2 package not installed, falling back to HTTP/1.1")
+        return False
+    return True
+
+
+def _new_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections_per_host,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+    )
+    return httpx.AsyncClient(timeout=_timeout, limits=limits, http2=_http2_available())
+
+
+def _pool_key(url: str) -> str:
+    origin = _origin(url)
+    return origin if origin in _upstream_origins() else _SHARED_POOL
+
+
+def _client(url: str) -> tuple[str, httpx.AsyncClient]:
+    """Return the long-lived client for ``url``'s host, creating it on first use."""
+    key = _pool_key(url)
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        client = _new_client()
+        _clients[key] = client
+    return key, client
+
+
+async def init_http() -> None:
+    """Create pooled clients for the configured upstream hosts."""
+    for key in [*_upstream_origins(), _SHARED_POOL]:
+        if key not in _clients or _clients[key].is_closed:
+            _clients[key] = _new_client()
+    logger.info("http_pools_initialized", pools=sorted(_clients))
+
 
-def _client() -> httpx.AsyncClient:
-    return httpx.AsyncClient(timeout=_timeout)
+async def close_http() -> None:
+    """Close all pooled clients and their keep-alive connections."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+    logger.info("http_pools_closed", count=len(clients))
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-pool request counters and connection usage."""
+    stats: Dict[str, Dict[str, Any]] = {}
+    for key, client in _clients.items():
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", None) or [])
+        stats[key] = {
+            "requests": _request_counts[key],
+            "errors": _error_counts[key],
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+            "max_connections": settings.http_max_connections_per_host,
+            "max_keepalive_connections": settings.http_max_keepalive_connections,
+            "closed": client.is_closed,
+        }
+    return stats
+
+
+def single_flight_stats() -> Dict[str, Any]:
+    return _get_flights.stats()
+
+
+async def _send(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    key, client = _client(url)
+    _request_counts[key] += 1
+    try:
+        resp = await client.request(method, url, **kwargs)
+        resp.raise_for_status()
+        return resp
+    except Exception:
+        _error_counts[key] += 1
+        raise
 
 
 @retry(
@@ -16,11 +124,16 @@ def _client() -> httpx.AsyncClient:
     retry=retry_if_not_exception_type((httpx.HTTPStatusError,)),  # Don't retry on HTTP errors (like 429)
     reraise=True,
 )
+async def _get_with_retry(url: str, params: dict | None = None, headers: dict | None = None) -> httpx.Response:
+    return await _send("GET", url, params=params, headers=headers)
+
+
 async def get(url: str, params: dict | None = None, headers: dict | None = None) -> httpx.Response:
-    async with _client() as client:
-        resp = await client.get(url, params=params, headers=headers)
-        resp.raise_for_status()
-        return resp
+    """GET with retries; identical concurrent GETs share one upstream request."""
+    if not settings.http_single_flight_enabled:
+        return await _get_with_retry(url, params=params, headers=headers)
+    key = json.dumps([url, params or {}, headers or {}], sort_keys=True, default=str)
+    return await _get_flights.do(key, lambda: _get_with_retry(url, params=params, headers=headers))
 
 
 @retry(
@@ -30,9 +143,4 @@ async def get(url: str, params: dict | None = None, headers: dict | None = None)
     reraise=True,
 )
 async def post(url: str, json: dict | None = None, headers: dict | None = None) -> httpx.Response:
-    async with _client() as client:
-        resp = await client.post(url, json=json, headers=headers)
-        resp.raise_for_status()
-        return resp
-
-
+    return await _send("POST", url, json=json, headers=headers)
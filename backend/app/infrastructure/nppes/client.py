@@ -1,7 +1,14 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
 from urllib.parse import urljoin
 from ..settings import settings
 from ..http import get
+from ..cache import cache
+from ..logging import get_logger
+from .local_store import local_store
+
+
+logger = get_logger(__name__)
 
 
 # NOTE: to avoid circular import name shadowing, we import settings via alias module below.
@@ -16,8 +23,11 @@ def _build_params(
     postal_code: Optional[str],
     taxonomy: Optional[str],
     limit: int,
+    skip: int = 0,
 ) -> Dict[str, Any]:
     params: Dict[str, Any] = {"version": "2.1", "limit": limit}
+    if skip:
+        params["skip"] = skip
     if first_name:
         params["first_name"] = first_name
     if last_name:
@@ -35,6 +45,13 @@ def _build_params(
     return params
 
 
+def _use_local_store() -> bool:
+    source = settings.nppes_source.lower()
+    if source == "local":
+        return True
+    return source == "auto" and local_store.available()
+
+
 async def search(
     *,
     first_name: Optional[str] = None,
@@ -45,8 +62,22 @@ async def search(
     postal_code: Optional[str] = None,
     taxonomy: Optional[str] = None,
     limit: int = 10,
+    skip: int = 0,
 ) -> List[dict]:
-    params = _build_params(first_name, last_name, organization_name, city, state, postal_code, taxonomy, limit)
+    if _use_local_store():
+        return await asyncio.to_thread(
+            local_store.search,
+            first_name=first_name,
+            last_name=last_name,
+            organization_name=organization_name,
+            city=city,
+            state=state,
+            postal_code=postal_code,
+            taxonomy=taxonomy,
+            limit=limit,
+            skip=skip,
+        )
+    params = _build_params(first_name, last_name, organization_name, city, state, postal_code, taxonomy, limit, skip)
     base_url = str(settings.nppes_base_url).rstrip("/")
     url = f"{base_url}/"
     resp = await get(url, params=params)
@@ -54,3 +85,97 @@ async def search(
     return data.get("results", [])
 
 
+async def iter_search(
+    *,
+    max_results: Optional[int] = None,
+    page_size: Optional[int] = None,
+    **criteria: Optional[str],
+) -> AsyncIterator[dict]:
+    """Yield every match for ``criteria``, paging with ``skip``.
+
+    The next page is requested while the current one is being consumed.
+    Iteration stops at the first short page, at ``max_results``, or (live
+    registry only) where the API stops accepting larger ``skip`` values.
+    """
+    cap = max_results if max_results is not None else settings.nppes_stream_max_results
+    size = min(page_size or settings.nppes_page_size, cap) if cap > 0 else 0
+    if size <= 0:
+        return
+    max_skip = None if _use_local_store() else settings.nppes_max_skip
+
+    def fetch(skip: int) -> "asyncio.Task[List[dict]]":
+        return asyncio.ensure_future(search(**criteria, limit=min(size, cap - skip), skip=skip))
+
+    skip = 0
+    pending: Optional[asyncio.Task] = fetch(0)
+    try:
+        while pending is not None:
+            page = await pending
+            pending = None
+            skip += len(page)
+            if len(page) == size and skip < cap:
+                if max_skip is None or skip <= max_skip:
+                    pending = fetch(skip)
+                else:
+                    logger.info("nppes_stream_truncated", returned=skip, max_skip=max_skip)
+            for record in page:
+                yield record
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+def _npi_cache_key(npi: str) -> str:
+    return f"nppes_npi:{npi}"
+
+
+async def lookup(npi: str) -> Optional[dict]:
+    """Fetch a single provider record by NPI, or None if the registry has none."""
+    if _use_local_store():
+        return await asyncio.to_thread(local_store.get, npi)
+    base_url = str(settings.nppes_base_url).rstrip("/")
+    resp = await get(f"{base_url}/", params={"version": "2.1", "number": npi})
+    results = resp.json().get("results") or []
+    return results[0] if results else None
+
+
+async def lookup_many(npis: Iterable[str], concurrency: Optional[int] = None) -> Dict[str, Optional[dict]]:
+    """Look up many NPIs at once; returns ``npi -> record`` (None when not found or failed).
+
+    Inputs are deduplicated and served from the cache where possible. Misses
+    are read from the local index in one pass, or fetched from the live
+    registry with at most ``concurrency`` requests in flight.
+    """
+    unique = list(dict.fromkeys(npi.strip() for npi in npis if npi and npi.strip()))
+    results: Dict[str, Optional[dict]] = {npi: None for npi in unique}
+    misses: List[str] = []
+    for npi in unique:
+        if not (len(npi) == 10 and npi.isdigit()):
+            continue
+        cached = await cache.aget(_npi_cache_key(npi))
+        if cached is not None:
+            results[npi] = cached
+        else:
+            misses.append(npi)
+    if not misses:
+        return results
+
+    if _use_local_store():
+        found = await asyncio.to_thread(local_store.get_many, misses)
+        for npi, record in found.items():
+            cache.set(_npi_cache_key(npi), record)
+            results[npi] = record
+        return results
+
+    semaphore = asyncio.Semaphore(concurrency or settings.nppes_lookup_concurrency)
+
+    async def fetch(npi: str) -> None:
+        async with semaphore:
+            try:
+                results[npi] = await cache.load(_npi_cache_key(npi), lambda: lookup(npi))
+            except Exception as e:
+                logger.warning("nppes_lookup_failed", npi=npi, error=str(e))
+
+    await asyncio.gather(*(fetch(npi) for npi in misses))
+    logger.info("nppes_lookup_many", requested=len(unique), cache_hits=len(unique) - len(misses), fetched=len(misses))
+    return results
@@ -0,0 +1,598 @@
+"""Build and maintain the local NPPES index from the CMS bulk dissemination files.
+
+Usage::
+
+    python -m app.infrastructure.nppes.ingest full npidata_pfile_20240101-20240107.csv \\
+        --taxonomy nucc_taxonomy_241.csv
+    python -m app.infrastructure.nppes.ingest delta NPPES_Data_Dissemination_Weekly.zip
+    python -m app.infrastructure.nppes.ingest deactivations NPPES_Deactivated_NPI_Report.xlsx
+
+The input may be the extracted CSV or the downloaded zip archive. Rows are
+streamed and written in batches, so memory use does not depend on file size.
+Delta and deactivation runs record their progress per batch, so re-running the
+same file after a crash resumes where it stopped and re-running a finished file
+is a no-op.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from ..settings import settings
+from ..logging import get_logger, setup_logging
+from .local_store import INDEXES, connect, decode_record, encode_record
+
+
+logger = get_logger(__name__)
+
+MAX_TAXONOMIES = 15
+
+# Some monthly files use "Provider Gender Code", newer ones "Provider Sex Code"
+_GENDER_COLUMNS = ("Provider Sex Code", "Provider Gender Code")
+
+_PROVIDER_SQL = (
+    "INSERT OR REPLACE INTO nppes_providers "
+    "(npi, enumeration_type, status, first_name, last_name, organization_name, city, state, "
+    "postal_code, last_updated, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_TAXONOMY_SQL = "INSERT INTO nppes_provider_taxonomies (npi, code, is_primary) VALUES (?, ?, ?)"
+
+
+@contextmanager
+def open_csv(path: str) -> Iterator[io.TextIOBase]:
+    """Open a CSV directly or from inside a CMS zip archive without extracting it."""
+    if path.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            members = [
+                name for name in archive.namelist()
+                if name.lower().endswith(".csv") and name.lower().startswith("npidata")
+                and "fileheader" not in name.lower()
+            ]
+            if not members:
+                raise ValueError(f"No npidata CSV found in {path}")
+            with archive.open(members[0]) as raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    else:
+        with open(path, encoding="utf-8", newline="") as handle:
+            yield handle
+
+
+# Dates repeat heavily across millions of rows; strptime is the hot spot otherwise
+@lru_cache(maxsize=65536)
+def _date(value: str) -> Optional[str]:
+    """CSV dates are MM/DD/YYYY; the API returns YYYY-MM-DD."""
+    if not value:
+        return None
+    if len(value) == 10 and value[2] == "/" and value[5] == "/":
+        return f"{value[6:]}-{value[:2]}-{value[3:5]}"
+    return value
+
+
+@lru_cache(maxsize=65536)
+def _epoch_ms(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(datetime.strptime(value, "%Y-%m-%d").timestamp() * 1000)
+    except ValueError:
+        return None
+
+
+def _address(get: Callable[[str], str], kind: str, purpose: str) -> Dict[str, Any]:
+    if kind == "mailing":
+        first, second = "Provider First Line Business Mailing Address", "Provider Second Line Business Mailing Address"
+        prefix = "Provider Business Mailing Address"
+    else:
+        first, second = "Provider First Line Business Practice Location Address", "Provider Second Line Business Practice Location Address"
+        prefix = "Provider Business Practice Location Address"
+    country = get(f"{prefix} Country Code (If outside U.S.)") or "US"
+    return {
+        "country_code": country,
+        "country_name": "United States" if country == "US" else country,
+        "address_purpose": purpose,
+        "address_type": "DOM" if country == "US" else "FGN",
+        "address_1": get(first),
+        "address_2": get(second),
+        "city": get(f"{prefix} City Name"),
+        "state": get(f"{prefix} State Name"),
+        "postal_code": get(f"{prefix} Postal Code"),
+        "telephone_number": get(f"{prefix} Telephone Number"),
+        "fax_number": get(f"{prefix} Fax Number"),
+    }
+
+
+def row_to_record(
+    get: Callable[[str], str],
+    taxonomy_descriptions: Dict[str, str],
+) -> Tuple[Dict[str, Any], str, List[Tuple[str, bool]]]:
+    """Convert one CSV row into ``(api_shaped_record, status, [(taxonomy_code, is_primary)])``."""
+    npi = get("NPI")
+    entity_type = get("Entity Type Code")
+    deactivated = _date(get("NPI Deactivation Date"))
+    reactivated = _date(get("NPI Reactivation Date"))
+    status = "D" if deactivated and (not reactivated or reactivated < deactivated) else "A"
+    last_updated = _date(get("Last Update Date"))
+    enumeration_date = _date(get("Provider Enumeration Date"))
+
+    if entity_type == "2":
+        basic: Dict[str, Any] = {
+            "organization_name": get("Provider Organization Name (Legal Business Name)"),
+            "organizational_subpart": get("Is Organization Subpart") or None,
+        }
+    else:
+        basic = {
+            "first_name": get("Provider First Name"),
+            "last_name": get("Provider Last Name (Legal Name)"),
+            "middle_name": get("Provider Middle Name"),
+            "name_prefix": get("Provider Name Prefix Text"),
+            "name_suffix": get("Provider Name Suffix Text"),
+            "credential": get("Provider Credential Text"),
+            "sole_proprietor": {"Y": "YES", "N": "NO"}.get(get("Is Sole Proprietor"), get("Is Sole Proprietor")),
+            "gender": next((get(c) for c in _GENDER_COLUMNS if get(c)), ""),
+        }
+    basic.update({
+        "enumeration_date": enumeration_date,
+        "last_updated": last_updated,
+        "status": status,
+    })
+    if deactivated:
+        basic["deactivation_date"] = deactivated
+    basic = {k: v for k, v in basic.items() if v not in (None, "")}
+
+    taxonomies = []
+    codes: List[Tuple[str, bool]] = []
+    for i in range(1, MAX_TAXONOMIES + 1):
+        code = get(f"Healthcare Provider Taxonomy Code_{i}")
+        if not code:
+            continue
+        primary = get(f"Healthcare Provider Primary Taxonomy Switch_{i}") == "Y"
+        codes.append((code, primary))
+        taxonomies.append({
+            "code": code,
+            "taxonomy_group": "",
+            "desc": taxonomy_descriptions.get(code, ""),
+            "state": get(f"Provider License Number State Code_{i}"),
+            "license": get(f"Provider License Number_{i}"),
+            "primary": primary,
+        })
+    # The API lists the primary taxonomy first
+    taxonomies.sort(key=lambda t: not t["primary"])
+
+    record = {
+        "created_epoch": _epoch_ms(enumeration_date),
+        "enumeration_type": "NPI-2" if entity_type == "2" else "NPI-1",
+        "last_updated_epoch": _epoch_ms(last_updated),
+        "number": npi,
+        "addresses": [_address(get, "location", "LOCATION"), _address(get, "mailing", "MAILING")] if status == "A" else [],
+        "practiceLocations": [],
+        "basic": basic,
+        "taxonomies": taxonomies,
+        "identifiers": [],
+        "endpoints": [],
+        "other_names": [],
+    }
+    return record, status, codes
+
+
+def iter_rows(
+    path: str,
+    taxonomy_descriptions: Dict[str, str],
+    skip: int = 0,
+) -> Iterator[Tuple[tuple, List[Tuple[str, str, int]]]]:
+    """Stream ``(provider_row, taxonomy_rows)`` tuples ready for executemany."""
+    with open_csv(path) as handle:
+        reader = csv.reader(handle)
+        header = next(reader)
+        index = {name: i for i, name in enumerate(header)}
+        for _ in range(skip):
+            if next(reader, None) is None:
+                return
+        for values in reader:
+            def get(column: str, values: List[str] = values) -> str:
+                i = index.get(column)
+                return values[i] if i is not None and i < len(values) else ""
+
+            record, status, codes = row_to_record(get, taxonomy_descriptions)
+            npi = record["number"]
+            location = record["addresses"][0] if record["addresses"] else {}
+            basic = record["basic"]
+            provider_row = (
+                npi,
+                record["enumeration_type"],
+                status,
+                (basic.get("first_name") or "").upper() or None,
+                (basic.get("last_name") or "").upper() or None,
+                (basic.get("organization_name") or "").upper() or None,
+                (location.get("city") or "").upper() or None,
+                (location.get("state") or "").upper() or None,
+                location.get("postal_code") or None,
+                basic.get("last_updated"),
+                encode_record(record, level=1),
+            )
+            yield provider_row, [(npi, code, int(primary)) for code, primary in codes]
+
+
+def load_taxonomy_descriptions(path: Optional[str]) -> Dict[str, str]:
+    """Read the NUCC taxonomy CSV into ``code -> "Classification, Specialization"``."""
+    if not path:
+        return {}
+    descriptions: Dict[str, str] = {}
+    with open(path, encoding="utf-8-sig", newline="") as handle:
+        for row in csv.DictReader(handle):
+            code = (row.get("Code") or "").strip()
+            classification = (row.get("Classification") or "").strip()
+            specialization = (row.get("Specialization") or "").strip()
+            if code and classification:
+                descriptions[code] = f"{classification}, {specialization}" if specialization else classification
+    return descriptions
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def write_batches(
+    conn,
+    rows: Iterable[Tuple[tuple, List[Tuple[str, str, int]]]],
+    batch_size: int,
+) -> Dict[str, int]:
+    """Write rows in one transaction per batch; returns row counts."""
+    counts = {"rows": 0, "active": 0, "deactivated": 0}
+    providers: List[tuple] = []
+    taxonomies: List[Tuple[str, str, int]] = []
+
+    def flush() -> None:
+        if not providers:
+            return
+        with conn:
+            conn.executemany(_PROVIDER_SQL, providers)
+            conn.executemany(_TAXONOMY_SQL, taxonomies)
+        providers.clear()
+        taxonomies.clear()
+
+    started = time.monotonic()
+    for provider_row, taxonomy_rows in rows:
+        providers.append(provider_row)
+        taxonomies.extend(taxonomy_rows)
+        counts["rows"] += 1
+        counts["active" if provider_row[2] == "A" else "deactivated"] += 1
+        if len(providers) >= batch_size:
+            flush()
+            if counts["rows"] % (batch_size * 20) == 0:
+                elapsed = time.monotonic() - started
+                logger.info("nppes_ingest_progress", rows=counts["rows"], rows_per_second=int(counts["rows"] / elapsed))
+    flush()
+    return counts
+
+
+def ingest_full(
+    csv_path: str,
+    db_path: Optional[str] = None,
+    taxonomy_path: Optional[str] = None,
+    batch_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Rebuild the local index from a full replacement file.
+
+    The new index is built next to the live one and swapped in atomically, so
+    searches keep working against the previous month's data during the load.
+    """
+    target = db_path or settings.nppes_local_db_path
+    building = f"{target}.building"
+    if os.path.exists(building):
+        os.remove(building)
+
+    started = time.monotonic()
+    taxonomy_descriptions = load_taxonomy_descriptions(taxonomy_path)
+    conn = connect(building)
+    try:
+        # Nothing reads the file until it is swapped in, so durability can wait
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-200000")
+        if taxonomy_descriptions:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO nucc_taxonomies (code, description) VALUES (?, ?)",
+                    taxonomy_descriptions.items(),
+                )
+        counts = write_batches(
+            conn,
+            iter_rows(csv_path, taxonomy_descriptions),
+            batch_size or settings.nppes_ingest_batch_size,
+        )
+        load_seconds = time.monotonic() - started
+        logger.info("nppes_ingest_indexing", rows=counts["rows"])
+        conn.executescript(INDEXES)
+        conn.execute("ANALYZE")
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO nppes_meta (key, value) VALUES (?, ?)",
+                [
+                    ("full_source", os.path.basename(csv_path)),
+                    ("full_ingested_at", datetime.utcnow().isoformat()),
+                    ("row_count", str(counts["rows"])),
+                ],
+            )
+    finally:
+        conn.close()
+    os.replace(building, target)
+
+    seconds = time.monotonic() - started
+    stats = {
+        **counts,
+        "seconds": round(seconds, 1),
+        "load_seconds": round(load_seconds, 1),
+        "rows_per_second": int(counts["rows"] / load_seconds) if load_seconds else counts["rows"],
+        "peak_rss_mb": peak_rss_mb(),
+        "db_path": target,
+    }
+    logger.info("nppes_ingest_complete", **stats)
+    return stats
+
+
+def _chunks(items: List[Any], size: int = 900) -> Iterator[List[Any]]:
+    # Stay under SQLite's bound-parameter limit for IN (...) lookups
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _existing(conn, npis: List[str]) -> Dict[str, Tuple[str, Optional[str], bytes]]:
+    """``npi -> (status, last_updated, record)`` for the NPIs already in the index."""
+    found: Dict[str, Tuple[str, Optional[str], bytes]] = {}
+    for chunk in _chunks(npis):
+        placeholders = ",".join("?" * len(chunk))
+        for npi, status, last_updated, record in conn.execute(
+            f"SELECT npi, status, last_updated, record FROM nppes_providers WHERE npi IN ({placeholders})",
+            chunk,
+        ):
+            found[npi] = (status, last_updated, record)
+    return found
+
+
+def _record_changes(conn, npis: List[str], change_type: str, source: str) -> None:
+    changed_at = datetime.utcnow().isoformat()
+    conn.executemany(
+        "INSERT INTO nppes_changes (npi, change_type, source, changed_at) VALUES (?, ?, ?, ?)",
+        [(npi, change_type, source, changed_at) for npi in npis],
+    )
+
+
+def _apply_upserts(conn, batch: List[Tuple[tuple, List[Tuple[str, str, int]]]], source: str) -> int:
+    """Upsert rows that are new or differ from the stored copy; returns how many changed."""
+    existing = _existing(conn, [provider_row[0] for provider_row, _ in batch])
+    changed = []
+    for provider_row, taxonomy_rows in batch:
+        current = existing.get(provider_row[0])
+        if current is not None:
+            _, last_updated, record = current
+            if (last_updated or "") > (provider_row[9] or "") or record == provider_row[10]:
+                continue
+        changed.append((provider_row, taxonomy_rows))
+    if not changed:
+        return 0
+    npis = [provider_row[0] for provider_row, _ in changed]
+    conn.executemany("DELETE FROM nppes_provider_taxonomies WHERE npi = ?", [(npi,) for npi in npis])
+    conn.executemany(_PROVIDER_SQL, [provider_row for provider_row, _ in changed])
+    conn.executemany(_TAXONOMY_SQL, [row for _, taxonomy_rows in changed for row in taxonomy_rows])
+    _record_changes(conn, npis, "upsert", source)
+    return len(changed)
+
+
+def _apply_deactivations(conn, batch: List[Tuple[str, str]], source: str) -> int:
+    """Mark NPIs deactivated; unknown or already-deactivated NPIs are skipped."""
+    existing = _existing(conn, [npi for npi, _ in batch])
+    updates = []
+    for npi, deactivation_date in batch:
+        current = existing.get(npi)
+        if current is None:
+            continue
+        record = decode_record(current[2])
+        if current[0] == "D" and record["basic"].get("deactivation_date") == deactivation_date:
+            continue
+        record["basic"]["status"] = "D"
+        record["basic"]["deactivation_date"] = deactivation_date
+        record["addresses"] = []
+        updates.append((encode_record(record, level=1), npi))
+    if not updates:
+        return 0
+    conn.executemany("UPDATE nppes_providers SET status = 'D', record = ? WHERE npi = ?", updates)
+    _record_changes(conn, [npi for _, npi in updates], "deactivate", source)
+    return len(updates)
+
+
+def iter_deactivations(path: str, skip: int = 0) -> Iterator[Tuple[str, str]]:
+    """Stream ``(npi, deactivation_date)`` from the CMS deactivation report (CSV or xlsx).
+
+    The report starts with title rows; data begins after the row whose first
+    cell is ``NPI``.
+    """
+    if path.lower().endswith((".xlsx", ".xls")):
+        import pandas as pd  # reading xlsx also needs openpyxl installed
+
+        raw_rows: Iterable[List[Any]] = pd.read_excel(path, header=None, dtype=str).fillna("").values.tolist()
+        yield from _deactivation_rows(raw_rows, skip)
+    else:
+        with open_csv(path) as handle:
+            yield from _deactivation_rows(csv.reader(handle), skip)
+
+
+def _deactivation_rows(raw_rows: Iterable[List[Any]], skip: int) -> Iterator[Tuple[str, str]]:
+    rows = iter(raw_rows)
+    for row in rows:
+        if row and str(row[0]).strip().upper() == "NPI":
+            break
+    for _ in range(skip):
+        if next(rows, None) is None:
+            return
+    for row in rows:
+        if len(row) < 2 or not str(row[0]).strip():
+            continue
+        value = str(row[1]).strip()
+        # pandas renders Excel dates as "YYYY-MM-DD 00:00:00"
+        yield str(row[0]).strip(), _date(value[:10] if value[:4].isdigit() else value)
+
+
+def _apply_resumable(
+    conn,
+    path: str,
+    kind: str,
+    rows: Callable[[int], Iterator[Any]],
+    apply_batch: Callable[[Any, List[Any], str], int],
+    batch_size: int,
+    force: bool,
+) -> Dict[str, Any]:
+    """Apply ``rows`` in batches, committing progress with each batch so a rerun resumes."""
+    source = f"{os.path.basename(path)}:{os.path.getsize(path)}"
+    row = conn.execute(
+        "SELECT rows_applied, completed FROM nppes_ingest_runs WHERE source = ?", (source,)
+    ).fetchone()
+    applied, completed = (row[0], bool(row[1])) if row else (0, False)
+    if completed and not force:
+        logger.info("nppes_delta_already_applied", source=source)
+        return {"source": source, "skipped": True, "rows": 0, "changed": 0}
+    if force:
+        applied = 0
+
+    with conn:
+        conn.execute(
+            "INSERT INTO nppes_ingest_runs (source, kind, rows_applied, completed, started_at) "
+            "VALUES (?, ?, ?, 0, ?) ON CONFLICT(source) DO UPDATE SET "
+            "rows_applied = excluded.rows_applied, completed = 0",
+            (source, kind, applied, datetime.utcnow().isoformat()),
+        )
+    if applied:
+        logger.info("nppes_delta_resuming", source=source, rows_applied=applied)
+
+    counts = {"source": source, "skipped": False, "resumed_at": applied, "rows": 0, "changed": 0}
+    batch: List[Any] = []
+
+    def flush() -> None:
+        if not batch:
+            return
+        with conn:
+            counts["changed"] += apply_batch(conn, batch, source)
+            conn.execute(
+                "UPDATE nppes_ingest_runs SET rows_applied = rows_applied + ? WHERE source = ?",
+                (len(batch), source),
+            )
+        counts["rows"] += len(batch)
+        batch.clear()
+
+    for item in rows(applied):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    with conn:
+        conn.execute(
+            "UPDATE nppes_ingest_runs SET completed = 1, completed_at = ? WHERE source = ?",
+            (datetime.utcnow().isoformat(), source),
+        )
+    return counts
+
+
+def _run_delta(kind: str, path: str, db_path: Optional[str], batch_size: Optional[int], force: bool) -> Dict[str, Any]:
+    target = db_path or settings.nppes_local_db_path
+    if not os.path.exists(target):
+        raise FileNotFoundError(f"No local NPPES index at {target}; run a full ingest first")
+
+    started = time.monotonic()
+    conn = connect(target)
+    try:
+        if kind == "delta":
+            descriptions = dict(conn.execute("SELECT code, description FROM nucc_taxonomies"))
+            rows = lambda skip: iter_rows(path, descriptions, skip=skip)  # noqa: E731
+            apply_batch = _apply_upserts
+        else:
+            rows = lambda skip: iter_deactivations(path, skip=skip)  # noqa: E731
+            apply_batch = _apply_deactivations
+        counts = _apply_resumable(
+            conn, path, kind, rows, apply_batch, batch_size or settings.nppes_ingest_batch_size, force,
+        )
+        if not counts["skipped"]:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO nppes_meta (key, value) VALUES (?, ?)",
+                    (f"last_{kind}_source", counts["source"]),
+                )
+    finally:
+        conn.close()
+
+    seconds = time.monotonic() - started
+    stats = {
+        **counts,
+        "kind": kind,
+        "seconds": round(seconds, 1),
+        "rows_per_second": int(counts["rows"] / seconds) if seconds else counts["rows"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    logger.info("nppes_delta_complete", **stats)
+    return stats
+
+
+def ingest_delta(
+    csv_path: str,
+    db_path: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Apply a weekly update file (same layout as the full file) to the existing index."""
+    return _run_delta("delta", csv_path, db_path, batch_size, force)
+
+
+def ingest_deactivations(
+    path: str,
+    db_path: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Apply a deactivated-NPI report to the existing index."""
+    return _run_delta("deactivations", path, db_path, batch_size, force)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load NPPES bulk files into the local index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    full = sub.add_parser("full", help="Rebuild from the monthly full replacement file")
+    full.add_argument("path", help="npidata_pfile CSV or the CMS zip archive")
+    full.add_argument("--taxonomy", help="NUCC taxonomy CSV for taxonomy descriptions")
+    full.add_argument("--db", help=f"Index path (default {settings.nppes_local_db_path})")
+    full.add_argument("--batch-size", type=int)
+
+    for name, help_text in (
+        ("delta", "Apply a weekly update file to the existing index"),
+        ("deactivations", "Apply a deactivated-NPI report (CSV or xlsx) to the existing index"),
+    ):
+        delta = sub.add_parser(name, help=help_text)
+        delta.add_argument("path")
+        delta.add_argument("--db", help=f"Index path (default {settings.nppes_local_db_path})")
+        delta.add_argument("--batch-size", type=int)
+        delta.add_argument("--force", action="store_true", help="Re-apply a file already marked complete")
+
+    args = parser.parse_args(argv)
+    setup_logging()
+    if args.command == "full":
+        stats = ingest_full(args.path, db_path=args.db, taxonomy_path=args.taxonomy, batch_size=args.batch_size)
+    elif args.command == "delta":
+        stats = ingest_delta(args.path, db_path=args.db, batch_size=args.batch_size, force=args.force)
+    else:
+        stats = ingest_deactivations(args.path, db_path=args.db, batch_size=args.batch_size, force=args.force)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Local NPPES index built from the CMS bulk dissemination files.
+
+Rows are stored in the same shape the NPI Registry API returns, so callers of
+``nppes.client.search`` cannot tell which source answered.
+"""
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from ..settings import settings
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nppes_providers (
+    npi TEXT PRIMARY KEY,
+    enumeration_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    first_name TEXT,
+    last_name TEXT,
+    organization_name TEXT,
+    city TEXT,
+    state TEXT,
+    postal_code TEXT,
+    last_updated TEXT,
+    record BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nppes_provider_taxonomies (
+    npi TEXT NOT NULL,
+    code TEXT NOT NULL,
+    is_primary INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS nucc_taxonomies (
+    code TEXT PRIMARY KEY,
+    description TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nppes_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS nppes_ingest_runs (
+    source TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    rows_applied INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT,
+    completed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS nppes_changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    npi TEXT NOT NULL,
+    change_type TEXT NOT NULL,
+    source TEXT NOT NULL,
+    changed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_nppes_changes_changed_at ON nppes_changes (changed_at);
+"""
+
+# Secondary indexes are created after a bulk load; building them once over the
+# whole table is far cheaper than maintaining them row by row.
+INDEXES = """
+CREATE INDEX IF NOT EXISTS ix_nppes_providers_name ON nppes_providers (last_name, first_name);
+CREATE INDEX IF NOT EXISTS ix_nppes_providers_org ON nppes_providers (organization_name);
+CREATE INDEX IF NOT EXISTS ix_nppes_providers_location ON nppes_providers (state, city);
+CREATE INDEX IF NOT EXISTS ix_nppes_providers_postal ON nppes_providers (postal_code);
+CREATE INDEX IF NOT EXISTS ix_nppes_taxonomies_code ON nppes_provider_taxonomies (code, npi);
+CREATE INDEX IF NOT EXISTS ix_nppes_taxonomies_npi ON nppes_provider_taxonomies (npi);
+"""
+
+
+def encode_record(record: Dict[str, Any], level: int = 6) -> bytes:
+    return zlib.compress(json.dumps(record, separators=(",", ":")).encode(), level)
+
+
+def decode_record(blob: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(blob))
+
+
+def connect(path: str) -> sqlite3.Connection:
+    # Rollback-journal mode on purpose: a full rebuild replaces the file with
+    # os.replace, and a leftover -wal from the old file must never be replayed.
+    conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class NppesLocalStore:
+    """Read side of the local index; blocking, so async callers use ``asyncio.to_thread``."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or settings.nppes_local_db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._inode: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _connection(self) -> sqlite3.Connection:
+        # A full rebuild swaps in a new file; reconnect when the inode changes
+        inode = os.stat(self.path).st_ino
+        if self._conn is None or inode != self._inode:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = connect(self.path)
+            self._inode = inode
+        return self._conn
+
+    def _query(self, sql: str, params: Iterable[Any]) -> List[Tuple]:
+        with self._lock:
+            return self._connection().execute(sql, list(params)).fetchall()
+
+    def search(
+        self,
+        *,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        organization_name: Optional[str] = None,
+        city: Optional[str] = None,
+        state: Optional[str] = None,
+        postal_code: Optional[str] = None,
+        taxonomy: Optional[str] = None,
+        limit: int = 10,
+        skip: int = 0,
+    ) -> List[dict]:
+        """Match the registry API's criteria: case-insensitive, ``*`` as a trailing wildcard."""
+        clauses = ["status = 'A'"]
+        params: List[Any] = []
+
+        def match(column: str, value: Optional[str], prefix: bool = False) -> None:
+            if not value:
+                return
+            value = value.strip().upper()
+            if value.endswith("*") or prefix:
+                start = value.rstrip("*")
+                clauses.append(f"{column} >= ? AND {column} < ?")
+                params.extend([start, start + "\uffff"])
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+
+        match("first_name", first_name)
+        match("last_name", last_name)
+        match("organization_name", organization_name)
+        match("city", city)
+        match("state", state)
+        # A 5-digit postal code also matches ZIP+4 values, as in the live API
+        match("postal_code", postal_code, prefix=True)
+        if taxonomy:
+            clauses.append(
+                "npi IN (SELECT npi FROM nppes_provider_taxonomies WHERE code = ? OR code IN "
+                "(SELECT code FROM nucc_taxonomies WHERE description LIKE ?))"
+            )
+            params.extend([taxonomy.strip().upper(), f"%{taxonomy.strip().rstrip('*')}%"])
+
+        sql = f"SELECT record FROM nppes_providers WHERE {' AND '.join(clauses)} ORDER BY npi LIMIT ? OFFSET ?"
+        rows = self._query(sql, [*params, limit, skip])
+        return [decode_record(row[0]) for row in rows]
+
+    def get(self, npi: str) -> Optional[dict]:
+        rows = self._query("SELECT record FROM nppes_providers WHERE npi = ?", [npi])
+        return decode_record(rows[0][0]) if rows else None
+
+    def get_many(self, npis: List[str]) -> Dict[str, dict]:
+        """Records for the given NPIs that exist in the index, keyed by NPI."""
+        found: Dict[str, dict] = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(npis), 900):
+            chunk = npis[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._query(f"SELECT npi, record FROM nppes_providers WHERE npi IN ({placeholders})", chunk)
+            found.update((npi, decode_record(record)) for npi, record in rows)
+        return found
+
+    def changed_since(self, since: str, limit: Optional[int] = None) -> List[str]:
+        """NPIs touched by delta or deactivation runs at or after ``since`` (ISO timestamp)."""
+        sql = "SELECT DISTINCT npi FROM nppes_changes WHERE changed_at >= ? ORDER BY npi"
+        params: List[Any] = [since]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [row[0] for row in self._query(sql, params)]
+
+    def meta(self) -> Dict[str, str]:
+        return dict(self._query("SELECT key, value FROM nppes_meta", []))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+local_store = NppesLocalStore()
@@ -0,0 +1,132 @@
+"""Incrementally maintained directory quality aggregates.
+
+Every provider contributes ``(count=1, confidence)`` to one row per dimension:
+the whole directory, its state, taxonomy, validation status and confidence
+histogram bucket. ``ProviderRepository`` applies the difference between a
+provider's old and new contributions in the same transaction as the write, so
+the summary is a read of a few small rows instead of a scan of ``providers``.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from sqlalchemy import func, select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database.database import dialect_insert
+from ..database.models import ProviderAggregateModel, ProviderModel
+
+
+HISTOGRAM_BUCKETS = 10
+
+# (dimension, key) -> [count delta, confidence sum delta]
+Deltas = Dict[Tuple[str, str], list]
+
+# The provider columns contributions are derived from
+CONTRIBUTION_FIELDS = ("state", "taxonomy", "validation_status", "overall_confidence")
+
+
+def confidence_bucket(confidence: float) -> str:
+    # Round first so 0.3 * 10 lands in bucket 3, not 2.9999...
+    index = min(max(int(round(confidence * HISTOGRAM_BUCKETS, 6)), 0), HISTOGRAM_BUCKETS - 1)
+    return f"{index / HISTOGRAM_BUCKETS:.1f}"
+
+
+def _keys(state: Optional[str], taxonomy: Optional[str], status: Optional[str], confidence: float):
+    return (
+        ("directory", "all"),
+        ("state", state or "unknown"),
+        ("taxonomy", taxonomy or "unknown"),
+        ("status", status or "unknown"),
+        ("confidence", confidence_bucket(confidence)),
+    )
+
+
+def new_deltas() -> Deltas:
+    return defaultdict(lambda: [0, 0.0])
+
+
+def add(deltas: Deltas, values: Optional[Iterable[Any]], sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) a provider given its ``CONTRIBUTION_FIELDS`` values."""
+    if values is None:
+        return
+    state, taxonomy, status, confidence = values
+    confidence = confidence or 0.0
+    for key in _keys(state, taxonomy, status, confidence):
+        deltas[key][0] += sign
+        deltas[key][1] += sign * confidence
+
+
+async def apply(session: AsyncSession, deltas: Deltas) -> None:
+    """Apply deltas with atomic ``count = count + delta`` upserts."""
+    rows = [
+        {"dimension": dimension, "key": key, "count": count, "confidence_sum": total}
+        for (dimension, key), (count, total) in deltas.items()
+        if count or abs(total) > 1e-12
+    ]
+    if not rows:
+        return
+    insert = dialect_insert(session)
+    stmt = insert(ProviderAggregateModel).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProviderAggregateModel.dimension, ProviderAggregateModel.key],
+        set_={
+            "count": ProviderAggregateModel.count + stmt.excluded.count,
+            "confidence_sum": ProviderAggregateModel.confidence_sum + stmt.excluded.confidence_sum,
+        },
+    )
+    await session.execute(stmt)
+
+
+async def rebuild(session: AsyncSession) -> None:
+    """Recompute every aggregate from ``providers`` (initial backfill or repair)."""
+    await session.execute(delete(ProviderAggregateModel))
+    deltas = new_deltas()
+    columns = {
+        "state": ProviderModel.state,
+        "taxonomy": ProviderModel.taxonomy,
+        "status": ProviderModel.validation_status,
+    }
+    total = await session.execute(
+        select(func.count(), func.coalesce(func.sum(ProviderModel.overall_confidence), 0.0))
+    )
+    count, confidence_sum = total.one()
+    if count:
+        deltas[("directory", "all")] = [count, confidence_sum]
+    for dimension, column in columns.items():
+        result = await session.execute(
+            select(column, func.count(), func.coalesce(func.sum(ProviderModel.overall_confidence), 0.0)).group_by(column)
+        )
+        for key, count, confidence_sum in result:
+            entry = deltas[(dimension, key or "unknown")]
+            entry[0] += count
+            entry[1] += confidence_sum
+    # Bucketing is done in Python to stay dialect-neutral; only one column is read
+    async for (confidence,) in await session.stream(
+        select(ProviderModel.overall_confidence).execution_options(yield_per=5000)
+    ):
+        entry = deltas[("confidence", confidence_bucket(confidence or 0.0))]
+        entry[0] += 1
+        entry[1] += confidence or 0.0
+    await apply(session, deltas)
+
+
+async def summary(session: AsyncSession) -> Dict[str, Any]:
+    """Directory score, confidence histogram and per-dimension breakdowns."""
+    result = await session.execute(select(ProviderAggregateModel))
+    breakdowns: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+    for row in result.scalars():
+        if row.count <= 0:
+            continue
+        breakdowns[row.dimension][row.key] = {
+            "count": row.count,
+            "average_confidence": round(row.confidence_sum / row.count, 4),
+        }
+    directory = breakdowns.pop("directory", {}).get("all", {"count": 0, "average_confidence": 0.0})
+    histogram = breakdowns.pop("confidence", {})
+    buckets = [f"{i / HISTOGRAM_BUCKETS:.1f}" for i in range(HISTOGRAM_BUCKETS)]
+    return {
+        "provider_count": directory["count"],
+        "average_confidence": directory["average_confidence"],
+        "confidence_histogram": {bucket: histogram.get(bucket, {}).get("count", 0) for bucket in buckets},
+        "by_state": breakdowns.get("state", {}),
+        "by_taxonomy": breakdowns.get("taxonomy", {}),
+        "by_status": breakdowns.get("status", {}),
+    }
@@ -1,10 +1,146 @@
 """Provider repository for data access."""
-from typing import Optional, List
-from sqlalchemy import select, update, delete
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, List, Sequence, Tuple
+from sqlalchemy import Row, and_, func, insert, or_, select, update, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from ...domain.enriched_entities import EnrichedProvider, ValidationStatus
+from ..database.database import dialect_insert
 from ..database.models import ProviderModel, ValidationRecordModel
+from . import provider_aggregates, validation_history
+from .validation_archive import validation_archive
 from datetime import datetime
+from itertools import groupby
+import asyncio
+import uuid
+
+
+# ~35 bound parameters per row keeps a chunk well under SQLite's variable limit
+UPSERT_CHUNK_SIZE = 500
+
+# NPIs per IN (...) query; below SQLite's default bound-parameter limit of 999
+IN_CHUNK_SIZE = 900
+
+# Providers per validation history batch; the previous-version lookup binds three parameters each
+HISTORY_CHUNK_SIZE = 300
+
+# Columns needed to replay validation history
+_HISTORY_REPLAY_COLUMNS = (
+    ValidationRecordModel.provider_id,
+    ValidationRecordModel.version,
+    ValidationRecordModel.delta_json,
+    ValidationRecordModel.delta_blob,
+    ValidationRecordModel.data_before,
+    ValidationRecordModel.data_after,
+)
+
+# Columns the review queue returns; loaded without hydrating ORM objects
+REVIEW_QUEUE_FIELDS = (
+    "id",
+    "npi",
+    "first_name",
+    "last_name",
+    "organization_name",
+    "review_priority",
+    "discrepancies_json",
+    "validation_status",
+)
+
+# Columns provider listings return
+LISTING_FIELDS = (
+    "id",
+    "npi",
+    "first_name",
+    "last_name",
+    "organization_name",
+    "validation_status",
+    "overall_confidence",
+    "review_priority",
+)
+
+# Columns needed to rebuild an ``EnrichedProvider``; bookkeeping columns are left out
+ENRICHED_PROVIDER_FIELDS = tuple(
+    name for name in ProviderModel.__table__.columns.keys()
+    if name not in ("id", "validation_version", "created_at", "updated_at")
+)
+
+# Provider fields a validation record tracks in its before/after data
+VALIDATION_SNAPSHOT_FIELDS = (
+    "phone",
+    "email",
+    "address_line1",
+    "address_line2",
+    "city",
+    "state",
+    "postal_code",
+    "website",
+    "taxonomy",
+    "validation_status",
+    "overall_confidence",
+    "requires_manual_review",
+)
+
+# Rows fetched per round-trip when streaming projected reads
+STREAM_BATCH_SIZE = 1000
+
+# Columns an upsert never overwrites on an existing row; like ``update``,
+# an upsert leaves the enumeration type of a known NPI alone
+_UPSERT_IMMUTABLE_COLUMNS = {"id", "npi", "enumeration_type", "created_at"}
+
+
+def _provider_values(provider: EnrichedProvider) -> Dict[str, Any]:
+    """Column values for a provider row."""
+    return {
+        "npi": provider.npi,
+        "enumeration_type": provider.enumeration_type,
+        "first_name": provider.first_name,
+        "last_name": provider.last_name,
+        "organization_name": provider.organization_name,
+        "phone": provider.phone,
+        "phone_confidence": provider.phone_confidence,
+        "email": provider.email,
+        "email_confidence": provider.email_confidence,
+        "address_line1": provider.address_line1,
+        "address_line2": provider.address_line2,
+        "city": provider.city,
+        "state": provider.state,
+        "postal_code": provider.postal_code,
+        "address_confidence": provider.address_confidence,
+        "taxonomy": provider.taxonomy,
+        "credentials_json": provider.credentials.model_dump(mode="json") if provider.credentials else None,
+        "licenses_json": [lic.model_dump(mode="json") for lic in provider.licenses] if provider.licenses else [],
+        "network_affiliations": provider.network_affiliations,
+        "facility_affiliations": provider.facility_affiliations,
+        "services_offered": provider.services_offered,
+        "appointment_availability": provider.appointment_availability,
+        "website": provider.website,
+        "google_places_id": provider.google_places_id,
+        "validation_status": provider.validation_status.value,
+        "overall_confidence": provider.overall_confidence,
+        "data_element_confidences_json": [de.model_dump(mode="json") for de in provider.data_element_confidences],
+        "last_validated": provider.last_validated,
+        "validation_notes_json": provider.validation_notes,
+        "requires_manual_review": provider.requires_manual_review,
+        "review_priority": provider.review_priority,
+        "discrepancies_json": provider.discrepancies,
+    }
+
+
+def _contribution(provider: EnrichedProvider) -> Tuple[Any, ...]:
+    """A provider's values for ``provider_aggregates.CONTRIBUTION_FIELDS``."""
+    return (provider.state, provider.taxonomy, provider.validation_status.value, provider.overall_confidence)
+
+
+def validation_snapshot(provider: EnrichedProvider) -> Dict[str, Any]:
+    """The part of ``provider`` stored in validation history."""
+    return provider.model_dump(mode="json", include=set(VALIDATION_SNAPSHOT_FIELDS))
+
+
+def _projection(fields: Sequence[str]):
+    """Core ``select`` of the named provider columns; unknown names raise ValueError."""
+    columns = ProviderModel.__table__.columns
+    unknown = [name for name in fields if name not in columns]
+    if unknown or not fields:
+        raise ValueError(f"Unknown provider fields: {unknown}" if unknown else "No fields requested")
+    return select(*(columns[name] for name in fields))
 
 
 class ProviderRepository:
@@ -15,44 +151,65 @@ class ProviderRepository:
     
     async def create(self, provider: EnrichedProvider) -> ProviderModel:
         """Create a new provider."""
-        db_provider = ProviderModel(
-            npi=provider.npi,
-            enumeration_type=provider.enumeration_type,
-            first_name=provider.first_name,
-            last_name=provider.last_name,
-            organization_name=provider.organization_name,
-            phone=provider.phone,
-            phone_confidence=provider.phone_confidence,
-            email=provider.email,
-            email_confidence=provider.email_confidence,
-            address_line1=provider.address_line1,
-            address_line2=provider.address_line2,
-            city=provider.city,
-            state=provider.state,
-            postal_code=provider.postal_code,
-            address_confidence=provider.address_confidence,
-            taxonomy=provider.taxonomy,
-            credentials_json=provider.credentials.model_dump() if provider.credentials else None,
-            licenses_json=[lic.model_dump() for lic in provider.licenses] if provider.licenses else [],
-            network_affiliations=provider.network_affiliations,
-            facility_affiliations=provider.facility_affiliations,
-            services_offered=provider.services_offered,
-            appointment_availability=provider.appointment_availability,
-            website=provider.website,
-            google_places_id=provider.google_places_id,
-            validation_status=provider.validation_status.value,
-            overall_confidence=provider.overall_confidence,
-            data_element_confidences_json=[de.model_dump() for de in provider.data_element_confidences],
-            last_validated=provider.last_validated,
-            validation_notes_json=provider.validation_notes,
-            requires_manual_review=provider.requires_manual_review,
-            review_priority=provider.review_priority,
-            discrepancies_json=provider.discrepancies,
-        )
+        db_provider = ProviderModel(**_provider_values(provider))
         self.session.add(db_provider)
         await self.session.flush()
+        deltas = provider_aggregates.new_deltas()
+        provider_aggregates.add(deltas, _contribution(provider), 1)
+        await provider_aggregates.apply(self.session, deltas)
         return db_provider
     
+    async def upsert_many(self, providers: List[EnrichedProvider], chunk_size: int = UPSERT_CHUNK_SIZE) -> List[str]:
+        """Insert or update providers by NPI; returns their IDs in input order.
+
+        Each chunk is one multi-row ``INSERT ... ON CONFLICT (npi) DO UPDATE``
+        committed in its own transaction, so a failure only rolls back the
+        chunk it happened in.
+        """
+        # A statement may touch each NPI once; the last occurrence wins
+        latest = {provider.npi: provider for provider in providers}
+        rows = list(latest.values())
+        insert = dialect_insert(self.session)
+        ids: Dict[str, str] = {}
+        now = datetime.utcnow()
+        for start in range(0, len(rows), chunk_size):
+            values = [
+                {
+                    **_provider_values(p),
+                    "id": str(uuid.uuid4()),
+                    # Stamped like ``update`` does: the row was just validated
+                    "last_validated": now,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for p in rows[start:start + chunk_size]
+            ]
+            # Aggregates move by the difference between the stored and new rows
+            chunk_npis = [value["npi"] for value in values]
+            existing = await self.session.execute(
+                select(*(getattr(ProviderModel, f) for f in provider_aggregates.CONTRIBUTION_FIELDS))
+                .where(ProviderModel.npi.in_(chunk_npis))
+            )
+            deltas = provider_aggregates.new_deltas()
+            for row in existing:
+                provider_aggregates.add(deltas, tuple(row), -1)
+            for p in rows[start:start + chunk_size]:
+                provider_aggregates.add(deltas, _contribution(p), 1)
+            await provider_aggregates.apply(self.session, deltas)
+            stmt = insert(ProviderModel).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ProviderModel.npi],
+                set_={
+                    column: stmt.excluded[column]
+                    for column in values[0]
+                    if column not in _UPSERT_IMMUTABLE_COLUMNS
+                },
+            ).returning(ProviderModel.npi, ProviderModel.id)
+            result = await self.session.execute(stmt)
+            ids.update((npi, provider_id) for npi, provider_id in result.all())
+            await self.session.commit()
+        return [ids[provider.npi] for provider in providers]
+    
     async def get_by_npi(self, npi: str) -> Optional[ProviderModel]:
         """Get provider by NPI."""
         result = await self.session.execute(
@@ -60,12 +217,48 @@ class ProviderRepository:
         )
         return result.scalar_one_or_none()
     
+    async def iter_many_by_npi(
+        self, npis: Iterable[str], chunk_size: int = IN_CHUNK_SIZE, fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield ``npi -> provider`` dicts one ``IN (...)`` query at a time, in input order.
+
+        NPIs with no stored provider are left out. With ``fields`` the values
+        are projected rows of those columns (which must include ``npi``)
+        instead of ORM models.
+        """
+        unique = list(dict.fromkeys(npis))
+        for start in range(0, len(unique), chunk_size):
+            chunk = unique[start:start + chunk_size]
+            if fields is None:
+                result = await self.session.execute(
+                    select(ProviderModel).where(ProviderModel.npi.in_(chunk))
+                )
+                rows = result.scalars()
+            else:
+                result = await self.session.execute(_projection(fields).where(ProviderModel.npi.in_(chunk)))
+                rows = result.all()
+            by_npi = {row.npi: row for row in rows}
+            yield {npi: by_npi[npi] for npi in chunk if npi in by_npi}
+    
+    async def get_many_by_npi(self, npis: Iterable[str], chunk_size: int = IN_CHUNK_SIZE) -> Dict[str, ProviderModel]:
+        """Get providers for many NPIs with chunked ``IN (...)`` queries."""
+        found: Dict[str, ProviderModel] = {}
+        async for chunk in self.iter_many_by_npi(npis, chunk_size):
+            found.update(chunk)
+        return found
+    
     async def update(self, provider: EnrichedProvider) -> Optional[ProviderModel]:
         """Update existing provider."""
         db_provider = await self.get_by_npi(provider.npi)
         if not db_provider:
             return None
         
+        deltas = provider_aggregates.new_deltas()
+        provider_aggregates.add(
+            deltas, tuple(getattr(db_provider, f) for f in provider_aggregates.CONTRIBUTION_FIELDS), -1,
+        )
+        provider_aggregates.add(deltas, _contribution(provider), 1)
+        
         # Update all fields
         db_provider.first_name = provider.first_name
         db_provider.last_name = provider.last_name
@@ -100,46 +293,267 @@ class ProviderRepository:
         db_provider.updated_at = datetime.utcnow()
         
         await self.session.flush()
+        await provider_aggregates.apply(self.session, deltas)
         return db_provider
     
-    async def list_by_status(self, status: ValidationStatus, limit: int = 100) -> List[ProviderModel]:
+    async def fetch_fields(
+        self, fields: Sequence[str], *criteria: Any, limit: Optional[int] = None
+    ) -> Sequence[Row]:
+        """Only the named columns of matching providers, as lightweight rows.
+
+        ``criteria`` are SQL expressions such as ``ProviderModel.state == "NY"``.
+        No ORM objects are built, so JSON columns not asked for are never read.
+        """
+        query = _projection(fields).where(*criteria).order_by(ProviderModel.id)
+        if limit is not None:
+            query = query.limit(limit)
+        result = await self.session.execute(query)
+        return result.all()
+    
+    async def stream_fields(
+        self, fields: Sequence[str], *criteria: Any, batch_size: int = STREAM_BATCH_SIZE
+    ) -> AsyncIterator[Row]:
+        """Like ``fetch_fields`` but streams rows with a server-side cursor.
+
+        Memory stays at ``batch_size`` rows however many providers match.
+        """
+        query = _projection(fields).where(*criteria).order_by(ProviderModel.id)
+        result = await self.session.stream(query.execution_options(yield_per=batch_size))
+        async for row in result:
+            yield row
+    
+    async def list_by_status(
+        self, status: ValidationStatus, limit: int = 100, fields: Sequence[str] = LISTING_FIELDS
+    ) -> Sequence[Row]:
         """List providers by validation status."""
-        result = await self.session.execute(
-            select(ProviderModel)
-            .where(ProviderModel.validation_status == status.value)
-            .limit(limit)
-        )
-        return list(result.scalars().all())
+        return await self.fetch_fields(fields, ProviderModel.validation_status == status.value, limit=limit)
     
-    async def list_requiring_review(self, limit: int = 100) -> List[ProviderModel]:
+    async def list_requiring_review(self, limit: int = 100, fields: Sequence[str] = LISTING_FIELDS) -> Sequence[Row]:
         """List providers requiring manual review, ordered by priority."""
-        result = await self.session.execute(
-            select(ProviderModel)
+        query = (
+            _projection(fields)
             .where(ProviderModel.requires_manual_review == True)
-            .order_by(ProviderModel.review_priority.desc())
+            .order_by(ProviderModel.review_priority.desc(), ProviderModel.id)
             .limit(limit)
         )
-        return list(result.scalars().all())
+        result = await self.session.execute(query)
+        return result.all()
+    
+    async def list_review_page(
+        self, limit: int = 50, after: Optional[Tuple[int, str]] = None
+    ) -> Sequence[Row]:
+        """One page of the review queue, highest priority first, keyset-paginated.
+
+        ``after`` is the ``(review_priority, id)`` of the last row of the
+        previous page. The order matches ``ix_providers_review_queue``, so each
+        page is an index range scan regardless of how deep it is.
+        """
+        query = _projection(REVIEW_QUEUE_FIELDS).where(ProviderModel.requires_manual_review == True)
+        if after is not None:
+            priority, last_id = after
+            query = query.where(
+                or_(
+                    ProviderModel.review_priority < priority,
+                    and_(ProviderModel.review_priority == priority, ProviderModel.id > last_id),
+                )
+            )
+        query = query.order_by(ProviderModel.review_priority.desc(), ProviderModel.id).limit(limit)
+        result = await self.session.execute(query)
+        return result.all()
+    
+    async def _next_versions(self, provider_ids: Sequence[str]) -> Dict[str, int]:
+        """Increment the version counter of each provider in one statement; ``id -> new version``.
+
+        The counter lives on the provider row, so archiving old records never
+        hands out a version again, and the UPDATE locks the rows until commit,
+        so concurrent writers take consecutive versions. The unique index on
+        ``(provider_id, version)`` rejects anything that still collides.
+        """
+        # Providers validated before the counter existed continue from their records
+        stored_max = (
+            select(func.max(ValidationRecordModel.version))
+            .where(ValidationRecordModel.provider_id == ProviderModel.id)
+            .scalar_subquery()
+        )
+        result = await self.session.execute(
+            update(ProviderModel)
+            .where(ProviderModel.id.in_(provider_ids))
+            .values(
+                validation_version=func.coalesce(ProviderModel.validation_version, stored_max, 0) + 1,
+                # Bookkeeping, not a change to the provider's data
+                updated_at=ProviderModel.updated_at,
+            )
+            .returning(ProviderModel.id, ProviderModel.validation_version)
+            .execution_options(synchronize_session=False)
+        )
+        versions = dict(result.all())
+        unknown = [provider_id for provider_id in provider_ids if provider_id not in versions]
+        if unknown:
+            raise LookupError(f"Unknown providers: {unknown}")
+        return versions
+    
+    async def _latest_states(self, versions: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+        """``data_after`` of each provider's record at ``version``, from one range query.
+
+        Providers whose record is gone (archived, or none yet) are left out.
+        """
+        ranges = [
+            and_(
+                ValidationRecordModel.provider_id == provider_id,
+                ValidationRecordModel.version.between(validation_history.keyframe_version(version), version),
+            )
+            for provider_id, version in versions.items()
+            if version >= 1
+        ]
+        if not ranges:
+            return {}
+        result = await self.session.execute(
+            select(*_HISTORY_REPLAY_COLUMNS)
+            .where(or_(*ranges))
+            .order_by(ValidationRecordModel.provider_id, ValidationRecordModel.version)
+        )
+        states = {}
+        for provider_id, rows in groupby(result.all(), key=lambda row: row.provider_id):
+            for row, _, after in validation_history.replay_records(rows):
+                if row.version == versions[provider_id]:
+                    states[provider_id] = after
+        return states
+    
+    async def _history_rows(self, entries: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Versioned, delta-encoded rows for ``provider_id -> record fields`` entries."""
+        versions = await self._next_versions(list(entries))
+        # None once the previous record is archived; the new record is then a keyframe
+        previous = await self._latest_states({provider_id: version - 1 for provider_id, version in versions.items()})
+        now = datetime.utcnow()
+        rows = []
+        for provider_id, fields in entries.items():
+            version = versions[provider_id]
+            data_before = validation_history.normalize(fields.pop("data_before"))
+            data_after = validation_history.normalize(fields.pop("data_after"))
+            delta_json, delta_blob = validation_history.encode(
+                validation_history.build_delta(previous.get(provider_id), data_before, data_after, version)
+            )
+            rows.append({
+                **fields,
+                "id": str(uuid.uuid4()),
+                "provider_id": provider_id,
+                "version": version,
+                "delta_json": delta_json,
+                "delta_blob": delta_blob,
+                "validated_at": now,
+            })
+        return rows
     
     async def create_validation_record(self, provider_id: str, validation_type: str, 
                                      status: str, confidence_score: float,
                                      data_before: dict, data_after: dict,
                                      discrepancies: List[str], validated_by: str,
-                                     notes: Optional[str] = None):
-        """Create a validation record."""
-        from ..database.models import ValidationRecordModel
-        record = ValidationRecordModel(
-            provider_id=provider_id,
-            validation_type=validation_type,
-            status=status,
-            confidence_score=confidence_score,
-            data_before=data_before,
-            data_after=data_after,
-            discrepancies=discrepancies,
-            validated_by=validated_by,
-            notes=notes,
-        )
+                                     notes: Optional[str] = None, batch_id: Optional[str] = None):
+        """Create a validation record, storing only its field-level delta."""
+        [values] = await self._history_rows({provider_id: {
+            "batch_id": batch_id,
+            "validation_type": validation_type,
+            "status": status,
+            "confidence_score": confidence_score,
+            "data_before": data_before,
+            "data_after": data_after,
+            "discrepancies": discrepancies,
+            "validated_by": validated_by,
+            "notes": notes,
+        }})
+        record = ValidationRecordModel(**values)
         self.session.add(record)
         await self.session.flush()
         return record
+    
+    async def record_validations(
+        self,
+        provider_ids: Sequence[str],
+        before: Sequence[Dict[str, Any]],
+        after: Sequence[EnrichedProvider],
+        validation_type: str,
+        validated_by: str,
+        batch_id: Optional[str] = None,
+        chunk_size: int = HISTORY_CHUNK_SIZE,
+    ) -> None:
+        """One validation record per provider, e.g. for the ids ``upsert_many`` returned.
 
+        ``before`` holds the ``validation_snapshot`` of each provider as it was
+        handed to validation; ``after`` the validated providers. Each chunk
+        costs three statements: the version bump, the previous-version lookup
+        and a multi-row insert. A provider listed twice gets one record, from
+        its last occurrence, as in ``upsert_many``.
+        """
+        latest = {
+            provider_id: (data_before, provider)
+            for provider_id, data_before, provider in zip(provider_ids, before, after)
+        }
+        unique = list(latest)
+        for start in range(0, len(unique), chunk_size):
+            entries = {}
+            for provider_id in unique[start:start + chunk_size]:
+                data_before, provider = latest[provider_id]
+                entries[provider_id] = {
+                    "batch_id": batch_id,
+                    "validation_type": validation_type,
+                    "status": provider.validation_status.value,
+                    "confidence_score": provider.overall_confidence,
+                    "data_before": data_before,
+                    "data_after": validation_snapshot(provider),
+                    "discrepancies": provider.discrepancies,
+                    "validated_by": validated_by,
+                    "notes": "\n".join(provider.validation_notes) or None,
+                }
+            rows = await self._history_rows(entries)
+            await self.session.execute(insert(ValidationRecordModel).values(rows))
+    
+    async def get_provider_version(self, provider_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Provider data as left by validation record ``version``, or None if there is none."""
+        keyframe = validation_history.keyframe_version(version)
+        result = await self.session.execute(
+            select(ValidationRecordModel)
+            .where(
+                ValidationRecordModel.provider_id == provider_id,
+                ValidationRecordModel.version.between(keyframe, version),
+            )
+            .order_by(ValidationRecordModel.version)
+        )
+        after = None
+        for _, _, after in validation_history.replay_records(result.scalars()):
+            pass
+        return after
+    
+    async def get_validation_history(self, provider_id: str, include_archived: bool = False) -> List[Dict[str, Any]]:
+        """Every validation of a provider, oldest first, with before/after data rebuilt.
+
+        With ``include_archived`` the entries moved to the archive by retention
+        come first.
+        """
+        result = await self.session.execute(
+            select(ValidationRecordModel)
+            .where(ValidationRecordModel.provider_id == provider_id)
+            .order_by(func.coalesce(ValidationRecordModel.version, 0), ValidationRecordModel.validated_at)
+        )
+        history = [
+            {
+                "id": record.id,
+                "provider_id": record.provider_id,
+                "version": record.version,
+                "validation_type": record.validation_type,
+                "status": record.status,
+                "confidence_score": record.confidence_score,
+                "validated_by": record.validated_by,
+                "validated_at": record.validated_at,
+                "discrepancies": record.discrepancies,
+                "notes": record.notes,
+                "data_before": before,
+                "data_after": after,
+            }
+            for record, before, after in validation_history.replay_records(result.scalars())
+        ]
+        if include_archived:
+            live = {entry["id"] for entry in history}
+            # Archived lines of records whose deletion did not go through are still live rows
+            archived = await asyncio.to_thread(validation_archive.read, provider_id)
+            history = [entry for entry in archived if entry["id"] not in live] + history
+        return history
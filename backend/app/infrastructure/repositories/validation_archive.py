@@ -0,0 +1,123 @@
+"""Monthly compressed NDJSON archives of old validation records.
+
+One file per month of ``validated_at``: ``YYYY-MM.ndjson.zst`` when the
+zstandard package is installed, otherwise ``YYYY-MM.ndjson.gz``. Batches are
+appended as independent compressed frames/members, which both formats read
+back as one stream. Entries carry rebuilt ``data_before``/``data_after``, so
+they do not depend on rows left in the database.
+
+Calls are blocking; async callers run them through ``asyncio.to_thread``.
+"""
+import gzip
+import io
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from ..settings import settings
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip is used instead
+    zstandard = None
+
+
+_EXTENSIONS = (".ndjson.zst", ".ndjson.gz")
+
+
+class ValidationArchive:
+    """Append-only store of archived validation history entries."""
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory = directory or settings.validation_archive_dir
+        self._lock = threading.Lock()
+
+    def _path(self, month: str) -> str:
+        extension = ".ndjson.zst" if zstandard is not None else ".ndjson.gz"
+        for existing in _EXTENSIONS:
+            # Keep appending to a month already started in the other format
+            path = os.path.join(self.directory, month + existing)
+            if os.path.exists(path):
+                return path
+        return os.path.join(self.directory, month + extension)
+
+    def append(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Append entries (history dicts with ``provider_id`` and ``validated_at``)."""
+        by_month: Dict[str, List[bytes]] = defaultdict(list)
+        for entry in entries:
+            validated_at = entry["validated_at"]
+            by_month[validated_at[:7]].append(json.dumps(entry, separators=(",", ":"), default=str).encode() + b"\n")
+        os.makedirs(self.directory, exist_ok=True)
+        written = 0
+        with self._lock:
+            for month, lines in by_month.items():
+                path = self._path(month)
+                data = b"".join(lines)
+                if path.endswith(".zst"):
+                    data = zstandard.ZstdCompressor(level=10).compress(data)
+                else:
+                    data = gzip.compress(data, compresslevel=9)
+                with open(path, "ab") as handle:
+                    handle.write(data)
+                    handle.flush()
+                    os.fsync(handle.fileno())
+                written += len(lines)
+        return written
+
+    def _months(self, since: Optional[datetime], until: Optional[datetime]) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        paths = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(_EXTENSIONS):
+                continue
+            month = name[:7]
+            if since is not None and month < since.strftime("%Y-%m"):
+                continue
+            if until is not None and month > until.strftime("%Y-%m"):
+                continue
+            paths.append(os.path.join(self.directory, name))
+        return paths
+
+    @staticmethod
+    def _lines(path: str) -> Iterator[str]:
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is required to read {path}")
+            with open(path, "rb") as raw:
+                reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+                yield from io.TextIOWrapper(reader, encoding="utf-8")
+        else:
+            with gzip.open(path, "rt", encoding="utf-8") as handle:
+                yield from handle
+
+    def read(
+        self,
+        provider_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """Archived entries, oldest first, optionally for one provider and time range."""
+        seen = set()
+        entries = []
+        for path in self._months(since, until):
+            for line in self._lines(path):
+                entry = json.loads(line)
+                if provider_id is not None and entry["provider_id"] != provider_id:
+                    continue
+                # A batch re-archived after a failed commit appears twice
+                if entry["id"] in seen:
+                    continue
+                validated_at = datetime.fromisoformat(entry["validated_at"])
+                if (since is not None and validated_at < since) or (until is not None and validated_at >= until):
+                    continue
+                seen.add(entry["id"])
+                entry["validated_at"] = validated_at
+                entries.append(entry)
+        entries.sort(key=lambda entry: (entry["validated_at"], entry.get("version") or 0))
+        return entries
+
+
+validation_archive = ValidationArchive()
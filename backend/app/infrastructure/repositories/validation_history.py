@@ -0,0 +1,123 @@
+"""Delta encoding for validation history.
+
+Each validation record stores the field-level changes it made
+(``{field: [before, after]}``) plus a ``base`` patch that turns the previous
+record's ``data_after`` into this record's ``data_before``. Usually the base is
+empty because validations chain. Every ``KEYFRAME_INTERVAL`` records a full
+snapshot is stored instead, so rebuilding a version reads a bounded number of
+rows.
+"""
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+KEYFRAME_INTERVAL = 20
+
+# Serialized deltas larger than this are zlib-compressed into the blob column
+COMPRESS_THRESHOLD_BYTES = 1024
+
+_MISSING = object()
+
+
+def keyframe_version(version: int) -> int:
+    """The version of the last keyframe at or before ``version``."""
+    return max(1, version - version % KEYFRAME_INTERVAL)
+
+
+def normalize(data: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON round-trip so stored and freshly computed values compare equal."""
+    return json.loads(json.dumps(data, default=str))
+
+
+def diff_fields(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """``{field: [before, after]}`` for every field whose value differs."""
+    changes = {}
+    for key in before.keys() | after.keys():
+        old, new = before.get(key, _MISSING), after.get(key, _MISSING)
+        if old != new:
+            # A field only present on one side is recorded as None on the other
+            changes[key] = [None if old is _MISSING else old, None if new is _MISSING else new]
+    return changes
+
+
+def patch(previous: Dict[str, Any], target: Dict[str, Any]) -> Dict[str, Any]:
+    """Patch turning ``previous`` into ``target``: ``{"set": {...}, "unset": [...]}``."""
+    result: Dict[str, Any] = {}
+    changed = {key: value for key, value in target.items() if previous.get(key, _MISSING) != value}
+    removed = sorted(previous.keys() - target.keys())
+    if changed:
+        result["set"] = changed
+    if removed:
+        result["unset"] = removed
+    return result
+
+
+def apply_patch(state: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    state = {**state, **delta.get("set", {})}
+    for key in delta.get("unset", []):
+        state.pop(key, None)
+    return state
+
+
+def build_delta(
+    previous_after: Optional[Dict[str, Any]],
+    data_before: Dict[str, Any],
+    data_after: Dict[str, Any],
+    version: int,
+) -> Dict[str, Any]:
+    """Delta payload for a new record; a keyframe when there is no usable predecessor."""
+    delta: Dict[str, Any] = {"changes": diff_fields(data_before, data_after)}
+    dropped = sorted(data_before.keys() - data_after.keys())
+    if dropped:
+        delta["dropped"] = dropped
+    if previous_after is None or version % KEYFRAME_INTERVAL == 0:
+        delta["snapshot"] = data_before
+    else:
+        delta["base"] = patch(previous_after, data_before)
+    return delta
+
+
+def replay(
+    previous_after: Optional[Dict[str, Any]], delta: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Rebuild ``(data_before, data_after)`` of a record from its delta."""
+    if "snapshot" in delta:
+        before = dict(delta["snapshot"])
+    else:
+        before = apply_patch(previous_after or {}, delta.get("base", {}))
+    after = dict(before)
+    for key, (_, new) in delta["changes"].items():
+        after[key] = new
+    for key in delta.get("dropped", []):
+        after.pop(key, None)
+    return before, after
+
+
+def encode(delta: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[bytes]]:
+    """``(json_value, blob)``: small deltas stay queryable JSON, large ones are compressed."""
+    raw = json.dumps(delta, separators=(",", ":"), default=str).encode()
+    if len(raw) <= COMPRESS_THRESHOLD_BYTES:
+        # Round-trip so values like datetimes are stored as the same strings as in blobs
+        return json.loads(raw), None
+    return None, zlib.compress(raw, 6)
+
+
+def decode(value: Optional[Dict[str, Any]], blob: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    if blob is not None:
+        return json.loads(zlib.decompress(blob))
+    return value
+
+
+def replay_records(records: Iterable[Any]) -> Iterator[Tuple[Any, Dict[str, Any], Dict[str, Any]]]:
+    """Yield ``(record, data_before, data_after)`` for one provider's records in version order."""
+    previous_after = None
+    for record in records:
+        delta = decode(record.delta_json, record.delta_blob)
+        if delta is None:
+            # Rows written before delta storage keep full snapshots
+            before, after = record.data_before, record.data_after
+        else:
+            before, after = replay(previous_after, delta)
+        previous_after = after
+        yield record, before, after
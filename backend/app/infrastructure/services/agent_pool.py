@@ -0,0 +1,183 @@
+"""Process-wide agent pool and orchestrator.
+
+``CodeAgent`` keeps the memory of the run in progress on the instance, so an
+agent must never serve two runs at once. The pool keeps up to
+``agent_pool_size`` instances of each agent kind, all sharing one model (and
+so one xAI client and its connections). Runs check an instance out for their
+duration. ``agent_max_active_runs`` caps the agent runs in flight across all
+kinds, counting abandoned runs whose worker thread has not returned yet.
+
+``init_agents``/``close_agents`` are called from the application lifespan.
+"""
+import asyncio
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
+from ...agents.agent import build_agent
+from ...agents.runner import run_threads
+from ...agents.specialized.data_validation_agent import DataValidationAgent
+from ...agents.specialized.information_enrichment_agent import InformationEnrichmentAgent
+from ...agents.specialized.quality_assurance_agent import QualityAssuranceAgent
+from ...agents.specialized.directory_management_agent import DirectoryManagementAgent
+from ..models.grok_model import GrokModel
+from ..settings import settings
+from ..logging import get_logger
+
+
+logger = get_logger(__name__)
+
+AGENT_FACTORIES: Dict[str, Callable[[Any], Any]] = {
+    "data_validation": DataValidationAgent,
+    "information_enrichment": InformationEnrichmentAgent,
+    "quality_assurance": QualityAssuranceAgent,
+    "directory_management": DirectoryManagementAgent,
+    "coordinator": build_agent,
+}
+
+
+class AgentPool:
+    """Reusable agent instances, checked out one run at a time."""
+
+    def __init__(
+        self,
+        model: Optional[GrokModel],
+        size: Optional[int] = None,
+        max_active_runs: Optional[int] = None,
+        factories: Optional[Dict[str, Callable[[Any], Any]]] = None,
+    ) -> None:
+        self.model = model
+        self.size = max(1, size or settings.agent_pool_size)
+        self._factories = factories or AGENT_FACTORIES
+        self._idle: Dict[str, asyncio.Queue] = {kind: asyncio.Queue() for kind in self._factories}
+        # One slot per agent a kind may have; holding one guarantees an idle agent or room to build
+        self._slots: Dict[str, asyncio.Semaphore] = {kind: asyncio.Semaphore(self.size) for kind in self._factories}
+        self._created: Dict[str, int] = {kind: 0 for kind in self._factories}
+        self._max_active_runs = max_active_runs or settings.agent_max_active_runs
+        self._active = asyncio.Semaphore(self._max_active_runs)
+        self._running = 0
+        self._runs = 0
+        # Releases waiting on the worker threads of abandoned runs
+        self._orphans: Set[asyncio.Task] = set()
+
+    def _build(self, kind: str) -> Any:
+        agent = self._factories[kind](self.model)
+        self._created[kind] += 1
+        return agent
+
+    def warm(self, per_kind: int = 1, kinds: Optional[Iterable[str]] = None) -> None:
+        """Build agents ahead of the first request."""
+        for kind in kinds or self._factories:
+            while self._created[kind] < min(per_kind, self.size):
+                self._idle[kind].put_nowait(self._build(kind))
+
+    @asynccontextmanager
+    async def checkout(self, kind: str) -> AsyncIterator[Any]:
+        """Exclusive use of one ``kind`` agent for the duration of a run.
+
+        A run that is cancelled or times out while its worker thread is still
+        going keeps the agent and both slots until the thread returns, so
+        ``agent_max_active_runs`` also bounds the abandoned runs.
+        """
+        if kind not in self._factories:
+            raise ValueError(f"Unknown agent kind: {kind}")
+        slot = self._slots[kind]
+        await slot.acquire()
+        try:
+            await self._active.acquire()
+        except BaseException:
+            slot.release()
+            raise
+        try:
+            idle = self._idle[kind]
+            agent = idle.get_nowait() if not idle.empty() else self._build(kind)
+        except BaseException:
+            # A factory error propagates with both slots released
+            self._active.release()
+            slot.release()
+            raise
+        self._running += 1
+        self._runs += 1
+        threads: List[Future] = []
+        token = run_threads.set(threads)
+        try:
+            yield agent
+        finally:
+            run_threads.reset(token)
+            running = [thread for thread in threads if not thread.done()]
+            if running:
+                task = asyncio.create_task(self._release_after(kind, agent, running))
+                self._orphans.add(task)
+                task.add_done_callback(self._orphans.discard)
+            else:
+                self._release(kind, agent)
+
+    def _release(self, kind: str, agent: Any) -> None:
+        self._running -= 1
+        self._idle[kind].put_nowait(agent)
+        self._active.release()
+        self._slots[kind].release()
+
+    async def _release_after(self, kind: str, agent: Any, threads: List[Future]) -> None:
+        await asyncio.wait([asyncio.wrap_future(thread) for thread in threads])
+        self._release(kind, agent)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "max_active_runs": self._max_active_runs,
+            "active_runs": self._running,
+            "abandoned_runs": len(self._orphans),
+            "total_runs": self._runs,
+            "agents": {kind: {"created": self._created[kind], "idle": self._idle[kind].qsize()} for kind in self._factories},
+        }
+
+    def close(self) -> None:
+        client = getattr(self.model, "client", None)
+        if client is not None and hasattr(client, "close"):
+            client.close()
+
+
+_pool: Optional[AgentPool] = None
+_orchestrator = None
+
+
+async def init_agents() -> None:
+    """Create the shared model, agent pool and orchestrator."""
+    global _pool, _orchestrator
+    from .orchestrator import AgentOrchestrator
+    model = None
+    if settings.grok_api_key:
+        try:
+            model = GrokModel(api_key=settings.grok_api_key)
+        except Exception as e:
+            logger.warning("grok_model_init_failed", error=str(e))
+    _pool = AgentPool(model)
+    if settings.agent_pool_warm and model is not None:
+        try:
+            _pool.warm()
+        except Exception as e:
+            # Agents are then built on first checkout instead
+            logger.warning("agent_pool_warm_failed", error=str(e))
+    _orchestrator = AgentOrchestrator(pool=_pool) if model is not None else None
+    logger.info("agent_pool_initialized", size=_pool.size, orchestrator=_orchestrator is not None)
+
+
+async def close_agents() -> None:
+    global _pool, _orchestrator
+    if _pool is not None:
+        _pool.close()
+    _pool = None
+    _orchestrator = None
+
+
+def get_agent_pool() -> AgentPool:
+    """The shared pool, created on first use outside the lifespan (scripts, tests)."""
+    global _pool
+    if _pool is None:
+        _pool = AgentPool(None)
+    return _pool
+
+
+def get_orchestrator():
+    """The shared orchestrator, or None when no Grok API key is configured."""
+    return _orchestrator
@@ -15,6 +15,8 @@ class ConfidenceScoringService:
         DataSource.PROVIDER_WEBSITE: 0.75,
         DataSource.GOOGLE_MAPS: 0.65,
         DataSource.PDF_EXTRACTION: 0.6,
+        # Snippets that merely mention the provider
+        DataSource.WEB_SEARCH: 0.5,
     }
     
     @staticmethod
@@ -0,0 +1,228 @@
+"""Rule-based provider validation from directly gathered evidence.
+
+The NPPES record (looked up by NPI) and, when the provider lists a website,
+the scraped site are turned into ``DataElementConfidence`` entries with
+normalized values, cross-validated with ``ConfidenceScoringService`` and
+compared with the stored values. When everything agrees, and a source other
+than NPPES confirms the phone and address, the result is conclusive and no
+LLM reasoning is needed; anything missing, failing, conflicting or backed by
+NPPES alone leaves the provider to the agents.
+"""
+import asyncio
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from ...agents.tools.web_scraping_tool import WebScrapingTool
+from ...domain.enriched_entities import DataElementConfidence, DataSource, EnrichedProvider, ValidationStatus
+from ..nppes import client as nppes_client
+from ..settings import settings
+from ..logging import get_logger
+from .confidence_scoring import ConfidenceScoringService
+
+
+logger = get_logger(__name__)
+
+# Elements the stored provider must have for a conclusive result
+REQUIRED_ELEMENTS = ("phone", "address")
+
+# Sources whose agreement alone does not corroborate a stored value
+UNCORROBORATING_SOURCES = (DataSource.NPPES, DataSource.WEB_SEARCH)
+
+
+def normalize(element: str, value: Optional[str]) -> Optional[str]:
+    """Canonical form used to compare one element across sources."""
+    if not value:
+        return None
+    if element == "phone":
+        digits = re.sub(r"\D", "", value)
+        return digits[-10:] if len(digits) >= 10 else None
+    if element == "email":
+        return value.strip().lower()
+    return re.sub(r"[^A-Z0-9]+", " ", value.upper()).strip() or None
+
+
+def address_key(line1: Optional[str], city: Optional[str], state: Optional[str]) -> Optional[str]:
+    if not (line1 and city and state):
+        return None
+    return normalize("address", f"{line1} {city} {state}")
+
+
+def stored_values(provider: EnrichedProvider) -> Dict[str, Optional[str]]:
+    return {
+        "phone": normalize("phone", provider.phone),
+        "email": normalize("email", provider.email),
+        "address": address_key(provider.address_line1, provider.city, provider.state),
+        "taxonomy": normalize("taxonomy", provider.taxonomy),
+    }
+
+
+def nppes_values(record: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    location = next(
+        (a for a in record.get("addresses") or [] if a.get("address_purpose") == "LOCATION"), {}
+    )
+    primary = next((t for t in record.get("taxonomies") or [] if t.get("primary")), None)
+    return {
+        "phone": normalize("phone", location.get("telephone_number")),
+        "address": address_key(location.get("address_1"), location.get("city"), location.get("state")),
+        # Providers store the taxonomy description, as search results do
+        "taxonomy": normalize("taxonomy", primary.get("desc") or primary.get("code")) if primary else None,
+    }
+
+
+def freeform_address(value: Optional[str], provider: EnrichedProvider) -> Optional[str]:
+    """Free-form address text supports the stored address when it contains the
+    street line and city; otherwise it is kept verbatim, so it disagrees."""
+    text = normalize("address", value)
+    if not text:
+        return None
+    line1, city = normalize("address", provider.address_line1), normalize("address", provider.city)
+    if line1 and city and line1 in text and city in text:
+        return stored_values(provider)["address"]
+    return text
+
+
+def scraped_values(data: Dict[str, Any], provider: EnrichedProvider) -> Dict[str, Optional[str]]:
+    return {
+        "phone": normalize("phone", data.get("phone")),
+        "email": normalize("email", data.get("email")),
+        "address": freeform_address(data.get("address"), provider),
+    }
+
+
+def maps_values(data: Dict[str, Any], provider: EnrichedProvider) -> Dict[str, Optional[str]]:
+    # Unverified lookups only echo the query back
+    if not data.get("verified"):
+        return {}
+    return {
+        "phone": normalize("phone", data.get("phone")),
+        "address": freeform_address(data.get("formatted_address"), provider),
+    }
+
+
+_PHONE_PATTERN = re.compile(r"\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}")
+
+
+def search_values(results: List[Dict[str, Any]], provider: EnrichedProvider) -> Dict[str, Optional[str]]:
+    """Phone from web search snippets that name the provider."""
+    name = normalize("name", provider.organization_name or provider.last_name)
+    if not name:
+        return {}
+    stored_phone = stored_values(provider)["phone"]
+    phones = []
+    for result in results:
+        text = f"{result.get('title', '')} {result.get('content', '')}"
+        if name not in (normalize("name", text) or ""):
+            continue
+        phones += [normalize("phone", match) for match in _PHONE_PATTERN.findall(text)]
+    phones = [phone for phone in phones if phone]
+    if not phones:
+        return {}
+    return {"phone": stored_phone if stored_phone in phones else phones[0]}
+
+
+def build_elements(evidence: Dict[DataSource, Dict[str, Optional[str]]]) -> List[DataElementConfidence]:
+    """One scored element per source and value, cross-validated across sources."""
+    scoring = ConfidenceScoringService()
+    now = datetime.utcnow()
+    elements = [
+        DataElementConfidence(
+            element_name=name,
+            value=value,
+            confidence_score=scoring.calculate_element_confidence(value, source),
+            source=source,
+            verified_at=now,
+        )
+        for source, values in evidence.items()
+        for name, value in values.items()
+        if value
+    ]
+    return scoring.cross_validate_elements(elements)
+
+
+def decide(provider: EnrichedProvider, elements: List[DataElementConfidence]) -> Tuple[bool, str]:
+    """``(conclusive, reason)`` for cross-validated evidence about ``provider``."""
+    stored = stored_values(provider)
+    missing = [name for name in REQUIRED_ELEMENTS if not stored[name]]
+    if missing:
+        return False, "incomplete:" + ",".join(missing)
+    if any(e.discrepancy_found for e in elements):
+        return False, "sources_disagree"
+    for element in elements:
+        if stored.get(element.element_name) and element.value != stored[element.element_name]:
+            return False, f"stored_differs:{element.element_name}"
+    unconfirmed = [name for name in REQUIRED_ELEMENTS if not any(e.element_name == name for e in elements)]
+    if unconfirmed:
+        return False, "unconfirmed:" + ",".join(unconfirmed)
+    # NPPES is self-reported and often stale, and a search snippet may be
+    # any page mentioning the provider; agreeing with those alone proves little
+    uncorroborated = [
+        name for name in REQUIRED_ELEMENTS
+        if not any(e.element_name == name and e.source not in UNCORROBORATING_SOURCES for e in elements)
+    ]
+    if uncorroborated:
+        return False, "uncorroborated:" + ",".join(uncorroborated)
+    overall = ConfidenceScoringService.calculate_overall_confidence(elements)
+    if overall < settings.fast_path_min_confidence:
+        return False, "low_confidence"
+    return True, "conclusive"
+
+
+def apply_elements(provider: EnrichedProvider, elements: List[DataElementConfidence]) -> EnrichedProvider:
+    """Copy element scores onto the provider's confidence fields."""
+    def best(name: str) -> float:
+        return max((e.confidence_score for e in elements if e.element_name == name), default=0.0)
+
+    provider.data_element_confidences = elements
+    provider.phone_confidence = best("phone")
+    provider.email_confidence = best("email")
+    provider.address_confidence = best("address")
+    provider.overall_confidence = ConfidenceScoringService.calculate_overall_confidence(elements)
+    return provider
+
+
+class RuleBasedPrecheck:
+    """Validates providers without the LLM when the evidence is conclusive."""
+
+    def __init__(self) -> None:
+        self._scraper: Optional[WebScrapingTool] = None
+
+    @property
+    def scraper(self) -> WebScrapingTool:
+        # Built on first use, only once a provider lists a website
+        if self._scraper is None:
+            self._scraper = WebScrapingTool()
+        return self._scraper
+
+    async def gather(self, provider: EnrichedProvider) -> Dict[DataSource, Dict[str, Optional[str]]]:
+        """Evidence per source; raises when a source needed for a decision is unavailable."""
+        lookups = [nppes_client.lookup(provider.npi)]
+        if provider.website:
+            lookups.append(self.scraper(provider.website))
+        record, *scraped = await asyncio.gather(*lookups)
+        if not record or (record.get("basic") or {}).get("status", "A") != "A":
+            raise LookupError("no active NPPES record")
+        evidence = {DataSource.NPPES: nppes_values(record)}
+        if scraped:
+            if "error" in scraped[0]:
+                raise LookupError(f"website unavailable: {scraped[0]['error']}")
+            evidence[DataSource.PROVIDER_WEBSITE] = scraped_values(scraped[0], provider)
+        return evidence
+
+    async def run(self, provider: EnrichedProvider) -> Tuple[Optional[EnrichedProvider], str]:
+        """``(validated_provider, reason)``; the provider is None when the agents are needed."""
+        if not provider.website:
+            # Only NPPES would be consulted, and it cannot be conclusive alone
+            return None, "uncorroborated:no_website"
+        try:
+            evidence = await self.gather(provider)
+        except Exception as e:
+            return None, f"evidence_unavailable: {e}"
+        elements = build_elements(evidence)
+        conclusive, reason = decide(provider, elements)
+        if not conclusive:
+            return None, reason
+        provider = apply_elements(provider, elements)
+        provider.validation_status = ValidationStatus.VALIDATED
+        provider.last_validated = datetime.utcnow()
+        provider.validation_notes.append("Validated by rule-based pre-check; agents skipped")
+        return provider, reason
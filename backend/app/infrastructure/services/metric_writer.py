@@ -0,0 +1,155 @@
+"""Buffered writer for quality metric points.
+
+``emit`` only appends to an in-memory buffer; a background task flushes it as
+multi-row inserts once ``metrics_flush_batch_size`` points are waiting or
+``metrics_flush_interval_seconds`` have passed. The buffer holds at most
+``metrics_buffer_max_points`` points. Past that, points are folded into one
+aggregate per metric name (mean value, with count/min/max in the metadata),
+and once that many names are being aggregated further points are dropped.
+"""
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from ..database import get_db
+from ..database.models import QualityMetricModel
+from ..settings import settings
+from ..logging import get_logger
+
+
+logger = get_logger(__name__)
+
+# 6 bound parameters per row
+INSERT_CHUNK_SIZE = 500
+
+
+class MetricWriter:
+    """Batches metric points into few transactions."""
+
+    def __init__(self, max_points: Optional[int] = None) -> None:
+        self._max_points = max_points or settings.metrics_buffer_max_points
+        self._buffer: List[Dict[str, Any]] = []
+        # metric_name -> [count, sum, min, max, threshold, last measured_at]
+        self._overflow: Dict[str, List[Any]] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"emitted": 0, "written": 0, "aggregated": 0, "dropped": 0, "flushes": 0, "failed_flushes": 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._task and not self._task.done())
+
+    def emit(
+        self,
+        metric_name: str,
+        value: float,
+        threshold: Optional[float] = None,
+        metadata: Optional[dict] = None,
+        measured_at: Optional[datetime] = None,
+    ) -> None:
+        """Queue a point without waiting for the database."""
+        measured_at = measured_at or datetime.utcnow()
+        self._stats["emitted"] += 1
+        if len(self._buffer) < self._max_points:
+            self._buffer.append({
+                "metric_name": metric_name,
+                "value": value,
+                "threshold": threshold,
+                "measured_at": measured_at,
+                "metadata_json": metadata or {},
+            })
+            if len(self._buffer) >= settings.metrics_flush_batch_size:
+                self._wake.set()
+            return
+        aggregate = self._overflow.get(metric_name)
+        if aggregate is None:
+            if len(self._overflow) >= self._max_points:
+                self._stats["dropped"] += 1
+                return
+            self._overflow[metric_name] = [1, value, value, value, threshold, measured_at]
+        else:
+            aggregate[0] += 1
+            aggregate[1] += value
+            aggregate[2] = min(aggregate[2], value)
+            aggregate[3] = max(aggregate[3], value)
+            aggregate[4] = threshold if threshold is not None else aggregate[4]
+            aggregate[5] = max(aggregate[5], measured_at)
+        self._stats["aggregated"] += 1
+        self._wake.set()
+
+    def _take(self) -> List[Dict[str, Any]]:
+        rows, self._buffer = self._buffer, []
+        for name, (count, total, low, high, threshold, measured_at) in self._overflow.items():
+            rows.append({
+                "metric_name": name,
+                "value": total / count,
+                "threshold": threshold,
+                "measured_at": measured_at,
+                "metadata_json": {"aggregated_points": count, "min": low, "max": high},
+            })
+        self._overflow = {}
+        return rows
+
+    async def flush(self) -> int:
+        """Write everything buffered; returns the number of rows inserted."""
+        rows = self._take()
+        if not rows:
+            return 0
+        for row in rows:
+            row["id"] = str(uuid.uuid4())
+
+        async def write(session):
+            for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+                await session.execute(insert(QualityMetricModel).values(rows[start:start + INSERT_CHUNK_SIZE]))
+
+        try:
+            await get_db().write(write)
+        except Exception as e:
+            self._stats["failed_flushes"] += 1
+            logger.warning("metric_flush_failed", points=len(rows), error=str(e))
+            # Put the batch back in front of newer points as far as the bound allows
+            room = max(self._max_points - len(self._buffer), 0)
+            self._stats["dropped"] += max(len(rows) - room, 0)
+            self._buffer = rows[:room] + self._buffer
+            return 0
+        self._stats["flushes"] += 1
+        self._stats["written"] += len(rows)
+        return len(rows)
+
+    async def _flush_forever(self, interval_seconds: float) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if not self.running:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._flush_forever(settings.metrics_flush_interval_seconds))
+
+    async def stop(self) -> None:
+        """Stop the flusher and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self.running,
+            "buffered": len(self._buffer),
+            "aggregating": len(self._overflow),
+            "max_points": self._max_points,
+        }
+
+
+metric_writer = MetricWriter()
@@ -1,11 +1,13 @@
 """Agent orchestration service."""
-from typing import List
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from ...domain.enriched_entities import EnrichedProvider
 from ...infrastructure.models.grok_model import GrokModel
-from ...agents.specialized.data_validation_agent import DataValidationAgent
-from ...agents.specialized.information_enrichment_agent import InformationEnrichmentAgent
-from ...agents.specialized.quality_assurance_agent import QualityAssuranceAgent
-from ...agents.specialized.directory_management_agent import DirectoryManagementAgent
+from .agent_pool import AgentPool
+from ...infrastructure.settings import settings
+from .metric_writer import metric_writer
+from .evidence import RuleBasedPrecheck
+from .pipeline import Finished, Stage, StagedPipeline
 from ...infrastructure.logging import get_logger
 
 
@@ -15,43 +17,253 @@ logger = get_logger(__name__)
 class AgentOrchestrator:
     """Orchestrates multiple agents for provider validation workflows."""
     
-    def __init__(self, model: GrokModel):
-        self.data_validation_agent = DataValidationAgent(model)
-        self.information_enrichment_agent = InformationEnrichmentAgent(model)
-        self.quality_assurance_agent = QualityAssuranceAgent(model)
-        self.directory_management_agent = DirectoryManagementAgent(model)
+    precheck: Optional[RuleBasedPrecheck] = None
+    
+    def __init__(self, model: Optional[GrokModel] = None, pool: Optional[AgentPool] = None):
+        # Agents are checked out of the pool per call, so concurrent runs never
+        # share an agent's run state
+        self.pool = pool or AgentPool(model)
+        if settings.fast_path_enabled:
+            self.precheck = RuleBasedPrecheck()
+    
+    async def _run_on_copy(self, kind: str, method: str, provider: EnrichedProvider) -> EnrichedProvider:
+        """Run one agent step on a deep copy of ``provider`` and return the copy.
+        
+        A timeout cancels the step but not the agent's worker thread, so the
+        agent never holds the caller's provider: on failure the caller still
+        has it unchanged to flag for review.
+        """
+        async with self.pool.checkout(kind) as agent:
+            return await getattr(agent, method)(provider.model_copy(deep=True))
+    
+    async def validate_contact(self, provider: EnrichedProvider) -> EnrichedProvider:
+        return await self._run_on_copy("data_validation", "validate_provider_contact", provider)
+    
+    async def enrich(self, provider: EnrichedProvider) -> EnrichedProvider:
+        return await self._run_on_copy("information_enrichment", "enrich_provider", provider)
+    
+    async def assess_quality(self, provider: EnrichedProvider) -> EnrichedProvider:
+        return await self._run_on_copy("quality_assurance", "assess_quality", provider)
+    
+    async def generate_report(self, *args: Any, **kwargs: Any) -> Any:
+        async with self.pool.checkout("directory_management") as agent:
+            return await agent.generate_report(*args, **kwargs)
+    
+    async def try_fast_path(self, provider: EnrichedProvider) -> Optional[EnrichedProvider]:
+        """The provider validated by rules alone, or None when the agents are needed."""
+        if self.precheck is None:
+            return None
+        try:
+            validated, reason = await asyncio.wait_for(
+                self.precheck.run(provider), settings.fast_path_timeout_seconds or None
+            )
+        except Exception as e:
+            validated, reason = None, f"precheck_failed: {e}"
+        logger.info("fast_path_decision", npi=provider.npi, skipped_llm=validated is not None, reason=reason)
+        return validated
+    
+    async def _precheck_stage(self, provider: EnrichedProvider) -> Any:
+        validated = await self.try_fast_path(provider)
+        return Finished(validated) if validated is not None else provider
+    
+    @staticmethod
+    def _report_skips(report: Dict[str, Any], total: int) -> None:
+        report["skip_rate"] = round(report["llm_skipped"] / total, 4) if total else 0.0
+        logger.info("fast_path_batch", total=total, llm_skipped=report["llm_skipped"], skip_rate=report["skip_rate"])
+        if metric_writer.running and total:
+            metric_writer.emit("llm_skip_rate", report["skip_rate"], metadata={"batch_size": total})
     
     async def validate_provider_workflow(self, provider: EnrichedProvider) -> EnrichedProvider:
         """Complete validation workflow for a provider."""
         logger.info("starting_validation_workflow", npi=provider.npi)
         
         # Step 1: Data Validation
-        provider = await self.data_validation_agent.validate_provider_contact(provider)
+        provider = await self.validate_contact(provider)
         
         # Step 2: Information Enrichment
-        provider = await self.information_enrichment_agent.enrich_provider(provider)
+        provider = await self.enrich(provider)
         
         # Step 3: Quality Assurance
-        provider = await self.quality_assurance_agent.assess_quality(provider)
+        provider = await self.assess_quality(provider)
         
         logger.info("validation_workflow_complete", npi=provider.npi, status=provider.validation_status.value)
         return provider
     
-    async def batch_validate_providers(self, providers: List[EnrichedProvider]) -> List[EnrichedProvider]:
-        """Batch validate multiple providers."""
-        logger.info("batch_validation_start", count=len(providers))
-        
-        results = []
-        for provider in providers:
-            try:
-                validated = await self.validate_provider_workflow(provider)
-                results.append(validated)
-            except Exception as e:
-                logger.error("provider_validation_failed", npi=provider.npi, error=str(e))
-                provider.requires_manual_review = True
-                provider.review_priority = 10
+    @staticmethod
+    def _flag_for_review(stage: str, provider: EnrichedProvider, error: BaseException) -> EnrichedProvider:
+        if isinstance(error, asyncio.TimeoutError):
+            logger.error("provider_stage_timeout", npi=provider.npi, stage=stage)
+            provider.validation_notes.append(f"{stage} timed out")
+        else:
+            logger.error("provider_stage_failed", npi=provider.npi, stage=stage, error=str(error))
+        provider.requires_manual_review = True
+        provider.review_priority = 10
+        return provider
+    
+    def build_pipeline(
+        self,
+        stage_concurrency: Optional[Dict[str, int]] = None,
+        queue_size: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        provider_timeout_seconds: Optional[float] = None,
+    ) -> StagedPipeline:
+        """Validation, enrichment and QA as worker pools joined by bounded queues.
+        
+        With the fast path on, a ``precheck`` stage runs first and sends
+        conclusive providers straight to the output. ``timeout_seconds``
+        bounds one provider's time in one stage (one agent run);
+        ``provider_timeout_seconds`` is a deadline for its whole trip through
+        the pipeline, as in the concurrent mode.
+        """
+        concurrency = {
+            "precheck": settings.pipeline_precheck_concurrency,
+            "validation": settings.pipeline_validation_concurrency,
+            "enrichment": settings.pipeline_enrichment_concurrency,
+            "quality_assurance": settings.pipeline_qa_concurrency,
+            **(stage_concurrency or {}),
+        }
+        stages = [
+            Stage("validation", self.validate_contact, concurrency["validation"]),
+            Stage("enrichment", self.enrich, concurrency["enrichment"]),
+            Stage("quality_assurance", self.assess_quality, concurrency["quality_assurance"]),
+        ]
+        if self.precheck is not None:
+            stages.insert(0, Stage("precheck", self._precheck_stage, concurrency["precheck"]))
+        return StagedPipeline(
+            stages,
+            queue_size=queue_size or settings.pipeline_queue_size,
+            on_error=self._flag_for_review,
+            timeout_seconds=timeout_seconds if timeout_seconds is not None else settings.pipeline_stage_timeout_seconds,
+            item_timeout_seconds=(
+                provider_timeout_seconds if provider_timeout_seconds is not None
+                else settings.orchestrator_provider_timeout_seconds
+            ),
+        )
+    
+    async def pipeline_validate_providers(
+        self,
+        providers: List[EnrichedProvider],
+        stage_concurrency: Optional[Dict[str, int]] = None,
+        timeout_seconds: Optional[float] = None,
+        ordered: bool = True,
+        provider_timeout_seconds: Optional[float] = None,
+    ) -> Tuple[List[EnrichedProvider], Dict[str, Dict[str, Any]]]:
+        """Run a batch through the staged pipeline; returns results and per-stage stats.
+        
+        A provider failing or timing out in a stage skips the later stages
+        and is flagged for review at priority 10.
+        """
+        pipeline = self.build_pipeline(
+            stage_concurrency, timeout_seconds=timeout_seconds, provider_timeout_seconds=provider_timeout_seconds
+        )
+        results: List[Optional[EnrichedProvider]] = [None] * len(providers) if ordered else []
+        async for index, provider in pipeline.run(providers):
+            if ordered:
+                results[index] = provider
+            else:
+                results.append(provider)
+        stats = pipeline.stats()
+        for stage, values in stats.items():
+            logger.info("pipeline_stage_stats", stage=stage, **values)
+            if metric_writer.running:
+                for key in ("throughput_per_second", "avg_latency_seconds", "max_queue_depth"):
+                    metric_writer.emit(f"pipeline_{stage}_{key}", float(values[key]), metadata={"batch_size": len(providers)})
+        return results, stats
+    
+    async def _validate_or_flag(self, provider: EnrichedProvider, timeout_seconds: Optional[float]) -> EnrichedProvider:
+        """Run the workflow; a failure or timeout flags the provider for review."""
+        try:
+            return await asyncio.wait_for(self.validate_provider_workflow(provider), timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.error("provider_validation_timeout", npi=provider.npi, timeout_seconds=timeout_seconds)
+            provider.validation_notes.append(f"Validation timed out after {timeout_seconds}s")
+        except Exception as e:
+            logger.error("provider_validation_failed", npi=provider.npi, error=str(e))
+        provider.requires_manual_review = True
+        provider.review_priority = 10
+        return provider
+    
+    async def iter_validate_providers(
+        self,
+        providers: List[EnrichedProvider],
+        concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        report: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Tuple[int, EnrichedProvider]]:
+        """Yield ``(input_index, provider)`` as each provider finishes.
+        
+        At most ``concurrency`` workflows run at once. Each worker pulls the
+        next provider when it finishes one, so the number of in-flight
+        tasks stays at the worker count whatever the batch size. Providers
+        the rule-based pre-check settles skip the agents and are counted in
+        ``report["llm_skipped"]``.
+        """
+        report = report if report is not None else {}
+        report.setdefault("llm_skipped", 0)
+        concurrency = max(1, min(concurrency or settings.orchestrator_batch_concurrency, len(providers) or 1))
+        timeout_seconds = timeout_seconds if timeout_seconds is not None else settings.orchestrator_provider_timeout_seconds
+        pending = iter(enumerate(providers))
+        done: asyncio.Queue = asyncio.Queue()
+        
+        async def worker() -> None:
+            for index, provider in pending:
+                validated = await self.try_fast_path(provider)
+                if validated is not None:
+                    report["llm_skipped"] += 1
+                else:
+                    validated = await self._validate_or_flag(provider, timeout_seconds or None)
+                await done.put((index, validated))
+        
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for _ in range(len(providers)):
+                yield await done.get()
+        finally:
+            # Stops the remaining work if the caller abandons the iteration
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    
+    async def batch_validate_providers(
+        self,
+        providers: List[EnrichedProvider],
+        concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        ordered: bool = True,
+        mode: Optional[str] = None,
+        report: Optional[Dict[str, Any]] = None,
+    ) -> List[EnrichedProvider]:
+        """Batch validate multiple providers concurrently.
+        
+        ``mode`` is ``"concurrent"`` (whole workflows on a worker pool) or
+        ``"pipeline"`` (see ``pipeline_validate_providers``); it defaults to
+        ``orchestrator_batch_mode``. Results are in input order, or in
+        completion order with ``ordered=False``. ``report``, when given, is
+        filled with ``llm_skipped`` and ``skip_rate`` for the batch (and the
+        per-stage stats in pipeline mode).
+        """
+        mode = mode or settings.orchestrator_batch_mode
+        report = report if report is not None else {}
+        logger.info("batch_validation_start", count=len(providers), mode=mode)
+        
+        if mode == "pipeline":
+            results, stats = await self.pipeline_validate_providers(
+                providers, ordered=ordered, provider_timeout_seconds=timeout_seconds
+            )
+            report["stages"] = stats
+            report["llm_skipped"] = stats.get("precheck", {}).get("finished_early", 0)
+            self._report_skips(report, len(providers))
+            logger.info("batch_validation_complete", total=len(providers), validated=len(results))
+            return results
+        
+        results: List[Optional[EnrichedProvider]] = [None] * len(providers) if ordered else []
+        async for index, provider in self.iter_validate_providers(providers, concurrency, timeout_seconds, report):
+            if ordered:
+                results[index] = provider
+            else:
                 results.append(provider)
         
+        self._report_skips(report, len(providers))
         logger.info("batch_validation_complete", total=len(providers), validated=len(results))
         return results
 
@@ -0,0 +1,163 @@
+"""Staged async pipeline with bounded queues between worker pools.
+
+Each stage is a pool of workers reading from its own bounded queue and
+writing to the next stage's queue, so a slow stage fills its input queue and
+blocks the stage before it instead of letting work pile up in memory. Items
+that fail a stage skip the remaining stages and go through ``on_error``;
+a handler can also end an item's trip early by returning ``Finished(item)``.
+
+Two timeouts apply: ``timeout_seconds`` bounds each handler call, and
+``item_timeout_seconds`` is a deadline for an item's whole trip, queue waits
+included. Either one expiring fails the item with ``asyncio.TimeoutError``.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+
+Handler = Callable[[Any], Awaitable[Any]]
+ErrorHandler = Callable[[str, Any, BaseException], Any]
+
+_DONE = object()
+
+
+class Finished:
+    """Returned by a handler to send an item straight to the output, skipping later stages."""
+
+    def __init__(self, item: Any) -> None:
+        self.item = item
+
+
+class Stage:
+    """One step of a pipeline: a handler and how many workers run it."""
+
+    def __init__(self, name: str, handler: Handler, concurrency: int = 1) -> None:
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.queue: Optional[asyncio.Queue] = None
+        self.processed = 0
+        self.failed = 0
+        self.finished_early = 0
+        self.busy_seconds = 0.0
+        self.max_latency_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_queue_depth = 0
+        self.first_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        handled = self.processed + self.failed
+        elapsed = (self.last_finished or 0.0) - (self.first_started or 0.0)
+        return {
+            "concurrency": self.concurrency,
+            "processed": self.processed,
+            "failed": self.failed,
+            "finished_early": self.finished_early,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "avg_latency_seconds": round(self.busy_seconds / handled, 4) if handled else 0.0,
+            "max_latency_seconds": round(self.max_latency_seconds, 4),
+            "avg_queue_wait_seconds": round(self.wait_seconds / handled, 4) if handled else 0.0,
+            "throughput_per_second": round(handled / elapsed, 3) if elapsed > 0 else 0.0,
+            # Share of the stage's active time its workers were busy
+            "utilization": round(self.busy_seconds / (elapsed * self.concurrency), 3) if elapsed > 0 else 0.0,
+        }
+
+
+class StagedPipeline:
+    """Runs items through ``stages`` in order, each stage with its own worker pool."""
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        queue_size: int,
+        on_error: ErrorHandler,
+        timeout_seconds: Optional[float] = None,
+        item_timeout_seconds: Optional[float] = None,
+    ) -> None:
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.on_error = on_error
+        self.timeout_seconds = timeout_seconds or None
+        self.item_timeout_seconds = item_timeout_seconds or None
+
+    async def _put(self, stage: Stage, entry: Any) -> None:
+        await stage.queue.put(entry)
+        stage.max_queue_depth = max(stage.max_queue_depth, stage.queue.qsize())
+
+    async def _work(self, position: int, output: asyncio.Queue) -> None:
+        stage = self.stages[position]
+        following = self.stages[position + 1] if position + 1 < len(self.stages) else None
+        while True:
+            entry = await stage.queue.get()
+            if entry is _DONE:
+                return
+            index, item, enqueued, deadline = entry
+            started = time.monotonic()
+            stage.wait_seconds += started - enqueued
+            if stage.first_started is None:
+                stage.first_started = started
+            remaining = deadline - started if deadline is not None else None
+            timeout = min((t for t in (self.timeout_seconds, remaining) if t is not None), default=None)
+            try:
+                if timeout is not None and timeout <= 0:
+                    raise asyncio.TimeoutError()
+                item = await asyncio.wait_for(stage.handler(item), timeout)
+                ok = True
+            except Exception as e:
+                item = self.on_error(stage.name, item, e)
+                ok = False
+            finished = time.monotonic()
+            stage.busy_seconds += finished - started
+            stage.max_latency_seconds = max(stage.max_latency_seconds, finished - started)
+            stage.last_finished = finished
+            if ok:
+                stage.processed += 1
+            else:
+                stage.failed += 1
+            if isinstance(item, Finished):
+                stage.finished_early += 1
+                await output.put((index, item.item))
+            elif ok and following is not None:
+                await self._put(following, (index, item, finished, deadline))
+            else:
+                await output.put((index, item))
+
+    async def _run_stage(self, position: int, output: asyncio.Queue) -> None:
+        stage = self.stages[position]
+        await asyncio.gather(*(self._work(position, output) for _ in range(stage.concurrency)))
+        if position + 1 < len(self.stages):
+            following = self.stages[position + 1]
+            for _ in range(following.concurrency):
+                await following.queue.put(_DONE)
+
+    async def _feed(self, items: Sequence[Any]) -> None:
+        first = self.stages[0]
+        for index, item in enumerate(items):
+            fed = time.monotonic()
+            deadline = fed + self.item_timeout_seconds if self.item_timeout_seconds else None
+            await self._put(first, (index, item, fed, deadline))
+        for _ in range(first.concurrency):
+            await first.queue.put(_DONE)
+
+    async def run(self, items: Sequence[Any]) -> AsyncIterator[Tuple[int, Any]]:
+        """Yield ``(input_index, result)`` as items leave the pipeline."""
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=self.queue_size)
+        # Unbounded: holds at most one entry per item and is drained as it fills
+        output: asyncio.Queue = asyncio.Queue()
+        tasks = [asyncio.create_task(self._feed(items))]
+        tasks += [asyncio.create_task(self._run_stage(position, output)) for position in range(len(self.stages))]
+        try:
+            for _ in range(len(items)):
+                yield await output.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stage.name: stage.stats() for stage in self.stages}
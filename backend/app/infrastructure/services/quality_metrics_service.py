@@ -1,15 +1,81 @@
 """Quality metrics tracking service."""
-from typing import List, Optional, Dict, Any
+import asyncio
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from ...domain.enriched_entities import QualityMetric
 from ...infrastructure.database import get_db
-from ...infrastructure.database.models import QualityMetricModel
-from sqlalchemy import select, func
+from ...infrastructure.database.models import QualityMetricModel, QualityMetricRollupModel
+from sqlalchemy import Integer, cast, select, func, literal, union_all
+from ...infrastructure.repositories import provider_aggregates
+from .metric_writer import metric_writer
+from ...infrastructure.settings import settings
 from ...infrastructure.logging import get_logger
+from bisect import bisect_left
+from collections import defaultdict
+import math
 
 
 logger = get_logger(__name__)
 
+# A point's trend compares the day before it with the six days before that
+TREND_LOOKBACK = timedelta(days=7)
+TREND_RECENT = timedelta(days=1)
+TREND_STABLE_DELTA = 0.05
+
+# Rollup granularities, listed so queries can use ix_quality_metric_rollups_bucket
+ROLLUP_GRANULARITIES = ("hour", "day")
+
+# julianday() of 1970-01-01T00:00:00
+_JULIAN_DAY_EPOCH = 2440587.5
+_EPOCH = datetime(1970, 1, 1)
+
+DIRECTORY_QUALITY_THRESHOLD = 0.8
+
+
+def _trend(prev_avg: float, current_avg: float) -> str:
+    if abs(current_avg - prev_avg) < TREND_STABLE_DELTA:
+        return "stable"
+    elif current_avg > prev_avg:
+        return "improving"
+    else:
+        return "declining"
+
+
+def _trends(times: List[datetime], totals: List[float], counts: List[int]) -> List[str]:
+    """Trend of every point in a time-sorted series, using prefix sums.
+
+    For a point at ``t`` the previous average covers ``[t-7d, t-1d)`` and the
+    current one ``[t-1d, t)``; an empty window averages to 0.
+    """
+    sums, weights = [0.0], [0]
+    for total, count in zip(totals, counts):
+        sums.append(sums[-1] + total)
+        weights.append(weights[-1] + count)
+
+    def avg(start: int, end: int) -> float:
+        weight = weights[end] - weights[start]
+        return (sums[end] - sums[start]) / weight if weight else 0.0
+
+    trends = []
+    for t in times:
+        lookback, recent, now = (bisect_left(times, t - TREND_LOOKBACK),
+                                 bisect_left(times, t - TREND_RECENT),
+                                 bisect_left(times, t))
+        trends.append(_trend(avg(lookback, recent), avg(recent, now)))
+    return trends
+
+
+def _epoch_seconds(column: Any, dialect: str) -> Any:
+    """SQL for a DateTime column as seconds since 1970."""
+    if dialect == "sqlite":
+        return (func.julianday(column) - _JULIAN_DAY_EPOCH) * 86400.0
+    return func.extract("epoch", column)
+
+
+def _floor(value: Any, dialect: str) -> Any:
+    # CAST truncates on SQLite, which is floor for the non-negative offsets used here
+    return cast(value, Integer) if dialect == "sqlite" else func.floor(value)
+
 
 class QualityMetricsService:
     """Service for tracking and analyzing quality metrics."""
@@ -17,99 +83,183 @@ class QualityMetricsService:
     async def record_metric(self, metric_name: str, value: float, 
                            threshold: Optional[float] = None,
                            metadata: Optional[dict] = None):
-        """Record a quality metric."""
-        db = get_db()
-        async with db.get_session() as session:
-            metric = QualityMetricModel(
-                metric_name=metric_name,
-                value=value,
-                threshold=threshold,
-                trend=None,  # Would be calculated on read
-                metadata_json=metadata or {},
-            )
+        """Record a quality metric.
+
+        While the buffered writer runs the point is only queued; it reaches
+        the database with the writer's next multi-row flush.
+        """
+        if metric_writer.running:
+            metric_writer.emit(metric_name, value, threshold=threshold, metadata=metadata)
+            return
+        metric = QualityMetricModel(
+            metric_name=metric_name,
+            value=value,
+            threshold=threshold,
+            trend=None,  # Would be calculated on read
+            metadata_json=metadata or {},
+        )
+
+        async def insert(session):
             session.add(metric)
-            await session.flush()
+
+        # Small, frequent writes: let the writer group-commit them
+        await get_db().write(insert)
     
     async def get_metrics(self, metric_name: Optional[str] = None,
-                         days: int = 30) -> List[QualityMetric]:
-        """Get quality metrics."""
-        db = get_db()
-        async with db.get_session() as session:
-            since = datetime.utcnow() - timedelta(days=days)
-            
-            query = select(QualityMetricModel).where(
-                QualityMetricModel.measured_at >= since
-            )
-            
-            if metric_name:
-                query = query.where(QualityMetricModel.metric_name == metric_name)
-            
-            query = query.order_by(QualityMetricModel.measured_at.desc())
-            
-            result = await session.execute(query)
-            metrics = result.scalars().all()
-            
-            # Calculate trends
-            metrics_list = []
-            for m in metrics:
-                trend = await self._calculate_trend(session, m.metric_name, m.measured_at)
-                metrics_list.append(QualityMetric(
-                    metric_name=m.metric_name,
-                    value=m.value,
-                    threshold=m.threshold,
-                    trend=trend,
-                    measured_at=m.measured_at,
-                ))
-            
-            return metrics_list
-    
-    async def _calculate_trend(self, session, metric_name: str, current_time: datetime) -> str:
-        """Calculate trend for a metric."""
-        # Compare with previous period
-        prev_start = current_time - timedelta(days=7)
-        prev_end = current_time - timedelta(days=1)
-        
-        current_start = current_time - timedelta(days=1)
-        
-        # Get previous average
-        prev_query = select(func.avg(QualityMetricModel.value)).where(
-            QualityMetricModel.metric_name == metric_name,
-            QualityMetricModel.measured_at >= prev_start,
-            QualityMetricModel.measured_at < prev_end,
-        )
-        prev_result = await session.execute(prev_query)
-        prev_avg = prev_result.scalar() or 0.0
-        
-        # Get current average
-        current_query = select(func.avg(QualityMetricModel.value)).where(
-            QualityMetricModel.metric_name == metric_name,
-            QualityMetricModel.measured_at >= current_start,
-            QualityMetricModel.measured_at < current_time,
+                         days: int = 30,
+                         max_points_per_series: Optional[int] = None) -> List[QualityMetric]:
+        """Get quality metrics, newest first, with trends.
+
+        Raw points and rollup buckets (reported as their mean) come back from
+        one query that reaches a week further back than ``days``, so every
+        trend is computed from the loaded points without per-row queries.
+        With ``max_points_per_series`` the query itself averages each series
+        into at most that many equal time buckets (after one query for the
+        time range), so only the buckets are loaded; each bucket is reported
+        at its latest point.
+        """
+        now = datetime.utcnow()
+        since = now - timedelta(days=days)
+        lookback = since - TREND_LOOKBACK
+        raw = select(
+            QualityMetricModel.metric_name.label("metric_name"),
+            QualityMetricModel.value.label("total"),
+            literal(1).label("count"),
+            QualityMetricModel.threshold.label("threshold"),
+            QualityMetricModel.measured_at.label("measured_at"),
+        ).where(QualityMetricModel.measured_at >= lookback)
+        rollups = select(
+            QualityMetricRollupModel.metric_name,
+            QualityMetricRollupModel.value_sum,
+            QualityMetricRollupModel.count,
+            QualityMetricRollupModel.threshold,
+            QualityMetricRollupModel.bucket_start,
+        ).where(
+            QualityMetricRollupModel.granularity.in_(ROLLUP_GRANULARITIES),
+            QualityMetricRollupModel.bucket_start >= lookback,
         )
-        current_result = await session.execute(current_query)
-        current_avg = current_result.scalar() or 0.0
-        
-        # Determine trend
-        if abs(current_avg - prev_avg) < 0.05:
-            return "stable"
-        elif current_avg > prev_avg:
-            return "improving"
-        else:
-            return "declining"
+        if metric_name:
+            raw = raw.where(QualityMetricModel.metric_name == metric_name)
+            rollups = rollups.where(QualityMetricRollupModel.metric_name == metric_name)
+        points = union_all(raw, rollups).subquery()
+
+        # metric_name -> [(measured_at, total, count, threshold)]
+        series: Dict[str, List[Tuple[datetime, float, int, Optional[float]]]] = defaultdict(list)
+        async with get_db().get_read_session() as session:
+            if not max_points_per_series:
+                for row in await session.execute(select(points)):
+                    series[row.metric_name].append((row.measured_at, row.total, row.count, row.threshold))
+            else:
+                first, last = (await session.execute(
+                    select(func.min(points.c.measured_at), func.max(points.c.measured_at))
+                    .where(points.c.measured_at >= since)
+                )).one()
+                if first is None:
+                    return []
+                span = (last - first).total_seconds() / max_points_per_series or 1.0
+                # Count buckets from a start before the lookback so every offset is non-negative
+                shift = math.ceil((first - lookback).total_seconds() / span)
+                origin = (first - _EPOCH).total_seconds() - shift * span
+                dialect = session.get_bind().dialect.name
+                bucket = _floor((_epoch_seconds(points.c.measured_at, dialect) - origin) / span, dialect).label("bucket")
+                result = await session.execute(
+                    select(
+                        points.c.metric_name,
+                        bucket,
+                        func.max(points.c.measured_at).label("measured_at"),
+                        func.sum(points.c.total).label("total"),
+                        func.sum(points.c.count).label("count"),
+                        func.max(points.c.threshold).label("threshold"),
+                    ).group_by(points.c.metric_name, bucket)
+                )
+                merged: Dict[Tuple[str, int], List[Any]] = {}
+                for row in result:
+                    index = row.bucket - shift
+                    if row.measured_at >= since:
+                        # The last point starts a bucket of its own and rounding can push
+                        # the first one back a bucket; fold both into the range
+                        index = min(max(index, 0), max_points_per_series - 1)
+                    key = (row.metric_name, index)
+                    entry = merged.get(key)
+                    if entry is None:
+                        merged[key] = [row.measured_at, row.total, row.count, row.threshold]
+                    else:
+                        entry[0] = max(entry[0], row.measured_at)
+                        entry[1] += row.total
+                        entry[2] += row.count
+                for (name, _), (measured_at, total, count, threshold) in merged.items():
+                    series[name].append((measured_at, total, count, threshold))
+
+        metrics_list = []
+        for name, rows in series.items():
+            rows.sort(key=lambda r: r[0])
+            trends = _trends([r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows])
+            metrics_list.extend(
+                QualityMetric(
+                    metric_name=name,
+                    value=total / count if count else 0.0,
+                    threshold=threshold,
+                    trend=trend,
+                    measured_at=measured_at,
+                )
+                for (measured_at, total, count, threshold), trend in zip(rows, trends)
+                if measured_at >= since
+            )
+        metrics_list.sort(key=lambda m: m.measured_at, reverse=True)
+        return metrics_list
     
+    async def directory_quality_summary(self) -> Dict[str, Any]:
+        """Directory score with histogram and state/taxonomy/status breakdowns.
+
+        Reads the incrementally maintained aggregates, so the cost does not
+        grow with the number of providers.
+        """
+        async with get_db().get_read_session() as session:
+            return await provider_aggregates.summary(session)
+
     async def calculate_directory_quality_score(self) -> float:
         """Calculate overall directory quality score."""
-        db = get_db()
-        async with db.get_session() as session:
-            from ...infrastructure.database.models import ProviderModel
-            
-            # Get average confidence across all providers
-            query = select(func.avg(ProviderModel.overall_confidence))
-            result = await session.execute(query)
-            avg_confidence = result.scalar() or 0.0
-            
-            # Record metric
-            await self.record_metric("directory_quality_score", avg_confidence, threshold=0.8)
-            
-            return round(avg_confidence, 2)
+        summary = await self.directory_quality_summary()
+        return round(summary["average_confidence"], 2)
+
+    async def record_directory_quality_score(self) -> float:
+        """Record the current directory score as a metric point."""
+        summary = await self.directory_quality_summary()
+        score = summary["average_confidence"]
+        await self.record_metric("directory_quality_score", score, threshold=DIRECTORY_QUALITY_THRESHOLD)
+        return score
+
+
+class DirectoryQualityRecorder:
+    """Records ``directory_quality_score`` on a schedule instead of on every read."""
+
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run_forever(self, interval_seconds: float) -> None:
+        service = QualityMetricsService()
+        while True:
+            try:
+                await service.record_directory_quality_score()
+            except Exception as e:
+                logger.error("directory_quality_record_failed", error=str(e), exc_info=True)
+            await asyncio.sleep(interval_seconds)
+
+    def start(self) -> None:
+        interval = settings.directory_quality_record_interval_seconds
+        if interval > 0 and (not self._task or self._task.done()):
+            self._task = asyncio.create_task(self._run_forever(interval))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+
+
+directory_quality_recorder = DirectoryQualityRecorder()
 
@@ -0,0 +1,287 @@
+"""Retention for quality metrics and validation history.
+
+Raw metric points older than ``metrics_raw_retention_days`` are folded into
+hourly rollups, and hourly rollups older than ``metrics_hourly_retention_days``
+into daily ones. Validation records older than ``validation_archive_after_days``
+move to the monthly archive files. Every step commits in small transactions
+(one day of metrics, or one batch of providers) so the writer connection is
+never held for long; archiving reads on the read pool and writes the
+archive files before it touches the writer.
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import delete, func, select, update
+from ..database import get_db
+from ..database.models import QualityMetricModel, QualityMetricRollupModel, ValidationRecordModel
+from ..repositories import validation_history
+from ..repositories.validation_archive import ValidationArchive, validation_archive
+from ..settings import settings
+from ..logging import get_logger
+
+
+logger = get_logger(__name__)
+
+# (metric_name, bucket_start) -> [count, sum, min, max, threshold]
+_Buckets = Dict[Tuple[str, datetime], List[Any]]
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    start = moment.replace(minute=0, second=0, microsecond=0)
+    return start.replace(hour=0) if granularity == "day" else start
+
+
+def _accumulate(
+    buckets: _Buckets, name: str, start: datetime, count: int, total: float,
+    low: Optional[float], high: Optional[float], threshold: Optional[float],
+) -> None:
+    bucket = buckets.get((name, start))
+    if bucket is None:
+        buckets[(name, start)] = [count, total, low, high, threshold]
+        return
+    bucket[0] += count
+    bucket[1] += total
+    if low is not None:
+        bucket[2] = low if bucket[2] is None else min(bucket[2], low)
+    if high is not None:
+        bucket[3] = high if bucket[3] is None else max(bucket[3], high)
+    if threshold is not None:
+        bucket[4] = threshold
+
+
+class RetentionService:
+    """Rolls up metrics and archives validation history on a schedule."""
+
+    def __init__(self, archive: Optional[ValidationArchive] = None) -> None:
+        self.archive = archive or validation_archive
+        self._task: Optional[asyncio.Task] = None
+        self._last_run: Dict[str, Any] = {}
+
+    async def _merge_rollups(self, session, granularity: str, buckets: _Buckets) -> None:
+        """Add ``buckets`` into existing rollup rows, creating the missing ones."""
+        if not buckets:
+            return
+        names = {name for name, _ in buckets}
+        starts = {start for _, start in buckets}
+        result = await session.execute(
+            select(QualityMetricRollupModel).where(
+                QualityMetricRollupModel.granularity == granularity,
+                QualityMetricRollupModel.metric_name.in_(names),
+                QualityMetricRollupModel.bucket_start.in_(starts),
+            )
+        )
+        existing = {(row.metric_name, row.bucket_start): row for row in result.scalars()}
+        for key, (count, total, low, high, threshold) in buckets.items():
+            row = existing.get(key)
+            if row is None:
+                session.add(QualityMetricRollupModel(
+                    metric_name=key[0], granularity=granularity, bucket_start=key[1],
+                    count=count, value_sum=total, value_min=low, value_max=high, threshold=threshold,
+                ))
+                continue
+            merged: _Buckets = {key: [row.count, row.value_sum, row.value_min, row.value_max, row.threshold]}
+            _accumulate(merged, key[0], key[1], count, total, low, high, threshold)
+            row.count, row.value_sum, row.value_min, row.value_max, row.threshold = merged[key]
+
+    async def rollup_raw_metrics(self, now: Optional[datetime] = None) -> int:
+        """Fold raw points past retention into hourly rollups, one day per transaction."""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=settings.metrics_raw_retention_days)
+        rolled = 0
+        while True:
+            async with get_db().get_session() as session:
+                oldest = await session.scalar(
+                    select(func.min(QualityMetricModel.measured_at)).where(QualityMetricModel.measured_at < cutoff)
+                )
+                if oldest is None:
+                    return rolled
+                window_end = min(bucket_start(oldest, "day") + timedelta(days=1), cutoff)
+                window = QualityMetricModel.measured_at < window_end
+                rows = (await session.execute(
+                    select(
+                        QualityMetricModel.metric_name,
+                        QualityMetricModel.value,
+                        QualityMetricModel.threshold,
+                        QualityMetricModel.measured_at,
+                    ).where(window)
+                )).all()
+                buckets: _Buckets = {}
+                for name, value, threshold, measured_at in rows:
+                    _accumulate(buckets, name, bucket_start(measured_at, "hour"), 1, value, value, value, threshold)
+                await self._merge_rollups(session, "hour", buckets)
+                await session.execute(delete(QualityMetricModel).where(window))
+            rolled += len(rows)
+
+    async def compact_hourly_rollups(self, now: Optional[datetime] = None) -> int:
+        """Fold hourly rollups past retention into daily ones, one day per transaction."""
+        cutoff = bucket_start(
+            (now or datetime.utcnow()) - timedelta(days=settings.metrics_hourly_retention_days), "day"
+        )
+        compacted = 0
+        hourly = QualityMetricRollupModel.granularity == "hour"
+        while True:
+            async with get_db().get_session() as session:
+                oldest = await session.scalar(
+                    select(func.min(QualityMetricRollupModel.bucket_start)).where(
+                        hourly, QualityMetricRollupModel.bucket_start < cutoff
+                    )
+                )
+                if oldest is None:
+                    return compacted
+                window = (hourly, QualityMetricRollupModel.bucket_start < bucket_start(oldest, "day") + timedelta(days=1))
+                rows = (await session.execute(select(QualityMetricRollupModel).where(*window))).scalars().all()
+                buckets: _Buckets = {}
+                for row in rows:
+                    _accumulate(
+                        buckets, row.metric_name, bucket_start(row.bucket_start, "day"),
+                        row.count, row.value_sum, row.value_min, row.value_max, row.threshold,
+                    )
+                await self._merge_rollups(session, "day", buckets)
+                await session.execute(delete(QualityMetricRollupModel).where(*window))
+            compacted += len(rows)
+
+    async def archive_validation_records(self, now: Optional[datetime] = None) -> int:
+        """Move validation records past retention to the archive, a batch of providers at a time.
+
+        Each provider's oldest remaining record is rewritten as a keyframe so
+        its history still rebuilds without the archived rows. Records are read
+        and replayed on a read-only connection and the archive is written
+        outside any transaction; only the deletes and keyframe rewrites go
+        through the writer, as one short ``write`` job per batch.
+        """
+        cutoff = (now or datetime.utcnow()) - timedelta(days=settings.validation_archive_after_days)
+        archived = 0
+        # Providers that gained records mid-batch; left for the next run
+        skipped: Set[str] = set()
+        while True:
+            async with get_db().get_read_session() as session:
+                provider_ids = (await session.execute(
+                    select(ValidationRecordModel.provider_id)
+                    .where(ValidationRecordModel.validated_at < cutoff, ValidationRecordModel.provider_id.notin_(skipped))
+                    .distinct()
+                    .limit(settings.retention_batch_size)
+                )).scalars().all()
+                if not provider_ids:
+                    return archived
+                result = await session.execute(
+                    select(ValidationRecordModel)
+                    .where(ValidationRecordModel.provider_id.in_(provider_ids))
+                    .order_by(
+                        ValidationRecordModel.provider_id,
+                        func.coalesce(ValidationRecordModel.version, 0),
+                        ValidationRecordModel.validated_at,
+                    )
+                )
+                by_provider: Dict[str, List[ValidationRecordModel]] = defaultdict(list)
+                for record in result.scalars():
+                    by_provider[record.provider_id].append(record)
+
+            # provider_id -> (records seen, expired ids, keyframe rewrite or None)
+            plans: Dict[str, Tuple[int, List[str], Optional[Tuple[str, Any, Any]]]] = {}
+            entries = []
+            for provider_id, records in by_provider.items():
+                expired_ids, kept_first = [], None
+                for record, before, after in validation_history.replay_records(records):
+                    if record.validated_at < cutoff:
+                        entries.append(self._archive_entry(record, before, after))
+                        expired_ids.append(record.id)
+                    elif kept_first is None:
+                        kept_first = (record, before, after)
+                keyframe = None
+                if kept_first is not None and kept_first[0].version is not None:
+                    record, before, after = kept_first
+                    keyframe = (record.id, *validation_history.encode(
+                        validation_history.build_delta(None, before, after, record.version)
+                    ))
+                plans[provider_id] = (len(records), expired_ids, keyframe)
+
+            # Written before the delete; lines of records that end up kept are
+            # dropped by id when history is read
+            await asyncio.to_thread(self.archive.append, entries)
+
+            async def prune(session) -> Tuple[int, Set[str]]:
+                counts = dict((await session.execute(
+                    select(ValidationRecordModel.provider_id, func.count())
+                    .where(ValidationRecordModel.provider_id.in_(list(plans)))
+                    .group_by(ValidationRecordModel.provider_id)
+                )).all())
+                # A record written since the read may build on a row about to go
+                changed = {provider_id for provider_id, (seen, _, _) in plans.items() if counts.get(provider_id) != seen}
+                ids = []
+                for provider_id, (_, expired_ids, keyframe) in plans.items():
+                    if provider_id in changed:
+                        continue
+                    ids += expired_ids
+                    if keyframe is not None:
+                        record_id, delta_json, delta_blob = keyframe
+                        await session.execute(
+                            update(ValidationRecordModel)
+                            .where(ValidationRecordModel.id == record_id)
+                            .values(delta_json=delta_json, delta_blob=delta_blob)
+                        )
+                for start in range(0, len(ids), 500):
+                    await session.execute(
+                        delete(ValidationRecordModel).where(ValidationRecordModel.id.in_(ids[start:start + 500]))
+                    )
+                return len(ids), changed
+
+            pruned, changed = await get_db().write(prune)
+            skipped |= changed
+            archived += pruned
+
+    @staticmethod
+    def _archive_entry(record: ValidationRecordModel, before: Any, after: Any) -> Dict[str, Any]:
+        return {
+            "id": record.id,
+            "provider_id": record.provider_id,
+            "version": record.version,
+            "validation_type": record.validation_type,
+            "status": record.status,
+            "confidence_score": record.confidence_score,
+            "validated_by": record.validated_by,
+            "validated_at": record.validated_at.isoformat(),
+            "discrepancies": record.discrepancies,
+            "notes": record.notes,
+            "data_before": before,
+            "data_after": after,
+        }
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Run every retention step once; returns how many rows each step moved."""
+        started = datetime.utcnow()
+        stats = {
+            "metric_points_rolled_up": await self.rollup_raw_metrics(now),
+            "hourly_rollups_compacted": await self.compact_hourly_rollups(now),
+            "validation_records_archived": await self.archive_validation_records(now),
+        }
+        self._last_run = {**stats, "started_at": started.isoformat(), "finished_at": datetime.utcnow().isoformat()}
+        logger.info("retention_run_complete", **stats)
+        return stats
+
+    async def _run_forever(self, interval_seconds: float) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("retention_run_failed", error=str(e), exc_info=True)
+            await asyncio.sleep(interval_seconds)
+
+    def start(self) -> None:
+        if settings.retention_enabled and (not self._task or self._task.done()):
+            self._task = asyncio.create_task(self._run_forever(settings.retention_interval_seconds))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": settings.retention_enabled, "running": bool(self._task and not self._task.done()), "last_run": self._last_run}
+
+
+retention_service = RetentionService()
@@ -13,6 +13,16 @@ class Settings(BaseSettings):
     nppes_base_url: str = Field(default="https://npiregistry.cms.hhs.gov/api")
     searxng_url: str = Field(default="https://searxng.site")
 
+    # Local NPPES index (see app.infrastructure.nppes.ingest)
+    nppes_source: str = Field(default="live", description="live | local | auto (local when the index exists)")
+    nppes_local_db_path: str = Field(default="./nppes_local.db")
+    nppes_ingest_batch_size: int = Field(default=5000)
+    nppes_lookup_concurrency: int = Field(default=10, description="Parallel registry calls per batch NPI lookup")
+    nppes_lookup_max_batch: int = Field(default=5000)
+    nppes_page_size: int = Field(default=200, description="Registry API maximum per request")
+    nppes_max_skip: int = Field(default=1000, description="Registry API rejects larger skip values; the local index has no limit")
+    nppes_stream_max_results: int = Field(default=10_000)
+
     # AI keys (optional depending on provider)
     grok_api_key: Optional[str] = Field(default=None, description="xAI Grok API key")
     openai_api_key: Optional[str] = Field(default=None, description="OpenAI API key (optional)")
@@ -22,8 +32,79 @@ class Settings(BaseSettings):
     request_timeout_seconds: float = Field(default=10.0)
     http_max_retries: int = Field(default=2)
     cache_ttl_seconds: int = Field(default=300)
+    cache_max_entries: int = Field(default=10_000)
+    cache_max_bytes: int = Field(default=64 * 1024 * 1024)
+    cache_sweep_interval_seconds: float = Field(default=60.0)
+    cache_disk_enabled: bool = Field(default=True)
+    cache_disk_path: str = Field(default="./providersync_cache.db")
+    cache_disk_compress_level: int = Field(default=6)
+    cache_disk_flush_interval_seconds: float = Field(default=1.0)
     rate_limit_per_minute: int = Field(default=60)
 
+    # Provider search web enrichment
+    search_enrichment_concurrency: int = Field(default=8)
+    search_enrichment_deadline_seconds: float = Field(default=5.0)
+    search_cache_stale_ttl_seconds: int = Field(default=600, description="Serve stale results this long past cache_ttl_seconds while refreshing")
+
+    # App database: SQLite production profile (ignored for other backends)
+    sqlite_production_mode: bool = Field(default=True, description="WAL, tuned pragmas, one writer connection plus read-only pool")
+    sqlite_mmap_size_bytes: int = Field(default=256 * 1024 * 1024)
+    sqlite_cache_size_kib: int = Field(default=64 * 1024)
+    sqlite_busy_timeout_ms: int = Field(default=5000)
+    sqlite_read_pool_size: int = Field(default=4)
+    db_group_commit_max_batch: int = Field(default=100)
+    db_group_commit_window_ms: float = Field(default=2.0, description="How long the writer waits to gather more writes into one commit")
+
+    # Retention: metric rollups and validation history archives
+    retention_enabled: bool = Field(default=True)
+    retention_interval_seconds: float = Field(default=3600.0)
+    retention_batch_size: int = Field(default=200, description="Providers archived per transaction")
+    metrics_raw_retention_days: int = Field(default=7, description="Older raw points are rolled up hourly")
+    metrics_hourly_retention_days: int = Field(default=90, description="Older hourly rollups are compacted to daily")
+    validation_archive_after_days: int = Field(default=180)
+    validation_archive_dir: str = Field(default="./archive/validation_records")
+    directory_quality_record_interval_seconds: float = Field(
+        default=3600.0, description="How often directory_quality_score is recorded; 0 disables"
+    )
+
+    # Buffered metric writes
+    metrics_buffer_max_points: int = Field(default=10_000, description="Points held in memory before aggregating per metric")
+    metrics_flush_batch_size: int = Field(default=500)
+    metrics_flush_interval_seconds: float = Field(default=1.0)
+
+    # Agent orchestration
+    orchestrator_batch_concurrency: int = Field(default=8, description="Providers validated at once in a batch")
+    orchestrator_provider_timeout_seconds: float = Field(default=300.0, description="Per-provider workflow timeout; 0 disables")
+    orchestrator_batch_mode: str = Field(default="concurrent", description="'concurrent' or 'pipeline'")
+    pipeline_precheck_concurrency: int = Field(default=16)
+    pipeline_validation_concurrency: int = Field(default=8)
+    pipeline_enrichment_concurrency: int = Field(default=4)
+    pipeline_qa_concurrency: int = Field(default=8)
+    pipeline_queue_size: int = Field(default=32, description="Bound of each stage's input queue")
+    pipeline_stage_timeout_seconds: float = Field(default=120.0, description="Per-provider timeout of each pipeline stage; 0 disables")
+
+    # Rule-based fast path that skips agent runs on conclusive evidence
+    fast_path_enabled: bool = Field(default=True)
+    fast_path_min_confidence: float = Field(default=0.85)
+    fast_path_timeout_seconds: float = Field(default=30.0)
+
+    # Contact validation: "agent" (LLM-driven tool calls) or "structured" (direct concurrent tool calls)
+    contact_validation_mode: str = Field(default="agent")
+    structured_validation_timeout_seconds: float = Field(default=60.0)
+    structured_validation_summarize: bool = Field(default=True, description="Ask the model once to summarize providers needing review")
+
+    # Agent pool (shared across requests)
+    agent_pool_size: int = Field(default=8, description="Instances kept per agent kind")
+    agent_max_active_runs: int = Field(default=16, description="Agent runs in flight across all kinds")
+    agent_pool_warm: bool = Field(default=True, description="Build one agent per kind at startup")
+
+    # HTTP connection pooling (one pool per upstream host)
+    http_max_connections_per_host: int = Field(default=20)
+    http_max_keepalive_connections: int = Field(default=10)
+    http_keepalive_expiry_seconds: float = Field(default=30.0)
+    http2_enabled: bool = Field(default=False, description="Requires the h2 package")
+    http_single_flight_enabled: bool = Field(default=True, description="Coalesce identical concurrent GETs")
+
 
 settings = Settings()
 
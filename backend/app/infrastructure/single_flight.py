@@ -0,0 +1,41 @@
+"""Coalesce concurrent identical calls into one in-flight execution."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its outcome.
+
+    The call runs in its own task so a cancelled caller (e.g. a disconnected
+    client) does not cancel the work the other callers are waiting on. Results
+    and exceptions are both shared; nothing is remembered once the call ends.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _, key=key, task=task: self._forget(key, task))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls), "started": self.started, "coalesced": self.coalesced}
@@ -1,7 +1,11 @@
 """Quality metrics API routes."""
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from typing import Optional
-from ...infrastructure.services.quality_metrics_service import QualityMetricsService
+from ...infrastructure.services.quality_metrics_service import (
+    DIRECTORY_QUALITY_THRESHOLD,
+    QualityMetricsService,
+)
+from ...infrastructure.services.retention_service import retention_service
 from ...infrastructure.logging import get_logger
 
 
@@ -10,13 +14,24 @@ logger = get_logger(__name__)
 
 
 @router.get("/metrics")
-async def get_metrics(metric_name: Optional[str] = None, days: int = 30) -> dict:
-    """Get quality metrics."""
+async def get_metrics(
+    metric_name: Optional[str] = None,
+    days: int = Query(30, ge=1),
+    max_points: Optional[int] = Query(None, ge=1, description="Downsample each series to at most this many points"),
+    limit: int = Query(1000, ge=1, le=10_000),
+    offset: int = Query(0, ge=0),
+) -> dict:
+    """Get quality metrics, newest first, one page at a time."""
     try:
         service = QualityMetricsService()
-        metrics = await service.get_metrics(metric_name=metric_name, days=days)
+        all_metrics = await service.get_metrics(
+            metric_name=metric_name, days=days, max_points_per_series=max_points,
+        )
+        metrics = all_metrics[offset:offset + limit]
         
         return {
+            "total": len(all_metrics),
+            "next_offset": offset + limit if offset + limit < len(all_metrics) else None,
             "metrics": [
                 {
                     "metric_name": m.metric_name,
@@ -35,17 +50,24 @@ async def get_metrics(metric_name: Optional[str] = None, days: int = 30) -> dict
 
 @router.get("/metrics/directory-quality")
 async def get_directory_quality() -> dict:
-    """Get overall directory quality score."""
+    """Get overall directory quality score with histogram and breakdowns."""
     try:
         service = QualityMetricsService()
-        score = await service.calculate_directory_quality_score()
+        summary = await service.directory_quality_summary()
+        score = round(summary.pop("average_confidence"), 2)
         
         return {
             "directory_quality_score": score,
-            "threshold": 0.8,
-            "status": "meeting_threshold" if score >= 0.8 else "below_threshold",
+            "threshold": DIRECTORY_QUALITY_THRESHOLD,
+            "status": "meeting_threshold" if score >= DIRECTORY_QUALITY_THRESHOLD else "below_threshold",
+            **summary,
         }
     except Exception as e:
         logger.error("directory_quality_failed", error=str(e), exc_info=True)
         raise
 
+
+@router.get("/metrics/retention")
+async def get_retention_status() -> dict:
+    """Last retention run: metric points rolled up and validation records archived."""
+    return retention_service.stats()
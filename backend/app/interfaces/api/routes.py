@@ -1,7 +1,20 @@
+import json
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from ...domain.entities import SearchQuery
-from .schemas import ProviderSearchRequest, ProviderSearchResponse, ProviderDTO
+from .schemas import (
+    ProviderSearchRequest,
+    ProviderSearchResponse,
+    ProviderDTO,
+    ProviderStreamRequest,
+    NpiLookupRequest,
+    NpiLookupResponse,
+)
 from ...application.use_cases.search_providers import execute
+from ...infrastructure.http import pool_stats, single_flight_stats
+from ...infrastructure.cache import cache
+from ...infrastructure.nppes import client as nppes_client
+from ...infrastructure.settings import settings
 from ...infrastructure.logging import get_logger
 
 
@@ -14,6 +27,18 @@ async def health():
     return {"status": "ok"}
 
 
+@router.get("/health/http-pools")
+async def http_pools():
+    """Connection pool stats for upstream HTTP clients."""
+    return {"pools": pool_stats(), "single_flight": single_flight_stats()}
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Cache size and per-namespace hit/miss/eviction counters."""
+    return cache.stats()
+
+
 @router.post("/search/providers", response_model=ProviderSearchResponse)
 async def search_providers(payload: ProviderSearchRequest) -> ProviderSearchResponse:
     try:
@@ -32,6 +57,43 @@ async def search_providers(payload: ProviderSearchRequest) -> ProviderSearchResp
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.post("/nppes/search/stream")
+async def stream_nppes_search(payload: ProviderStreamRequest) -> StreamingResponse:
+    """Every registry match as NDJSON, one record per line, fetched page by page."""
+    criteria = payload.model_dump(exclude={"max_results"}, exclude_none=True)
+    if not criteria:
+        raise HTTPException(status_code=400, detail="At least one search criterion is required")
+    max_results = min(payload.max_results or settings.nppes_stream_max_results, settings.nppes_stream_max_results)
+
+    async def lines():
+        count = 0
+        try:
+            async for record in nppes_client.iter_search(max_results=max_results, **criteria):
+                count += 1
+                yield json.dumps(record, separators=(",", ":")) + "\n"
+        except Exception as e:
+            # Headers are already sent; end the stream with an error line instead
+            logger.error("nppes_stream_error", error=str(e), returned=count, exc_info=True)
+            yield json.dumps({"error": "stream interrupted", "returned": count}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/nppes/lookup", response_model=NpiLookupResponse)
+async def lookup_npis(payload: NpiLookupRequest) -> NpiLookupResponse:
+    """Registry records for a batch of NPIs, keyed by NPI (null when not found)."""
+    if len(payload.npis) > settings.nppes_lookup_max_batch:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.nppes_lookup_max_batch} NPIs per request",
+        )
+    try:
+        return NpiLookupResponse(results=await nppes_client.lookup_many(payload.npis))
+    except Exception as e:
+        logger.error("npi_lookup_error", error=str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @router.post("/agents/run")
 async def run_agent(request: dict):
     """Optional endpoint for direct agent interaction (debugging)."""
@@ -39,9 +101,11 @@ async def run_agent(request: dict):
         prompt = request.get("prompt", "")
         if not prompt:
             raise HTTPException(status_code=400, detail="Prompt is required")
-        from ...agents.agent import build_agent
-        agent = build_agent()
-        result = await agent.run(prompt)
+        from ...agents.runner import run_in_thread
+        from ...infrastructure.services.agent_pool import get_agent_pool
+        async with get_agent_pool().checkout("coordinator") as agent:
+            # CodeAgent.run is synchronous; keep it off the event loop
+            result = await run_in_thread(agent.run, prompt)
         return {"result": str(result)}
     except HTTPException:
         raise
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional, List
 
 
 class ProviderSearchRequest(BaseModel):
@@ -13,6 +13,17 @@ class ProviderSearchRequest(BaseModel):
     limit: int = 10
 
 
+class ProviderStreamRequest(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    organization_name: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    postal_code: Optional[str] = None
+    taxonomy: Optional[str] = None
+    max_results: Optional[int] = Field(default=None, ge=1)
+
+
 class ProviderDTO(BaseModel):
     npi: str
     enumeration_type: str
@@ -31,3 +42,9 @@ class ProviderSearchResponse(BaseModel):
     providers: List[ProviderDTO]
 
 
+class NpiLookupRequest(BaseModel):
+    npis: List[str] = Field(min_length=1)
+
+
+class NpiLookupResponse(BaseModel):
+    results: Dict[str, Optional[Dict[str, Any]]]
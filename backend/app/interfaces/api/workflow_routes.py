@@ -1,17 +1,19 @@
 """Workflow API routes."""
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from typing import List
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query
+from typing import List, Optional
 from ...domain.enriched_entities import EnrichedProvider, ValidationBatch, ValidationReport
 from ...application.use_cases.contact_validation_workflow import ContactValidationWorkflow
 from ...application.use_cases.credential_verification_workflow import CredentialVerificationWorkflow
 from ...application.use_cases.quality_assessment_workflow import QualityAssessmentWorkflow
 from ...infrastructure.services.orchestrator import AgentOrchestrator
-from ...infrastructure.models.grok_model import GrokModel
+from ...infrastructure.services.agent_pool import get_agent_pool, get_orchestrator
 from ...infrastructure.services.pdf_extractor import PDFExtractorService
 from ...infrastructure.database import get_db
 from ...infrastructure.repositories.provider_repository import ProviderRepository
 from ...infrastructure.logging import get_logger
 from .schemas import ProviderSearchRequest
+import base64
+import binascii
 import json
 
 
@@ -20,12 +22,11 @@ logger = get_logger(__name__)
 
 
 def _get_orchestrator() -> AgentOrchestrator:
-    """Get orchestrator instance."""
-    from ...infrastructure.settings import settings
-    if settings.grok_api_key:
-        model = GrokModel(api_key=settings.grok_api_key)
-        return AgentOrchestrator(model)
-    raise HTTPException(status_code=500, detail="Grok API key not configured")
+    """Get the shared orchestrator created at startup."""
+    orchestrator = get_orchestrator()
+    if orchestrator is None:
+        raise HTTPException(status_code=500, detail="Grok API key not configured")
+    return orchestrator
 
 
 @router.post("/workflows/contact-validation/batch")
@@ -47,6 +48,7 @@ async def batch_contact_validation(providers: List[dict]) -> dict:
             "validated_count": batch.validated_count,
             "discrepancy_count": batch.discrepancy_count,
             "requires_review_count": batch.requires_review_count,
+            "llm_skipped_count": batch.llm_skipped_count,
         }
     except Exception as e:
         logger.error("batch_validation_failed", error=str(e), exc_info=True)
@@ -100,8 +102,6 @@ async def quality_assessment(provider_npis: List[str]) -> dict:
 async def extract_pdf(file: UploadFile = File(...)) -> dict:
     """Extract provider data from PDF."""
     try:
-        from ...infrastructure.settings import settings
-        
         # Save uploaded file temporarily
         import aiofiles
         import os
@@ -111,9 +111,8 @@ async def extract_pdf(file: UploadFile = File(...)) -> dict:
             content = await file.read()
             await f.write(content)
         
-        # Extract using PDF service
-        model = GrokModel(api_key=settings.grok_api_key) if settings.grok_api_key else None
-        extractor = PDFExtractorService(model)
+        # Extract using PDF service, sharing the startup model and its client
+        extractor = PDFExtractorService(get_agent_pool().model)
         data = await extractor.extract_provider_data(temp_path)
         
         # Cleanup
@@ -125,15 +124,33 @@ async def extract_pdf(file: UploadFile = File(...)) -> dict:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _encode_cursor(priority: int, provider_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([priority, provider_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        priority, provider_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(priority), str(provider_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/workflows/review-queue")
-async def get_review_queue(limit: int = 50) -> dict:
-    """Get providers requiring manual review."""
+async def get_review_queue(limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None) -> dict:
+    """Get providers requiring manual review, one page at a time.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` for the next page;
+    it is null on the last page.
+    """
+    after = _decode_cursor(cursor) if cursor else None
     try:
         db = get_db()
-        async with db.get_session() as session:
+        async with db.get_read_session() as session:
             repo = ProviderRepository(session)
-            providers = await repo.list_requiring_review(limit)
+            providers = await repo.list_review_page(limit, after)
             
+            last = providers[-1] if len(providers) == limit else None
             return {
                 "count": len(providers),
                 "providers": [
@@ -145,7 +162,8 @@ async def get_review_queue(limit: int = 50) -> dict:
                         "validation_status": p.validation_status,
                     }
                     for p in providers
-                ]
+                ],
+                "next_cursor": _encode_cursor(last.review_priority, last.id) if last else None,
             }
     except Exception as e:
         logger.error("review_queue_failed", error=str(e), exc_info=True)
@@ -7,7 +7,13 @@ from app.interfaces.api.metrics_routes import router as metrics_router
 from app.infrastructure.settings import settings
 from app.infrastructure.logging import setup_logging
 from app.infrastructure.rate_limit import RateLimitMiddleware
-from app.infrastructure.database import init_db
+from app.infrastructure.database import init_db, close_db
+from app.infrastructure.http import init_http, close_http
+from app.infrastructure.cache import cache
+from app.infrastructure.services.agent_pool import init_agents, close_agents
+from app.infrastructure.services.retention_service import retention_service
+from app.infrastructure.services.quality_metrics_service import directory_quality_recorder
+from app.infrastructure.services.metric_writer import metric_writer
 
 
 @asynccontextmanager
@@ -15,9 +21,21 @@ async def lifespan(app: FastAPI):
     """Lifespan context manager for startup/shutdown."""
     # Startup
     await init_db()
+    await init_http()
+    await init_agents()
+    cache.start()
+    metric_writer.start()
+    retention_service.start()
+    directory_quality_recorder.start()
     yield
     # Shutdown
-    pass
+    await directory_quality_recorder.stop()
+    await retention_service.stop()
+    await metric_writer.stop()
+    await cache.stop()
+    await close_agents()
+    await close_http()
+    await close_db()
 
 
 def create_app() -> FastAPI:
@@ -0,0 +1,15 @@
+"""Shared test fixtures."""
+import pytest_asyncio
+from app.infrastructure.database.database import Database
+from app.infrastructure.services import metric_writer, quality_metrics_service, retention_service
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path, monkeypatch):
+    """A fresh SQLite database that the metric and retention services use."""
+    database = Database(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    await database.init_db()
+    for module in (metric_writer, quality_metrics_service, retention_service):
+        monkeypatch.setattr(module, "get_db", lambda: database)
+    yield database
+    await database.close()
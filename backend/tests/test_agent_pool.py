@@ -0,0 +1,95 @@
+"""Tests for the agent pool and agent runs on worker threads."""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from app.domain.enriched_entities import EnrichedProvider
+from app.infrastructure.services.agent_pool import AgentPool
+
+
+@pytest.mark.asyncio
+async def test_agent_runs_leave_the_event_loop_free():
+    """The synchronous CodeAgent.run goes to a thread, so concurrent runs overlap."""
+    from app.agents.specialized.data_validation_agent import DataValidationAgent
+
+    agent = DataValidationAgent.__new__(DataValidationAgent)
+    agent.agent = SimpleNamespace(run=lambda prompt: time.sleep(0.1) or "ok")
+    agent._process_validation_results = lambda provider, result: provider
+    providers = [EnrichedProvider(npi=f"100000000{i}", enumeration_type="NPI-1") for i in range(3)]
+    started = time.monotonic()
+    await asyncio.gather(*(agent.validate_provider_contact(p) for p in providers))
+    assert time.monotonic() - started < 0.25
+
+
+@pytest.mark.asyncio
+async def test_agent_pool_isolates_concurrent_runs():
+    """Concurrent runs get distinct agents; active runs are capped and agents reused."""
+    pool = AgentPool(None, size=3, max_active_runs=2, factories={"coordinator": lambda model: object()})
+    in_use, peak = set(), 0
+
+    async def run():
+        nonlocal peak
+        async with pool.checkout("coordinator") as agent:
+            assert agent not in in_use
+            in_use.add(agent)
+            peak = max(peak, len(in_use))
+            await asyncio.sleep(0.01)
+            in_use.discard(agent)
+
+    await asyncio.gather(*(run() for _ in range(6)))
+    assert peak == 2
+    assert pool.stats()["agents"]["coordinator"] == {"created": 2, "idle": 2}
+    assert pool.stats()["total_runs"] == 6
+
+
+@pytest.mark.asyncio
+async def test_agent_pool_counts_abandoned_runs_until_their_thread_returns():
+    """A timed-out run holds its agent and slots while its worker thread is still going."""
+    from app.agents.runner import run_in_thread
+
+    pool = AgentPool(None, size=2, max_active_runs=1, factories={"coordinator": lambda model: object()})
+    release = threading.Event()
+
+    async def run():
+        async with pool.checkout("coordinator") as agent:
+            await run_in_thread(release.wait, 5)
+            return agent
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(run(), 0.01)
+    assert pool.stats()["active_runs"] == 1 and pool.stats()["abandoned_runs"] == 1
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(pool.checkout("coordinator").__aenter__(), 0.05)
+
+    release.set()
+    await asyncio.wait_for(run(), 1)
+    assert pool.stats()["agents"]["coordinator"] == {"created": 1, "idle": 1}
+    assert pool.stats()["active_runs"] == 0 and pool.stats()["abandoned_runs"] == 0
+
+
+@pytest.mark.asyncio
+async def test_agent_pool_recovers_from_factory_errors():
+    """A failing factory neither counts as an agent nor leaves later checkouts waiting."""
+    attempts = []
+
+    def factory(model):
+        attempts.append(model)
+        if len(attempts) == 1:
+            raise RuntimeError("model unavailable")
+        return object()
+
+    pool = AgentPool(None, size=1, max_active_runs=1, factories={"coordinator": factory})
+    with pytest.raises(RuntimeError):
+        async with pool.checkout("coordinator"):
+            pass
+    assert pool.stats()["agents"]["coordinator"] == {"created": 0, "idle": 0}
+
+    async def run():
+        async with pool.checkout("coordinator") as agent:
+            await asyncio.sleep(0.01)
+            return agent
+
+    agents = await asyncio.wait_for(asyncio.gather(run(), run()), 1)
+    assert agents[0] is agents[1]
+    assert pool.stats()["agents"]["coordinator"] == {"created": 1, "idle": 1}
@@ -0,0 +1,118 @@
+"""Tests for the in-memory cache."""
+import asyncio
+import time
+import pytest
+from app.infrastructure.cache import InMemoryTTLCache
+from app.infrastructure.disk_cache import SQLiteCacheStore
+
+
+def test_lru_eviction_by_entry_count():
+    """Least-recently-used keys are evicted once max_entries is exceeded."""
+    cache = InMemoryTTLCache(default_ttl_seconds=60, max_entries=2)
+    cache.set("search:a", "A")
+    cache.set("search:b", "B")
+    assert cache.get("search:a") == "A"  # a becomes most recently used
+    cache.set("search:c", "C")
+
+    assert cache.get("search:b") is None
+    assert cache.get("search:a") == "A"
+    assert cache.get("search:c") == "C"
+    stats = cache.stats()["namespaces"]["search"]
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_byte_bound_and_sweep():
+    """Byte budget triggers eviction and sweep_expired drops stale keys."""
+    cache = InMemoryTTLCache(default_ttl_seconds=60, max_entries=100, max_bytes=2_000)
+    cache.set("blob:1", "x" * 900)
+    cache.set("blob:2", "x" * 900)
+    cache.set("blob:3", "x" * 900)
+    assert cache.stats()["bytes"] <= 2_000
+    assert cache.get("blob:1") is None
+
+    cache.set("short:1", "v", ttl_seconds=1)
+    expired_at = time.time() - 1
+    cache._store["short:1"] = (expired_at, "v", cache._store["short:1"][2], expired_at)
+    assert cache.sweep_expired() == 1
+    assert cache.stats()["namespaces"]["short"]["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    """Flushed entries are read back by a fresh cache on the same file."""
+    path = str(tmp_path / "cache.db")
+    first = InMemoryTTLCache(default_ttl_seconds=60, backing_store=SQLiteCacheStore(path))
+    first.set("provider_search:abc", {"providers": [1, 2, 3]})
+    assert await first.flush() == 1
+    await first.stop()
+
+    second = InMemoryTTLCache(default_ttl_seconds=60, backing_store=SQLiteCacheStore(path))
+    assert second.get("provider_search:abc") is None
+    assert await second.aget("provider_search:abc") == {"providers": [1, 2, 3]}
+    assert second.get("provider_search:abc") == {"providers": [1, 2, 3]}
+    assert second.stats()["namespaces"]["provider_search"]["disk_hits"] == 1
+
+    second.delete("provider_search:abc")
+    await second.stop()
+    third = InMemoryTTLCache(default_ttl_seconds=60, backing_store=SQLiteCacheStore(path))
+    assert await third.aget("provider_search:abc") is None
+    await third.stop()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_are_coalesced():
+    """Concurrent misses for one key run the loader once; failures are not cached."""
+    cache = InMemoryTTLCache(default_ttl_seconds=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    results = await asyncio.gather(*(cache.load("search:k", loader) for _ in range(10)))
+    assert results == ["value"] * 10
+    assert calls == 1
+    assert cache.get("search:k") == "value"
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    outcomes = await asyncio.gather(*(cache.load("search:bad", failing) for _ in range(5)), return_exceptions=True)
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+    assert calls == 2
+    assert cache.get("search:bad") is None
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_revalidating():
+    """Between soft and hard TTL the stale value is returned and refreshed once."""
+    cache = InMemoryTTLCache(default_ttl_seconds=60)
+    cache.set("search:k", "old", ttl_seconds=60, stale_ttl_seconds=600)
+    expires_at, value, size, _ = cache._store["search:k"]
+    cache._store["search:k"] = (expires_at, value, size, time.time() - 1)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "new"
+
+    first, second = await asyncio.gather(
+        cache.get_or_load("search:k", loader, 60, 600),
+        cache.get_or_load("search:k", loader, 60, 600),
+    )
+    assert first == second == "old"
+    await asyncio.sleep(0.1)
+    assert calls == 1
+    assert await cache.get_or_load("search:k", loader, 60, 600) == "new"
+    assert not cache.is_stale("search:k")
+    assert cache.stats()["namespaces"]["search"]["stale_hits"] == 2
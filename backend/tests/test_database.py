@@ -0,0 +1,79 @@
+"""Tests for the SQLite production profile."""
+import asyncio
+import pytest
+from sqlalchemy import func, select, text
+from app.infrastructure.database.database import Database
+from app.infrastructure.database.models import QualityMetricModel
+
+
+@pytest.mark.asyncio
+async def test_pragmas_and_read_only_pool(tmp_path):
+    """The writer switches the file to WAL; read sessions cannot write."""
+    db = Database(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    try:
+        await db.init_db()
+        async with db.get_session() as session:
+            assert (await session.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await session.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+        async with db.get_read_session() as session:
+            assert (await session.execute(text("PRAGMA query_only"))).scalar() == 1
+            with pytest.raises(Exception):
+                await session.execute(text("DELETE FROM quality_metrics"))
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_group_commit_isolates_failures(tmp_path):
+    """Concurrent writes share a commit; a failing job is rolled back alone."""
+    db = Database(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    try:
+        await db.init_db()
+
+        def insert(name):
+            async def job(session):
+                session.add(QualityMetricModel(metric_name=name, value=1.0))
+                if name == "bad":
+                    await session.flush()
+                    raise ValueError("boom")
+                return name
+            return job
+
+        results = await asyncio.gather(
+            *(db.write(insert(name)) for name in ["a", "bad", "b", "c"]), return_exceptions=True
+        )
+        assert results[0] == "a" and results[2:] == ["b", "c"]
+        assert isinstance(results[1], ValueError)
+        assert db.write_stats()["commits"] == 1
+
+        async with db.get_read_session() as session:
+            names = (await session.execute(select(QualityMetricModel.metric_name))).scalars().all()
+        assert sorted(names) == ["a", "b", "c"]
+    finally:
+        await db.close()
+
+
+@pytest.mark.asyncio
+async def test_write_inside_open_session_fails_fast(tmp_path):
+    """Writes share one connection: a caller mid-transaction gets an error, not a hang; readers never block."""
+    db = Database(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    try:
+        await db.init_db()
+
+        async def job(session):
+            session.add(QualityMetricModel(metric_name="inner", value=1.0))
+
+        async with db.get_session() as session:
+            await session.execute(select(func.count()).select_from(QualityMetricModel))
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(db.write(job), 5)
+            await session.commit()
+            await asyncio.wait_for(db.write(job), 5)
+
+        async with db.get_read_session() as session:
+            assert await session.scalar(select(func.count()).select_from(QualityMetricModel)) == 1
+            # A read transaction is still open here and holds no write lock
+            await asyncio.wait_for(db.write(job), 5)
+            assert db.engine.pool.size() == 1
+    finally:
+        await db.close()
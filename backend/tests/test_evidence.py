@@ -0,0 +1,119 @@
+"""Tests for the rule-based pre-check and structured contact validation."""
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.domain.enriched_entities import EnrichedProvider, ValidationStatus
+from app.infrastructure.services import evidence
+from app.infrastructure.settings import settings
+
+
+def _nppes_record(phone="518-555-0100", line1="1 Main St"):
+    return {
+        "basic": {"status": "A"},
+        "addresses": [{"address_purpose": "LOCATION", "address_1": line1, "city": "Albany", "state": "NY",
+                       "telephone_number": phone}],
+        "taxonomies": [{"code": "207Q00000X", "desc": "Family Medicine", "primary": True}],
+    }
+
+
+def test_precheck_decisions():
+    """Agreeing sources are conclusive; conflicts, gaps, NPPES or web search alone are left to the agents."""
+    provider = EnrichedProvider(npi="1000000001", enumeration_type="NPI-1", phone="(518) 555-0100",
+                                address_line1="1 Main Street", city="Albany", state="NY")
+    nppes_only = evidence.build_elements({evidence.DataSource.NPPES: evidence.nppes_values(_nppes_record(line1="1 Main Street"))})
+    assert evidence.decide(provider, nppes_only) == (False, "uncorroborated:phone,address")
+
+    agreeing_site = {"phone": "518.555.0100", "email": None, "address": "1 Main Street, Albany, NY 12207"}
+    elements = evidence.build_elements({
+        evidence.DataSource.NPPES: evidence.nppes_values(_nppes_record(line1="1 Main Street")),
+        evidence.DataSource.PROVIDER_WEBSITE: evidence.scraped_values(agreeing_site, provider),
+    })
+    assert evidence.decide(provider, elements) == (True, "conclusive")
+
+    search_only = evidence.build_elements({
+        evidence.DataSource.NPPES: evidence.nppes_values(_nppes_record(line1="1 Main Street")),
+        evidence.DataSource.WEB_SEARCH: {"phone": "5185550100"},
+    })
+    assert evidence.decide(provider, search_only) == (False, "uncorroborated:phone,address")
+
+    moved = evidence.build_elements({evidence.DataSource.NPPES: evidence.nppes_values(_nppes_record(line1="9 Elm St"))})
+    assert evidence.decide(provider, moved) == (False, "stored_differs:address")
+
+    site = {"phone": "518.555.0199", "email": None, "address": None}
+    conflicting = evidence.build_elements({
+        evidence.DataSource.NPPES: evidence.nppes_values(_nppes_record(line1="1 Main Street")),
+        evidence.DataSource.PROVIDER_WEBSITE: evidence.scraped_values(site, provider),
+    })
+    assert evidence.decide(provider, conflicting) == (False, "sources_disagree")
+
+    no_phone = provider.model_copy(update={"phone": None})
+    assert evidence.decide(no_phone, elements) == (False, "incomplete:phone")
+
+
+@pytest.mark.asyncio
+async def test_precheck_never_skips_on_nppes_alone(monkeypatch):
+    """A provider with no website goes to the agents even when it matches NPPES exactly."""
+    lookups = []
+
+    async def lookup(npi):
+        lookups.append(npi)
+        return _nppes_record(line1="1 Main Street")
+
+    monkeypatch.setattr(evidence.nppes_client, "lookup", lookup)
+    provider = EnrichedProvider(npi="1000000001", enumeration_type="NPI-1", phone="(518) 555-0100",
+                                address_line1="1 Main Street", city="Albany", state="NY")
+    assert await evidence.RuleBasedPrecheck().run(provider) == (None, "uncorroborated:no_website")
+    assert lookups == []
+
+
+@pytest.mark.asyncio
+async def test_structured_contact_validation(monkeypatch):
+    """The four tools run concurrently and the model is asked once, only on conflicts."""
+    from app.agents.specialized import data_validation_agent
+    from app.agents.specialized.data_validation_agent import DataValidationAgent
+
+    def tool(result, delay=0.05):
+        async def call(*args, **kwargs):
+            await asyncio.sleep(delay)
+            return result
+        return call
+
+    calls = []
+
+    async def generate(messages):
+        calls.append(messages)
+        return SimpleNamespace(content="Phone on the website differs; call to confirm.")
+
+    agent = DataValidationAgent.__new__(DataValidationAgent)
+    agent.model = SimpleNamespace(generate=generate)
+    monkeypatch.setattr(data_validation_agent.nppes_client, "lookup", tool(_nppes_record(line1="1 Main Street")))
+    agent.google_maps_tool = tool({"verified": False})
+    agent.web_search_tool = tool([{"title": "Dr Smith, Albany", "content": "Call Smith at 518-555-0100"}])
+    agent.web_scraping_tool = tool({"phone": "518-555-0100", "email": "front@smith.example", "address": None})
+    provider = EnrichedProvider(npi="1000000001", enumeration_type="NPI-1", last_name="Smith",
+                                phone="518 555 0100", address_line1="1 Main Street", city="Albany", state="NY",
+                                website="https://smith.example")
+
+    started = asyncio.get_running_loop().time()
+    validated = await agent.validate_provider_contact_structured(provider.model_copy(deep=True))
+    assert asyncio.get_running_loop().time() - started < 0.15
+    assert validated.validation_status == ValidationStatus.VALIDATED
+    assert {e.source.value for e in validated.data_element_confidences if e.element_name == "phone"} == {
+        "nppes", "provider_website", "web_search",
+    }
+    assert calls == []
+
+    agent.web_scraping_tool = tool({"phone": "518-555-0199", "email": None, "address": None})
+    flagged = await agent.validate_provider_contact_structured(provider.model_copy(deep=True))
+    assert flagged.validation_status == ValidationStatus.DISCREPANCY
+    assert flagged.validation_notes[-1].startswith("Phone on the website differs")
+    assert len(calls) == 1
+
+    # A tool that outlives its timeout only loses its own evidence
+    monkeypatch.setattr(settings, "structured_validation_timeout_seconds", 0.1)
+    agent.web_scraping_tool = tool({"phone": "518-555-0100", "email": None, "address": None})
+    agent.google_maps_tool = tool({"verified": False}, delay=5)
+    started = asyncio.get_running_loop().time()
+    validated = await agent.validate_provider_contact_structured(provider.model_copy(deep=True))
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert validated.validation_status == ValidationStatus.VALIDATED
@@ -0,0 +1,37 @@
+"""Tests for pooled HTTP clients."""
+import pytest
+import respx
+import httpx
+from app.infrastructure import http
+from app.infrastructure.settings import settings
+
+
+@pytest.mark.asyncio
+async def test_upstream_client_is_reused():
+    """Requests to the same upstream host share one long-lived client."""
+    base = str(settings.nppes_base_url).rstrip("/")
+    await http.init_http()
+    try:
+        with respx.mock:
+            respx.get(f"{base}/").mock(return_value=httpx.Response(200, json={"results": []}))
+            _, first = http._client(f"{base}/")
+            await http.get(f"{base}/", params={"number": "1"})
+            await http.get(f"{base}/", params={"number": "2"})
+            _, second = http._client(f"{base}/")
+        assert first is second
+        stats = http.pool_stats()[http._origin(base)]
+        assert stats["requests"] >= 2
+        assert not stats["closed"]
+    finally:
+        await http.close_http()
+    assert http.pool_stats() == {}
+
+
+@pytest.mark.asyncio
+async def test_unknown_hosts_share_pool():
+    """Non-upstream hosts (scraped sites) go through the shared pool."""
+    key_a, client_a = http._client("https://clinic-a.example.com/contact")
+    key_b, client_b = http._client("https://clinic-b.example.com/")
+    assert key_a == key_b == http._SHARED_POOL
+    assert client_a is client_b
+    await http.close_http()
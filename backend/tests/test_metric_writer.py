@@ -0,0 +1,28 @@
+"""Tests for the buffered metric writer."""
+import pytest
+from sqlalchemy import select
+from app.infrastructure.database.models import QualityMetricModel
+from app.infrastructure.services import metric_writer
+
+
+@pytest.mark.asyncio
+async def test_metric_writer_batches_and_aggregates_overflow(db):
+    """Points flush in one commit; past the bound they fold into one row per metric."""
+    writer = metric_writer.MetricWriter(max_points=3)
+    for value in (0.1, 0.2, 0.3, 0.4, 0.6):
+        writer.emit("score", value)
+    writer.emit("other", 1.0)
+    assert writer.stats()["buffered"] == 3 and writer.stats()["aggregating"] == 2
+
+    commits = db.write_stats()["commits"]
+    await writer.stop()
+    assert db.write_stats()["commits"] == commits + 1
+
+    async with db.get_read_session() as session:
+        rows = (await session.execute(
+            select(QualityMetricModel.metric_name, QualityMetricModel.value, QualityMetricModel.metadata_json)
+        )).all()
+    assert sorted((name, round(value, 2)) for name, value, _ in rows) == [
+        ("other", 1.0), ("score", 0.1), ("score", 0.2), ("score", 0.3), ("score", 0.5),
+    ]
+    assert {"aggregated_points": 2, "min": 0.4, "max": 0.6} in [metadata for *_, metadata in rows]
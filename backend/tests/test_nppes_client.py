@@ -1,6 +1,12 @@
 """Tests for NPPES client."""
+import httpx
 import pytest
+import respx
+from app.infrastructure.cache import InMemoryTTLCache
+from app.infrastructure.http import close_http
+from app.infrastructure.nppes import client as nppes_client
 from app.infrastructure.nppes.client import search
+from app.infrastructure.settings import settings
 
 
 @pytest.mark.asyncio
@@ -15,3 +21,55 @@ async def test_nppes_search_basic():
         result = results[0]
         assert "number" in result or "number" in result.get("basic", {})
 
+
+@pytest.mark.asyncio
+async def test_lookup_many_dedupes_and_caches(monkeypatch):
+    """Duplicate NPIs hit the registry once, and a second batch is served from cache."""
+    base = str(settings.nppes_base_url).rstrip("/")
+    monkeypatch.setattr(settings, "nppes_source", "live")
+    monkeypatch.setattr(nppes_client, "cache", InMemoryTTLCache())
+
+    def registry(request):
+        npi = request.url.params["number"]
+        results = [] if npi == "1999999999" else [{"number": npi}]
+        return httpx.Response(200, json={"results": results})
+
+    with respx.mock:
+        route = respx.get(f"{base}/").mock(side_effect=registry)
+        results = await nppes_client.lookup_many(["1000000001", "1000000002", "1000000001", "1999999999", "bogus"])
+        assert results == {
+            "1000000001": {"number": "1000000001"},
+            "1000000002": {"number": "1000000002"},
+            "1999999999": None,
+            "bogus": None,
+        }
+        assert route.call_count == 3
+        await nppes_client.lookup_many(["1000000002"])
+        assert route.call_count == 3
+    await close_http()
+
+
+@pytest.mark.asyncio
+async def test_iter_search_pages_until_short_page(monkeypatch):
+    """Pages advance by skip, stop at the first short page, and honor the cap."""
+    monkeypatch.setattr(settings, "nppes_source", "live")
+    calls = []
+
+    async def fake_search(*, limit, skip=0, **criteria):
+        calls.append((skip, limit))
+        return [{"number": str(n)} for n in range(skip, min(skip + limit, 5))]
+
+    monkeypatch.setattr(nppes_client, "search", fake_search)
+    numbers = [r["number"] async for r in nppes_client.iter_search(state="NY", page_size=2)]
+    assert numbers == ["0", "1", "2", "3", "4"]
+    assert calls == [(0, 2), (2, 2), (4, 2)]
+
+    calls.clear()
+    numbers = [r["number"] async for r in nppes_client.iter_search(state="NY", page_size=2, max_results=3)]
+    assert numbers == ["0", "1", "2"]
+    assert calls == [(0, 2), (2, 1)]
+
+    calls.clear()
+    monkeypatch.setattr(settings, "nppes_max_skip", 2)
+    numbers = [r["number"] async for r in nppes_client.iter_search(state="NY", page_size=2)]
+    assert numbers == ["0", "1", "2", "3"]
@@ -0,0 +1,133 @@
+"""Tests for the local NPPES index."""
+import csv
+import pytest
+from app.infrastructure.cache import InMemoryTTLCache
+from app.infrastructure.nppes import client as nppes_client
+from app.infrastructure.nppes.ingest import ingest_deactivations, ingest_delta, ingest_full
+from app.infrastructure.nppes.local_store import NppesLocalStore
+from app.infrastructure.settings import settings
+
+
+HEADER = [
+    "NPI", "Entity Type Code", "Provider Organization Name (Legal Business Name)",
+    "Provider Last Name (Legal Name)", "Provider First Name", "Provider Credential Text",
+    "Provider First Line Business Practice Location Address",
+    "Provider Business Practice Location Address City Name",
+    "Provider Business Practice Location Address State Name",
+    "Provider Business Practice Location Address Postal Code",
+    "Provider Business Practice Location Address Telephone Number",
+    "Provider Enumeration Date", "Last Update Date", "NPI Deactivation Date", "NPI Reactivation Date",
+    "Healthcare Provider Taxonomy Code_1", "Healthcare Provider Primary Taxonomy Switch_1",
+]
+
+
+def _row(npi, entity, org, last, first, city, state, postal, taxonomy, deactivated=""):
+    return [
+        npi, entity, org, last, first, "MD", "1 MAIN ST", city, state, postal, "5185550100",
+        "05/21/2007", "07/08/2023", deactivated, "", taxonomy, "Y",
+    ]
+
+
+def write_full_file(path):
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(HEADER)
+        writer.writerow(_row("1000000001", "1", "", "SMITH", "JOHN", "ALBANY", "NY", "122071234", "207RC0000X"))
+        writer.writerow(_row("1000000002", "1", "", "SMITHERS", "JANE", "BUFFALO", "NY", "14201", "207Q00000X"))
+        writer.writerow(_row("1000000003", "2", "ALBANY HEART GROUP", "", "", "ALBANY", "NY", "12208", "207RC0000X"))
+        writer.writerow(_row("1000000004", "1", "", "SMITH", "OLD", "ALBANY", "NY", "12207", "", deactivated="01/02/2020"))
+
+
+@pytest.fixture
+def store(tmp_path):
+    csv_path = tmp_path / "npidata_pfile.csv"
+    taxonomy_path = tmp_path / "nucc.csv"
+    write_full_file(csv_path)
+    taxonomy_path.write_text(
+        "Code,Grouping,Classification,Specialization\n"
+        "207RC0000X,Allopathic,Internal Medicine,Cardiovascular Disease\n"
+        "207Q00000X,Allopathic,Family Medicine,\n"
+    )
+    db_path = str(tmp_path / "nppes.db")
+    stats = ingest_full(str(csv_path), db_path=db_path, taxonomy_path=str(taxonomy_path), batch_size=2)
+    assert stats["rows"] == 4
+    assert stats["deactivated"] == 1
+    local = NppesLocalStore(db_path)
+    yield local
+    local.close()
+
+
+def test_search_matches_api_shape(store):
+    """Results carry the registry API fields used by search_providers."""
+    results = store.search(last_name="smith", state="NY")
+    assert [r["number"] for r in results] == ["1000000001"]
+    result = results[0]
+    assert result["enumeration_type"] == "NPI-1"
+    assert result["basic"]["first_name"] == "JOHN"
+    assert result["addresses"][0]["city"] == "ALBANY"
+    assert result["taxonomies"][0]["desc"] == "Internal Medicine, Cardiovascular Disease"
+
+
+def test_search_filters(store):
+    """Wildcards, ZIP prefixes and taxonomy descriptions narrow results."""
+    assert [r["number"] for r in store.search(last_name="SMITH*")] == ["1000000001", "1000000002"]
+    assert [r["number"] for r in store.search(postal_code="12207")] == ["1000000001"]
+    assert [r["number"] for r in store.search(taxonomy="cardiovascular", city="Albany")] == ["1000000001", "1000000003"]
+    assert [r["number"] for r in store.search(organization_name="albany heart group")] == ["1000000003"]
+    assert store.search(last_name="SMITH*", limit=1, skip=1)[0]["number"] == "1000000002"
+
+
+@pytest.mark.asyncio
+async def test_client_answers_from_local_store(store, monkeypatch):
+    """nppes_client.search uses the local index when configured."""
+    monkeypatch.setattr(settings, "nppes_source", "local")
+    monkeypatch.setattr(nppes_client, "local_store", store)
+    results = await nppes_client.search(first_name="jane", last_name="smithers", limit=5)
+    assert [r["number"] for r in results] == ["1000000002"]
+
+
+@pytest.mark.asyncio
+async def test_lookup_many_from_local_store(store, monkeypatch):
+    """Batch lookups read every miss from the local index in one pass."""
+    monkeypatch.setattr(settings, "nppes_source", "local")
+    monkeypatch.setattr(nppes_client, "local_store", store)
+    monkeypatch.setattr(nppes_client, "cache", InMemoryTTLCache())
+    results = await nppes_client.lookup_many(["1000000003", "1000000001", "1000000003", "1999999999"])
+    assert list(results) == ["1000000003", "1000000001", "1999999999"]
+    assert results["1000000003"]["basic"]["organization_name"] == "ALBANY HEART GROUP"
+    assert results["1999999999"] is None
+
+
+def test_delta_applies_changed_rows_once(store, tmp_path):
+    """Only new or changed NPIs are written, and a finished file is not re-applied."""
+    delta_path = tmp_path / "weekly.csv"
+    with open(delta_path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(HEADER)
+        # Unchanged, moved to Troy, and brand new
+        writer.writerow(_row("1000000001", "1", "", "SMITH", "JOHN", "ALBANY", "NY", "122071234", "207RC0000X"))
+        writer.writerow(_row("1000000002", "1", "", "SMITHERS", "JANE", "TROY", "NY", "12180", "207Q00000X"))
+        writer.writerow(_row("1000000005", "1", "", "SMITH", "ANN", "ALBANY", "NY", "12207", "207Q00000X"))
+
+    stats = ingest_delta(str(delta_path), db_path=store.path, batch_size=2)
+    assert (stats["rows"], stats["changed"]) == (3, 2)
+    assert store.get("1000000002")["addresses"][0]["city"] == "TROY"
+    assert store.get("1000000005")["taxonomies"][0]["desc"] == "Family Medicine"
+    assert store.changed_since("1970-01-01") == ["1000000002", "1000000005"]
+    assert ingest_delta(str(delta_path), db_path=store.path)["skipped"] is True
+
+
+def test_deactivation_report(store, tmp_path):
+    """Deactivated NPIs drop out of search; unknown NPIs are ignored."""
+    report = tmp_path / "deactivated.csv"
+    report.write_text(
+        "NPPES Deactivated NPI Report\n"
+        "NPI,NPPES Deactivation Date\n"
+        "1000000001,03/04/2024\n"
+        "1999999999,03/04/2024\n"
+    )
+    stats = ingest_deactivations(str(report), db_path=store.path)
+    assert (stats["rows"], stats["changed"]) == (2, 1)
+    assert store.get("1000000001")["basic"]["deactivation_date"] == "2024-03-04"
+    assert [r["number"] for r in store.search(last_name="smith", state="NY")] == []
+    assert ingest_deactivations(str(report), db_path=store.path, force=True)["changed"] == 0
@@ -0,0 +1,152 @@
+"""Tests for batch validation, the staged pipeline and the fast path in the orchestrator."""
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.domain.enriched_entities import EnrichedProvider, ValidationStatus
+from app.infrastructure.services.agent_pool import AgentPool
+from app.infrastructure.services.orchestrator import AgentOrchestrator
+
+
+class _Orchestrator(AgentOrchestrator):
+    """Orchestrator whose workflow sleeps instead of calling agents."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.active = 0
+        self.peak = 0
+
+    async def validate_provider_workflow(self, provider):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            delay = self.delays[provider.npi]
+            if delay is None:
+                raise RuntimeError("upstream failed")
+            await asyncio.sleep(delay)
+            return provider.model_copy(update={"validation_status": ValidationStatus.VALIDATED})
+        finally:
+            self.active -= 1
+
+
+def _providers(n):
+    return [EnrichedProvider(npi=f"100000000{i}", enumeration_type="NPI-1") for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_batch_is_bounded_and_ordered():
+    """Workers are capped, results keep input order, failures and timeouts go to review."""
+    providers = _providers(6)
+    delays = dict(zip((p.npi for p in providers), [0.03, 0.01, None, 0.5, 0.02, 0.01]))
+    orchestrator = _Orchestrator(delays)
+
+    results = await orchestrator.batch_validate_providers(providers, concurrency=2, timeout_seconds=0.1)
+    assert [r.npi for r in results] == [p.npi for p in providers]
+    assert orchestrator.peak == 2
+    flagged = [r.npi for r in results if r.requires_manual_review]
+    assert flagged == [providers[2].npi, providers[3].npi]
+    assert all(r.review_priority == 10 for r in results if r.requires_manual_review)
+
+    completed = await orchestrator.batch_validate_providers(providers[:2], concurrency=2, ordered=False)
+    assert [r.npi for r in completed] == [providers[1].npi, providers[0].npi]
+
+
+class _Agent:
+    """Stand-in for one stage's agent."""
+
+    def __init__(self, delay, fail_npi=None):
+        self.delay = delay
+        self.fail_npi = fail_npi
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, provider):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if provider.npi == self.fail_npi:
+                raise RuntimeError("stage failed")
+            return provider.model_copy(update={"validation_notes": provider.validation_notes + ["ok"]})
+        finally:
+            self.active -= 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stages_have_their_own_pools():
+    """Each stage respects its concurrency; a failure skips later stages."""
+    providers = _providers(8)
+    validate, enrich, assess = _Agent(0.001), _Agent(0.02, fail_npi=providers[3].npi), _Agent(0.001)
+    orchestrator = AgentOrchestrator(pool=AgentPool(None, factories={
+        "data_validation": lambda model: SimpleNamespace(validate_provider_contact=validate),
+        "information_enrichment": lambda model: SimpleNamespace(enrich_provider=enrich),
+        "quality_assurance": lambda model: SimpleNamespace(assess_quality=assess),
+    }))
+    orchestrator.precheck = None
+
+    results, stats = await orchestrator.pipeline_validate_providers(
+        providers, stage_concurrency={"validation": 4, "enrichment": 2, "quality_assurance": 1},
+    )
+    assert [r.npi for r in results] == [p.npi for p in providers]
+    assert enrich.peak == 2 and assess.peak == 1
+    assert results[3].requires_manual_review and results[3].review_priority == 10
+    assert results[3].validation_notes == ["ok"]
+    assert all(r.validation_notes == ["ok"] * 3 for i, r in enumerate(results) if i != 3)
+    assert stats["enrichment"]["failed"] == 1 and stats["quality_assurance"]["processed"] == 7
+    assert stats["enrichment"]["max_queue_depth"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_deadline_covers_queue_waits():
+    """A provider's deadline spans stages and queue waits, not just one handler call."""
+    providers = _providers(4)
+    orchestrator = AgentOrchestrator(pool=AgentPool(None, factories={
+        "data_validation": lambda model: SimpleNamespace(validate_provider_contact=_Agent(0.001)),
+        "information_enrichment": lambda model: SimpleNamespace(enrich_provider=_Agent(0.1)),
+        "quality_assurance": lambda model: SimpleNamespace(assess_quality=_Agent(0.001)),
+    }))
+    orchestrator.precheck = None
+
+    results, stats = await orchestrator.pipeline_validate_providers(
+        providers, stage_concurrency={"validation": 4, "enrichment": 1, "quality_assurance": 1},
+        timeout_seconds=10, provider_timeout_seconds=0.25,
+    )
+    assert [r.requires_manual_review for r in results] == [False, False, True, True]
+    assert results[3].validation_notes[-1] == "enrichment timed out"
+    assert stats["enrichment"]["failed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_timed_out_agent_never_touches_the_flagged_provider():
+    """Agents work on a copy, so a run outliving its timeout cannot change the provider."""
+    async def validate(provider):
+        # Stands in for a worker thread that is still writing when the timeout fires
+        provider.phone = "555-0000"
+        await asyncio.sleep(0.05)
+        return provider
+
+    orchestrator = AgentOrchestrator(pool=AgentPool(None, factories={
+        "data_validation": lambda model: SimpleNamespace(validate_provider_contact=validate),
+    }))
+    provider = _providers(1)[0]
+    flagged = await orchestrator._validate_or_flag(provider, 0.01)
+    assert flagged is provider and flagged.requires_manual_review
+    assert provider.phone is None
+
+
+@pytest.mark.asyncio
+async def test_fast_path_skips_agents_and_reports_rate():
+    """Conclusive providers never reach the workflow; the skip rate is reported."""
+    providers = _providers(4)
+    orchestrator = _Orchestrator({p.npi: 0.0 for p in providers})
+
+    async def run(provider):
+        if provider.npi in (providers[0].npi, providers[2].npi):
+            return provider.model_copy(update={"validation_status": ValidationStatus.VALIDATED}), "conclusive"
+        return None, "sources_disagree"
+
+    orchestrator.precheck = SimpleNamespace(run=run)
+    report = {}
+    results = await orchestrator.batch_validate_providers(providers, concurrency=2, report=report, mode="concurrent")
+    assert [r.npi for r in results] == [p.npi for p in providers]
+    assert report["llm_skipped"] == 2 and report["skip_rate"] == 0.5
+    assert orchestrator.peak == 1
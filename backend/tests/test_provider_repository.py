@@ -0,0 +1,216 @@
+"""Tests for the provider repository."""
+from datetime import datetime
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.application.use_cases.quality_assessment_workflow import QualityAssessmentWorkflow
+from app.domain.enriched_entities import EnrichedProvider, ValidationStatus
+from app.infrastructure.database.models import Base, ProviderModel, ValidationRecordModel
+from app.infrastructure.repositories import provider_aggregates
+from app.infrastructure.repositories.provider_repository import (
+    ENRICHED_PROVIDER_FIELDS,
+    LISTING_FIELDS,
+    ProviderRepository,
+    validation_snapshot,
+)
+
+
+@pytest_asyncio.fixture
+async def session(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'providers.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+def _provider(npi, **fields):
+    fields.setdefault("enumeration_type", "NPI-1")
+    return EnrichedProvider(npi=npi, **fields)
+
+
+@pytest.mark.asyncio
+async def test_upsert_many_inserts_and_updates(session):
+    """New NPIs are inserted, existing ones updated in place with their IDs kept."""
+    repo = ProviderRepository(session)
+    existing = await repo.create(_provider("1000000001", city="ALBANY"))
+    await session.commit()
+
+    stale = datetime(2020, 1, 1)
+    ids = await repo.upsert_many(
+        [
+            _provider("1000000001", city="TROY", enumeration_type="NPI-2", last_validated=stale),
+            _provider("1000000002", city="BUFFALO"),
+            _provider("1000000003", city="UTICA"),
+        ],
+        chunk_size=2,
+    )
+    assert ids[0] == existing.id
+    assert len(set(ids)) == 3
+
+    session.expire_all()
+    updated = await repo.get_by_npi("1000000001")
+    assert updated.city == "TROY"
+    # Same semantics as update(): enumeration type kept, last_validated stamped now
+    assert updated.enumeration_type == "NPI-1"
+    assert updated.last_validated > stale
+    assert (await repo.get_by_npi("1000000003")).id == ids[2]
+    assert await session.scalar(select(func.count()).select_from(ProviderModel)) == 3
+
+
+@pytest.mark.asyncio
+async def test_directory_aggregates_follow_writes(session):
+    """Create, upsert and update keep the aggregates equal to a full rebuild."""
+    repo = ProviderRepository(session)
+    await repo.create(_provider("1000000001", state="NY", overall_confidence=0.3))
+    await repo.upsert_many([
+        _provider("1000000001", state="CA", overall_confidence=0.9),
+        _provider("1000000002", state="NY", taxonomy="207Q00000X", overall_confidence=0.6),
+    ])
+    await repo.update(_provider("1000000002", state="NY", overall_confidence=0.8))
+    await session.commit()
+
+    summary = await provider_aggregates.summary(session)
+    assert summary["provider_count"] == 2
+    assert summary["average_confidence"] == pytest.approx(0.85)
+    assert summary["by_state"] == {
+        "CA": {"count": 1, "average_confidence": 0.9},
+        "NY": {"count": 1, "average_confidence": 0.8},
+    }
+    assert summary["by_taxonomy"] == {"unknown": {"count": 2, "average_confidence": 0.85}}
+    assert summary["confidence_histogram"]["0.8"] == 1 and summary["confidence_histogram"]["0.9"] == 1
+
+    await provider_aggregates.rebuild(session)
+    assert await provider_aggregates.summary(session) == summary
+
+
+@pytest.mark.asyncio
+async def test_get_many_by_npi_chunks(session):
+    """Lookups span chunks, skip unknown NPIs, and keep input order."""
+    repo = ProviderRepository(session)
+    await repo.upsert_many([_provider(f"100000000{i}") for i in range(5)])
+    npis = ["1000000004", "1999999999", "1000000000", "1000000002", "1000000004"]
+    found = await repo.get_many_by_npi(npis, chunk_size=2)
+    assert list(found) == ["1000000004", "1000000000", "1000000002"]
+    assert all(found[npi].npi == npi for npi in found)
+
+
+@pytest.mark.asyncio
+async def test_review_queue_keyset_pages(session):
+    """Pages follow (priority desc, id) without gaps or repeats, using the partial index."""
+    repo = ProviderRepository(session)
+    await repo.upsert_many(
+        [_provider(f"10000000{i:02d}", requires_manual_review=i % 4 != 0, review_priority=i % 3) for i in range(12)]
+    )
+    seen, after = [], None
+    while True:
+        page = await repo.list_review_page(limit=4, after=after)
+        seen.extend(page)
+        if len(page) < 4:
+            break
+        after = (page[-1].review_priority, page[-1].id)
+    assert len(seen) == 9
+    assert [(r.review_priority, r.id) for r in seen] == sorted(
+        ((r.review_priority, r.id) for r in seen), key=lambda key: (-key[0], key[1])
+    )
+
+    plan = await session.execute(
+        text("EXPLAIN QUERY PLAN " + str(
+            select(ProviderModel.id)
+            .where(ProviderModel.requires_manual_review == True)
+            .order_by(ProviderModel.review_priority.desc(), ProviderModel.id)
+            .compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+        ))
+    )
+    assert "ix_providers_review_queue" in " ".join(str(row) for row in plan)
+
+
+@pytest.mark.asyncio
+async def test_projected_reads(session):
+    """Projected reads return only the requested columns, listed or streamed."""
+    repo = ProviderRepository(session)
+    await repo.upsert_many([_provider(f"100000000{i}", state="NY" if i % 2 else "CA") for i in range(6)])
+
+    rows = await repo.fetch_fields(["npi", "state"], ProviderModel.state == "NY", limit=2)
+    assert len(rows) == 2
+    assert all(row._fields == ("npi", "state") and row.state == "NY" for row in rows)
+
+    streamed = [row async for row in repo.stream_fields(["npi"], batch_size=2)]
+    assert sorted(row.npi for row in streamed) == [f"100000000{i}" for i in range(6)]
+
+    with pytest.raises(ValueError):
+        await repo.fetch_fields(["npi", "password"])
+
+    pending = await repo.list_by_status(ValidationStatus.PENDING, limit=10)
+    assert len(pending) == 6 and pending[0]._fields == LISTING_FIELDS
+
+    found = [chunk async for chunk in repo.iter_many_by_npi(["1000000003", "1000000001"], fields=ENRICHED_PROVIDER_FIELDS)]
+    assert list(found[0]) == ["1000000003", "1000000001"]
+    provider = QualityAssessmentWorkflow(None)._model_to_enriched(found[0]["1000000003"])
+    assert provider.npi == "1000000003" and provider.state == "NY"
+
+
+@pytest.mark.asyncio
+async def test_validation_history_round_trips(session):
+    """Records store deltas, yet every version rebuilds exactly, across keyframes."""
+    repo = ProviderRepository(session)
+    provider = await repo.create(_provider("1000000001"))
+    states = [{"phone": "555-0100", "city": "ALBANY", "notes": "x" * 2000}]
+    for i in range(1, 25):
+        before = dict(states[-1])
+        if i == 7:
+            before["city"] = "TROY"  # changed outside validation; stored in the base patch
+        after = {**before, "phone": f"555-01{i:02d}"}
+        if i == 12:
+            after.pop("notes")
+        states.append(after)
+        record = await repo.create_validation_record(
+            provider.id, "contact", "validated", 0.9, before, after, [], "test",
+        )
+        assert record.data_before is None and record.data_after is None
+
+    assert await repo.get_provider_version(provider.id, 3) == states[3]
+    assert await repo.get_provider_version(provider.id, 7) == states[7]
+    assert await repo.get_provider_version(provider.id, 21) == states[21]
+    history = await repo.get_validation_history(provider.id)
+    assert [entry["data_after"] for entry in history] == states[1:]
+    assert history[6]["data_before"]["city"] == "TROY"
+
+    records = (await session.execute(select(ValidationRecordModel).order_by(ValidationRecordModel.version))).scalars().all()
+    assert records[0].delta_blob is not None  # keyframe with the long notes is compressed
+    assert records[1].delta_json == {"changes": {"phone": ["555-0101", "555-0102"]}, "base": {}}
+
+
+@pytest.mark.asyncio
+async def test_record_validations_after_upsert(session):
+    """Upserted providers get consecutive history versions; a duplicate version is rejected."""
+    repo = ProviderRepository(session)
+    providers = [_provider(f"100000000{i}", phone="518-555-0100") for i in range(2)]
+    before = [validation_snapshot(p) for p in providers]
+    validated = [p.model_copy(update={"phone": "518-555-0199", "validation_status": ValidationStatus.VALIDATED})
+                 for p in providers]
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    for _ in range(2):
+        ids = await repo.upsert_many(validated)
+        event.listen(session.bind.sync_engine, "before_cursor_execute", listener)
+        try:
+            await repo.record_validations(ids, before, validated, "contact", "test", batch_id="b1")
+        finally:
+            event.remove(session.bind.sync_engine, "before_cursor_execute", listener)
+    # Version bump, previous-version lookup (skipped for first records) and one insert
+    assert len(statements) == 2 + 3
+
+    history = await repo.get_validation_history(ids[0])
+    assert [entry["version"] for entry in history] == [1, 2]
+    assert history[1]["data_before"]["phone"] == "518-555-0100"
+    assert history[0]["data_before"]["phone"] == "518-555-0100"
+    assert history[0]["data_after"]["phone"] == "518-555-0199"
+    assert history[0]["status"] == "validated"
+
+    session.add(ValidationRecordModel(provider_id=ids[0], version=2))
+    with pytest.raises(IntegrityError):
+        await session.flush()
@@ -0,0 +1,35 @@
+"""Tests for quality metric queries."""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app.infrastructure.database.models import QualityMetricModel
+from app.infrastructure.services.quality_metrics_service import QualityMetricsService
+
+
+@pytest.mark.asyncio
+async def test_trends_and_downsampling_in_one_query(db):
+    """Trends keep the improving/stable/declining rules; series downsample to max points."""
+    now = datetime.utcnow()
+    async with db.get_session() as session:
+        for hours_ago, value in [(72, 0.5), (60, 0.5), (12, 0.9), (6, 0.9), (1, 0.9)]:
+            session.add(QualityMetricModel(metric_name="score", value=value, measured_at=now - timedelta(hours=hours_ago)))
+        session.add(QualityMetricModel(metric_name="other", value=0.4, measured_at=now - timedelta(hours=2)))
+
+    queries = []
+    sync_engine = db.read_engine.sync_engine
+    listener = lambda *args: queries.append(args[2])  # noqa: E731
+    event.listen(sync_engine, "before_cursor_execute", listener)
+    try:
+        metrics = await QualityMetricsService().get_metrics(days=30)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", listener)
+    assert len([q for q in queries if q.lstrip().upper().startswith("SELECT")]) == 1
+
+    score = [m for m in metrics if m.metric_name == "score"]
+    # An empty window averages to 0, as before: -12h has nothing in the day before it
+    assert [m.trend for m in score] == ["improving", "improving", "declining", "improving", "stable"]
+
+    downsampled = await QualityMetricsService().get_metrics("score", days=30, max_points_per_series=2)
+    assert len(downsampled) == 2
+    assert downsampled[0].value == pytest.approx(0.9)
+    assert downsampled[1].value == pytest.approx(0.5)
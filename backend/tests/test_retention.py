@@ -0,0 +1,134 @@
+"""Tests for metric rollups and validation history archival."""
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import func, select
+from app.domain.enriched_entities import EnrichedProvider
+from app.infrastructure.database.models import QualityMetricModel, QualityMetricRollupModel, ValidationRecordModel
+from app.infrastructure.repositories.provider_repository import ProviderRepository
+from app.infrastructure.repositories.validation_archive import ValidationArchive
+from app.infrastructure.repositories import provider_repository
+from app.infrastructure.services import retention_service
+from app.infrastructure.services.quality_metrics_service import QualityMetricsService
+from app.infrastructure.services.retention_service import RetentionService
+
+
+NOW = datetime(2026, 6, 1, 12, 0)
+
+
+@pytest.mark.asyncio
+async def test_metrics_roll_up_hourly_then_daily(db, monkeypatch):
+    """Old raw points become hourly then daily buckets and still show up in get_metrics."""
+    monkeypatch.setattr(retention_service.settings, "metrics_raw_retention_days", 7)
+    monkeypatch.setattr(retention_service.settings, "metrics_hourly_retention_days", 30)
+    async with db.get_session() as session:
+        for days_ago, minute, value in [(60, 5, 0.5), (60, 35, 0.7), (10, 0, 0.9), (10, 1, 0.1), (1, 0, 0.8)]:
+            measured_at = (NOW - timedelta(days=days_ago)).replace(minute=minute)
+            session.add(QualityMetricModel(metric_name="score", value=value, measured_at=measured_at))
+
+    service = RetentionService()
+    assert await service.rollup_raw_metrics(NOW) == 4
+    assert await service.compact_hourly_rollups(NOW) == 1
+    async with db.get_read_session() as session:
+        assert await session.scalar(select(func.count()).select_from(QualityMetricModel)) == 1
+        rollups = (await session.execute(
+            select(QualityMetricRollupModel).order_by(QualityMetricRollupModel.bucket_start)
+        )).scalars().all()
+    assert [(r.granularity, r.count, round(r.value_sum, 2), r.value_min, r.value_max) for r in rollups] == [
+        ("day", 2, 1.2, 0.5, 0.7),
+        ("hour", 2, 1.0, 0.1, 0.9),
+    ]
+
+    metrics = await QualityMetricsService().get_metrics("score", days=3650)
+    assert [round(m.value, 2) for m in metrics] == [0.8, 0.5, 0.6]
+
+
+@pytest.mark.asyncio
+async def test_validation_records_archive_and_still_rebuild(db, tmp_path, monkeypatch):
+    """Archived records are readable from the archive and newer ones still rebuild."""
+    monkeypatch.setattr(retention_service.settings, "validation_archive_after_days", 30)
+    archive = ValidationArchive(str(tmp_path / "archive"))
+    monkeypatch.setattr(provider_repository, "validation_archive", archive)
+
+    async with db.get_session() as session:
+        repo = ProviderRepository(session)
+        provider = await repo.create(EnrichedProvider(npi="1000000001", enumeration_type="NPI-1"))
+        state = {"phone": "555-0100"}
+        for i in range(1, 6):
+            after = {"phone": f"555-01{i:02d}"}
+            record = await repo.create_validation_record(provider.id, "contact", "validated", 0.9, state, after, [], "test")
+            record.validated_at = NOW - timedelta(days=100 - i * 20)
+            state = after
+
+    assert await RetentionService(archive).archive_validation_records(NOW) == 3
+    async with db.get_read_session() as session:
+        repo = ProviderRepository(session)
+        assert await session.scalar(select(func.count()).select_from(ValidationRecordModel)) == 2
+        assert await repo.get_provider_version(provider.id, 5) == {"phone": "555-0105"}
+        history = await repo.get_validation_history(provider.id, include_archived=True)
+    assert [entry["version"] for entry in history] == [1, 2, 3, 4, 5]
+    assert [entry["data_after"]["phone"] for entry in history] == [f"555-01{i:02d}" for i in range(1, 6)]
+    assert history[0]["validated_at"] == NOW - timedelta(days=80)
+
+
+@pytest.mark.asyncio
+async def test_versions_continue_after_everything_is_archived(db, tmp_path, monkeypatch):
+    """Archiving every record of a provider does not restart its version numbers."""
+    monkeypatch.setattr(retention_service.settings, "validation_archive_after_days", 30)
+    archive = ValidationArchive(str(tmp_path / "archive"))
+    monkeypatch.setattr(provider_repository, "validation_archive", archive)
+
+    async with db.get_session() as session:
+        repo = ProviderRepository(session)
+        provider = await repo.create(EnrichedProvider(npi="1000000001", enumeration_type="NPI-1"))
+        for i in range(1, 4):
+            record = await repo.create_validation_record(
+                provider.id, "contact", "validated", 0.9, {}, {"phone": f"555-01{i:02d}"}, [], "test",
+            )
+            record.validated_at = NOW - timedelta(days=90)
+
+    assert await RetentionService(archive).archive_validation_records(NOW) == 3
+    async with db.get_session() as session:
+        repo = ProviderRepository(session)
+        record = await repo.create_validation_record(
+            provider.id, "contact", "validated", 0.9, {"phone": "555-0103"}, {"phone": "555-0104"}, [], "test",
+        )
+    assert record.version == 4
+    async with db.get_read_session() as session:
+        history = await ProviderRepository(session).get_validation_history(provider.id, include_archived=True)
+    assert [entry["version"] for entry in history] == [1, 2, 3, 4]
+    assert history[-1]["data_after"] == {"phone": "555-0104"}
+
+
+@pytest.mark.asyncio
+async def test_archiving_leaves_the_writer_free_and_skips_changed_providers(db, tmp_path, monkeypatch):
+    """Writes go through while the archive is written; a provider that changed meanwhile keeps its rows."""
+    monkeypatch.setattr(retention_service.settings, "validation_archive_after_days", 30)
+    archive = ValidationArchive(str(tmp_path / "archive"))
+    monkeypatch.setattr(provider_repository, "validation_archive", archive)
+
+    async with db.get_session() as session:
+        repo = ProviderRepository(session)
+        provider = await repo.create(EnrichedProvider(npi="1000000001", enumeration_type="NPI-1"))
+        record = await repo.create_validation_record(
+            provider.id, "contact", "validated", 0.9, {}, {"phone": "555-0101"}, [], "test",
+        )
+        record.validated_at = NOW - timedelta(days=90)
+
+    append = archive.append
+
+    def append_during_write(entries):
+        written = append(entries)
+        # Runs in a worker thread while the archive step holds no connection
+        asyncio.run_coroutine_threadsafe(db.write(lambda session: ProviderRepository(session).create_validation_record(
+            provider.id, "contact", "validated", 0.9, {"phone": "555-0101"}, {"phone": "555-0102"}, [], "test",
+        )), loop).result(5)
+        return written
+
+    loop = asyncio.get_running_loop()
+    monkeypatch.setattr(archive, "append", append_during_write)
+    assert await RetentionService(archive).archive_validation_records(NOW) == 0
+
+    async with db.get_read_session() as session:
+        history = await ProviderRepository(session).get_validation_history(provider.id, include_archived=True)
+    assert [entry["version"] for entry in history] == [1, 2]
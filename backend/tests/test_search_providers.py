@@ -0,0 +1,52 @@
+"""Tests for the provider search use case."""
+import asyncio
+import pytest
+from app.application.use_cases import search_providers
+from app.domain.entities import SearchQuery
+from app.infrastructure.cache import InMemoryTTLCache
+from app.infrastructure.settings import settings
+
+
+def _nppes_item(npi: str, first: str, last: str) -> dict:
+    return {
+        "number": npi,
+        "enumeration_type": "NPI-1",
+        "basic": {"first_name": first, "last_name": last},
+        "addresses": [{"city": "ALBANY", "state": "NY", "postal_code": "12207"}],
+        "taxonomies": [{"desc": "Cardiology"}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_enrichment_is_concurrent_and_ordered(monkeypatch):
+    """Lookups overlap, keep NPPES order, and slow ones fall back to None."""
+    items = [_nppes_item(str(i), f"FIRST{i}", "DOE") for i in range(5)]
+    in_flight = 0
+    peak = 0
+
+    async def fake_nppes_search(**kwargs):
+        return items
+
+    async def fake_web_search(query, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            # FIRST3 never finishes within the deadline
+            await asyncio.sleep(10 if query.startswith("FIRST3 ") else 0.05)
+            return [{"url": f"https://{query.split()[0].lower()}.example.com"}]
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(search_providers, "cache", InMemoryTTLCache())
+    monkeypatch.setattr(search_providers.nppes_client, "search", fake_nppes_search)
+    monkeypatch.setattr(search_providers.searxng_client, "search", fake_web_search)
+    monkeypatch.setattr(settings, "search_enrichment_concurrency", 3)
+    monkeypatch.setattr(settings, "search_enrichment_deadline_seconds", 0.5)
+
+    result = await search_providers.execute(SearchQuery(last_name="DOE", limit=5))
+
+    assert [p.npi for p in result.providers] == ["0", "1", "2", "3", "4"]
+    assert result.providers[0].website == "https://first0.example.com"
+    assert result.providers[3].website is None
+    assert 1 < peak <= 3